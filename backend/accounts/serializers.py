@@ -18,8 +18,11 @@ class UserAdminSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "is_active", "profile"]
 
     def get_profile(self, obj):
-        # Safely get the profile, creating it if it doesn't exist for robustness.
-        profile, created = UserProfile.objects.get_or_create(user=obj)
+        # Use the select_related profile; only create one if it is missing.
+        try:
+            profile = obj.profile
+        except UserProfile.DoesNotExist:
+            profile, created = UserProfile.objects.get_or_create(user=obj)
         return UserProfileSerializer(profile).data
 
     def update(self, instance, validated_data):
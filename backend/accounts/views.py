@@ -1,9 +1,11 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_protect
-from django.views.decorators.http import require_POST, require_GET
+from django.views.decorators.http import require_POST, require_GET, require_http_methods
 from django.contrib.auth import authenticate, login, logout
 from .models import UserProfile
 
+MAX_NOTIFICATION_DELAY_SECONDS = 60 * 60
+
 # --- Response helpers (consistent shape) ---
 
 def json_ok(payload: dict | None = None, status: int = 200):
@@ -97,4 +99,42 @@ def logout_view(request):
 def me(request):
     if request.user.is_authenticated:
         return json_ok(_get_user_data(request.user))
-    return json_error("Anonymous", code="anonymous", status=401)
\ No newline at end of file
+    return json_error("Anonymous", code="anonymous", status=401)
+
+def _get_profile_data(profile):
+    return {"notification_delay_seconds": profile.notification_delay_seconds}
+
+@csrf_protect
+@require_http_methods(["GET", "PATCH"])
+def profile_view(request):
+    """
+    The signed-in user's own settings. PATCH accepts
+    `notification_delay_seconds`, the cooldown between notifications
+    pushed on the notification socket (applied on its next connect).
+    """
+    import json
+    if not request.user.is_authenticated:
+        return json_error("Anonymous", code="anonymous", status=401)
+    profile, _ = UserProfile.objects.get_or_create(user=request.user)
+    if request.method == "GET":
+        return json_ok(_get_profile_data(profile))
+
+    try:
+        payload = json.loads(request.body.decode("utf-8"))
+    except Exception:
+        return json_error("Invalid JSON", code="invalid_json", status=400)
+    if not isinstance(payload, dict):
+        return json_error("Invalid JSON", code="invalid_json", status=400)
+
+    if "notification_delay_seconds" in payload:
+        delay = payload["notification_delay_seconds"]
+        if isinstance(delay, bool) or not isinstance(delay, int) or not 0 <= delay <= MAX_NOTIFICATION_DELAY_SECONDS:
+            return json_error(
+                f"Must be a whole number of seconds between 0 and {MAX_NOTIFICATION_DELAY_SECONDS}",
+                code="invalid_notification_delay",
+                status=400,
+                details={"notification_delay_seconds": delay},
+            )
+        profile.notification_delay_seconds = delay
+        profile.save(update_fields=["notification_delay_seconds"])
+    return json_ok(_get_profile_data(profile))
@@ -18,6 +18,7 @@ django_asgi_app = get_asgi_application()
 # Now it's safe to import modules that rely on the app registry.
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
+from config.websocket import ConnectTimingMiddleware
 import game.routing
 
 
@@ -26,9 +27,11 @@ application = ProtocolTypeRouter({
     "http": django_asgi_app,
 
     # WebSocket chat handler
-    "websocket": AuthMiddlewareStack(
-        URLRouter(
-            game.routing.websocket_urlpatterns
+    "websocket": ConnectTimingMiddleware(
+        AuthMiddlewareStack(
+            URLRouter(
+                game.routing.websocket_urlpatterns
+            )
         )
     ),
 })
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Cache backends that count hits and misses into the metrics registry.
+They behave exactly like the Django/django-redis backends they extend.
+"""
+
+from django.core.cache.backends.locmem import LocMemCache
+from django_redis.cache import RedisCache
+
+from .metrics import cache_requests
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    metrics_label = "default"
+
+    def get(self, key, default=None, version=None, **kwargs):
+        value = super().get(key, _MISSING, version=version, **kwargs)
+        if value is _MISSING:
+            cache_requests.inc(self.metrics_label, "miss")
+            return default
+        cache_requests.inc(self.metrics_label, "hit")
+        return value
+
+
+class MetricsRedisCache(CacheMetricsMixin, RedisCache):
+    metrics_label = "redis"
+
+    # django-redis fetches many keys in one MGET instead of going through get().
+    def get_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        found = super().get_many(keys, *args, **kwargs)
+        if found:
+            cache_requests.inc(self.metrics_label, "hit", amount=len(found))
+        if len(found) < len(keys):
+            cache_requests.inc(self.metrics_label, "miss", amount=len(keys) - len(found))
+        return found
+
+
+class MetricsLocMemCache(CacheMetricsMixin, LocMemCache):
+    metrics_label = "locmem"
@@ -0,0 +1,266 @@
+"""
+Prometheus-style metrics shared by every worker process.
+
+Counters and histograms are recorded into an in-process write-behind
+buffer (a list append under a lock, so recording is a few microseconds)
+and folded into a shared store in the background: a Redis hash that every
+worker increments, or a per-process dict when the cache is not Redis.
+`render()` returns the aggregated values in the Prometheus text format.
+"""
+
+import bisect
+import math
+import threading
+
+from django.conf import settings
+
+STORE_KEY = "quizarrow:metrics:v1"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _series(name: str, labels) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _sort_key(sample):
+    # Order histogram buckets numerically ("le" is always the last label).
+    series, _ = sample
+    head, found, bound = series.rpartition('le="')
+    if not found:
+        return series, 0.0
+    return head, float(bound.rstrip('"}').replace("+Inf", "inf"))
+
+
+def _format(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, *labelvalues, amount: float = 1):
+        self.registry.record(self, labelvalues, amount)
+
+    def fold(self, labelvalues, amounts) -> dict:
+        return {_series(self.name, zip(self.labelnames, labelvalues)): sum(amounts)}
+
+    def series_names(self):
+        return (self.name,)
+
+
+class Gauge(Counter):
+    """Up/down value; workers add their deltas to the shared total."""
+
+    kind = "gauge"
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.registry.record(self, labelvalues, -amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=(), buckets=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, *labelvalues):
+        self.registry.record(self, labelvalues, value)
+
+    def fold(self, labelvalues, values) -> dict:
+        labels = list(zip(self.labelnames, labelvalues))
+        counts = [0] * len(self.buckets)
+        for value in values:
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+
+        # Buckets are cumulative: an observation counts towards every bound above it.
+        deltas, total = {}, 0
+        for bound, count in zip(self.buckets, counts):
+            total += count
+            deltas[_series(f"{self.name}_bucket", labels + [("le", _format(bound))])] = total
+        deltas[_series(f"{self.name}_sum", labels)] = sum(values)
+        deltas[_series(f"{self.name}_count", labels)] = len(values)
+        return deltas
+
+    def series_names(self):
+        return (f"{self.name}_bucket", f"{self.name}_sum", f"{self.name}_count")
+
+
+class MetricsRegistry:
+    """
+    Holds the metric families and aggregates their samples. Samples are
+    buffered per process and added to the shared store at most every
+    METRICS_FLUSH_INTERVAL seconds, so a scrape may lag that much behind.
+    """
+
+    def __init__(self):
+        self.families = {}
+        self._buffer = None
+        self._redis = None
+        self._local = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=()) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self.families[metric.name] = metric
+        return metric
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, "METRICS_ENABLED", True)
+
+    @property
+    def buffer(self):
+        # Created lazily: the buffer and Redis helpers live in the game app,
+        # which isn't importable while settings (and cache backends) load.
+        if self._buffer is None:
+            from game.services.redis_client import get_redis
+            from game.services.write_behind import WriteBehindBuffer, drop_dead_letter
+
+            with self._lock:
+                if self._buffer is None:
+                    self._redis = get_redis()
+                    self._buffer = WriteBehindBuffer(
+                        "metrics", self._flush,
+                        max_items=settings.METRICS_BUFFER_MAX_ITEMS,
+                        max_delay=settings.METRICS_FLUSH_INTERVAL,
+                        dead_letter=drop_dead_letter("metrics"),
+                    )
+        return self._buffer
+
+    def record(self, metric, labelvalues, value: float):
+        if self.enabled:
+            self.buffer.put((metric, labelvalues, value))
+
+    def _flush(self, items):
+        samples = {}
+        for metric, labelvalues, value in items:
+            samples.setdefault((metric, labelvalues), []).append(value)
+        deltas = {}
+        for (metric, labelvalues), values in samples.items():
+            deltas.update(metric.fold(labelvalues, values))
+
+        if self._redis is None:
+            with self._lock:
+                for series, amount in deltas.items():
+                    self._local[series] = self._local.get(series, 0) + amount
+            return
+
+        pipe = self._redis.pipeline(transaction=False)
+        for series, amount in deltas.items():
+            pipe.hincrbyfloat(STORE_KEY, series, amount)
+        pipe.execute()
+
+    def collect(self) -> dict:
+        """Current value of every series, across all workers sharing the store."""
+        self.buffer.flush()
+        if self._redis is None:
+            with self._lock:
+                return dict(self._local)
+        return {
+            (key.decode() if isinstance(key, bytes) else key): float(value)
+            for key, value in self._redis.hgetall(STORE_KEY).items()
+        }
+
+    def render(self) -> str:
+        values = self.collect()
+        by_name = {}
+        for series, value in values.items():
+            by_name.setdefault(series.partition("{")[0], []).append((series, value))
+
+        lines = []
+        for metric in self.families.values():
+            samples = [
+                sample for name in metric.series_names()
+                for sample in sorted(by_name.get(name, ()), key=_sort_key)
+            ]
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{series} {_format(value)}" for series, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+http_requests = metrics.counter(
+    "quizarrow_http_requests_total", "HTTP responses by route, method and status code.",
+    ("route", "method", "status"),
+)
+http_latency = metrics.histogram(
+    "quizarrow_http_request_duration_seconds", "Time spent handling a request.",
+    ("route", "method"), LATENCY_BUCKETS,
+)
+http_db_queries = metrics.histogram(
+    "quizarrow_http_request_db_queries", "SQL statements executed per request.",
+    ("route",), QUERY_COUNT_BUCKETS,
+)
+http_db_time = metrics.histogram(
+    "quizarrow_http_request_db_duration_seconds", "Time spent in SQL per request.",
+    ("route",), LATENCY_BUCKETS,
+)
+cache_requests = metrics.counter(
+    "quizarrow_cache_requests_total", "Cache lookups by result (hit or miss).",
+    ("cache", "result"),
+)
+
+BACKLOG_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+ws_connections = metrics.gauge(
+    "quizarrow_ws_connections", "Open WebSocket connections by consumer and group family.",
+    ("consumer", "group"),
+)
+ws_connects = metrics.counter(
+    "quizarrow_ws_connects_total", "WebSocket handshakes by consumer and outcome (accepted or rejected).",
+    ("consumer", "outcome"),
+)
+ws_connect_latency = metrics.histogram(
+    "quizarrow_ws_connect_duration_seconds", "Time from handshake to accept, including authentication.",
+    ("consumer",), LATENCY_BUCKETS,
+)
+ws_messages_in = metrics.counter(
+    "quizarrow_ws_messages_received_total", "Frames received from clients.", ("consumer",),
+)
+ws_messages_out = metrics.counter(
+    "quizarrow_ws_messages_sent_total", "Frames sent to clients.", ("consumer",),
+)
+ws_backlog = metrics.histogram(
+    "quizarrow_ws_channel_backlog", "Sampled number of messages waiting in a consumer's channel queue.",
+    ("consumer",), BACKLOG_BUCKETS,
+)
+ws_group_send_latency = metrics.histogram(
+    "quizarrow_ws_group_send_duration_seconds", "Time spent in channel layer group_send.",
+    ("group",), LATENCY_BUCKETS,
+)
+ws_capacity_drops = metrics.counter(
+    "quizarrow_ws_capacity_drops_total", "Messages dropped because a channel was over capacity.",
+    ("group",),
+)
@@ -3,9 +3,12 @@ import time
 import logging
 from typing import Iterable
 from django.conf import settings
+from django.db import connection
 from django.http import HttpResponse, JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 
+from .metrics import http_db_queries, http_db_time, http_latency, http_requests
+
 api_logger = logging.getLogger("api")
 
 def _is_api_path(path: str) -> bool:
@@ -54,22 +57,39 @@ class APILoggingMiddleware:
     """
     Logs method, path, status, duration, and user id for API paths.
     Keeps bodies out by default; only short error bodies are logged.
+
+    Also records per-route metrics for every request (latency, status,
+    SQL statement count and time), keyed by the resolved URL name so
+    `/lobby/12/state/` and `/lobby/13/state/` share one series.
     """
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
+        queries = _QueryTimer()
         start = time.perf_counter()
-        response = self.get_response(request)
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        status = getattr(response, "status_code", None)
+        match = getattr(request, "resolver_match", None)
+        route = match.view_name if match is not None and match.view_name else "<unmatched>"
+        http_requests.inc(route, request.method, status)
+        http_latency.observe(duration, route, request.method)
+        http_db_queries.observe(queries.count, route)
+        http_db_time.observe(queries.seconds, route)
+
         if _is_api_path(request.path):
-            duration_ms = int((time.perf_counter() - start) * 1000)
+            duration_ms = int(duration * 1000)
             user_id = getattr(request.user, "id", None) if hasattr(request, "user") and request.user.is_authenticated else None
             msg = {
                 "method": request.method,
                 "path": request.path,
-                "status": getattr(response, "status_code", None),
+                "status": status,
                 "ms": duration_ms,
                 "user_id": user_id,
+                "queries": queries.count,
             }
             # Log small error payloads for faster debugging
             if msg["status"] and msg["status"] >= 400:
@@ -85,6 +105,22 @@ class APILoggingMiddleware:
         return response
 
 
+class _QueryTimer:
+    """Execute wrapper counting the SQL statements of one request and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
 class APIExceptionMiddleware:
     """
     Converts unhandled exceptions on API paths into a consistent JSON error.
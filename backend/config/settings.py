@@ -53,6 +53,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.middleware.APILoggingMiddleware', # request log + per-route metrics
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,7 +80,7 @@ TEMPLATES = [
 ASGI_APPLICATION = 'config.asgi.application'
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "BACKEND": "config.websocket.MetricsRedisChannelLayer",  # channels_redis, instrumented
         "CONFIG": {
             # Use REDIS_HOST from env, defaulting to 'redis' for Docker networking
             "hosts": [(env('REDIS_HOST', default='redis'), 6379)],
@@ -181,7 +182,7 @@ SECURE_PROXY_SSL_HEADER = env.tuple('SECURE_PROXY_SSL_HEADER', default=None)
 # Use the same Redis instance for caching as for channel layers.
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        "BACKEND": "config.cache.MetricsRedisCache",  # django-redis, counting hits/misses
         "LOCATION": f"redis://{env('REDIS_HOST', default='redis')}:6379/1",  # Use db 1 for cache
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
@@ -189,6 +190,68 @@ CACHES = {
     }
 }
 
+# Local and benchmark runs without Redis: per-process cache and channel layer
+if env.bool('USE_IN_MEMORY_BACKENDS', default=False):
+    CACHES = {"default": {"BACKEND": "config.cache.MetricsLocMemCache"}}
+    CHANNEL_LAYERS = {"default": {"BACKEND": "config.websocket.MetricsInMemoryChannelLayer"}}
+
+# --- Metrics ---
+# Exposed on /metrics; workers aggregate through the Redis cache when available.
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+METRICS_TOKEN = env('METRICS_TOKEN', default='')  # bearer token required by /metrics; unset serves 404
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL', default=5.0)  # seconds
+METRICS_BUFFER_MAX_ITEMS = env.int('METRICS_BUFFER_MAX_ITEMS', default=50000)
+METRICS_WS_SAMPLE_INTERVAL = env.float('METRICS_WS_SAMPLE_INTERVAL', default=1.0)  # seconds between backlog samples per socket
+
 # --- Chat Settings ---
 CHAT_RATE_LIMIT_NUM_MESSAGES = env.int('CHAT_RATE_LIMIT_NUM_MESSAGES', default=5)
-CHAT_RATE_LIMIT_SECONDS = env.int('CHAT_RATE_LIMIT_SECONDS', default=10) # e.g., 10 messages per 10 seconds
\ No newline at end of file
+CHAT_RATE_LIMIT_SECONDS = env.int('CHAT_RATE_LIMIT_SECONDS', default=10) # e.g., 10 messages per 10 seconds
+CHAT_FLUSH_MAX_ITEMS = env.int('CHAT_FLUSH_MAX_ITEMS', default=500)  # messages per bulk insert
+CHAT_FLUSH_MAX_DELAY = env.float('CHAT_FLUSH_MAX_DELAY', default=0.5)  # seconds
+CHAT_STREAM_CLAIM_IDLE = env.int('CHAT_STREAM_CLAIM_IDLE', default=30)  # seconds before a dead flusher's messages are retaken
+CHAT_STREAM_MAX_DELIVERIES = env.int('CHAT_STREAM_MAX_DELIVERIES', default=5)  # attempts before a bad message is dead-lettered
+CHAT_ROOM_CACHE_TTL = env.int('CHAT_ROOM_CACHE_TTL', default=5 * 60)
+CHAT_BACKLOG_SIZE = env.int('CHAT_BACKLOG_SIZE', default=100)  # recent messages replayed on connect
+CHAT_BACKLOG_TTL = env.int('CHAT_BACKLOG_TTL', default=7 * 24 * 60 * 60)  # seconds an idle room's backlog is kept
+
+# --- Notifications ---
+NOTIFICATION_SHARDS = env.int('NOTIFICATION_SHARDS', default=16)  # groups the connected users are spread over
+NOTIFICATION_DIRECT_LIMIT = env.int('NOTIFICATION_DIRECT_LIMIT', default=200)  # audiences up to this size get per-user sends
+
+# --- Quiz catalog ---
+QUIZ_CATALOG_CACHE_TTL = env.int('QUIZ_CATALOG_CACHE_TTL', default=5 * 60)  # seconds a rendered catalog page is kept
+
+# --- Presence ---
+# Online users per lobby/chat room live in Redis; LobbyParticipant.connected/last_seen are flushed in batches.
+PRESENCE_TTL = env.int('PRESENCE_TTL', default=60)  # seconds a user stays online after their last heartbeat
+PRESENCE_HEARTBEAT_INTERVAL = env.float('PRESENCE_HEARTBEAT_INTERVAL', default=20.0)  # seconds between socket heartbeats
+PRESENCE_FLUSH_INTERVAL = env.float('PRESENCE_FLUSH_INTERVAL', default=10.0)  # seconds between flushes and sweeps
+
+# --- Gameplay hot state ---
+# Running lobbies are served from the cache; Postgres is updated write-behind.
+GAME_HOT_STATE_TTL = env.int('GAME_HOT_STATE_TTL', default=6 * 60 * 60)
+GAME_WRITE_BEHIND_MAX_ITEMS = env.int('GAME_WRITE_BEHIND_MAX_ITEMS', default=500)
+GAME_WRITE_BEHIND_MAX_DELAY = env.float('GAME_WRITE_BEHIND_MAX_DELAY', default=0.5)  # seconds
+GAME_WRITE_BEHIND_SYNC = env.bool('GAME_WRITE_BEHIND_SYNC', default=False)  # flush inline (tests)
+GAME_EVENT_BUFFER_MAX_ITEMS = env.int('GAME_EVENT_BUFFER_MAX_ITEMS', default=1000)  # lifecycle events per bulk insert
+GAME_EVENT_BUFFER_MAX_DELAY = env.float('GAME_EVENT_BUFFER_MAX_DELAY', default=1.0)  # seconds
+
+# --- Deadline scheduler ---
+# Advances/closes lobbies whose question timed out (manage.py run_deadline_scheduler).
+GAME_DEADLINE_GRACE_SECONDS = env.int('GAME_DEADLINE_GRACE_SECONDS', default=3)  # slack for late client timeouts
+GAME_LOBBY_IDLE_TIMEOUT = env.int('GAME_LOBBY_IDLE_TIMEOUT', default=60 * 60)  # close lobbies never started
+GAME_DEADLINE_BATCH_SIZE = env.int('GAME_DEADLINE_BATCH_SIZE', default=500)
+GAME_DEADLINE_TICK = env.float('GAME_DEADLINE_TICK', default=0.5)  # seconds
+GAME_DEADLINE_RESYNC_SECONDS = env.int('GAME_DEADLINE_RESYNC_SECONDS', default=60)
+GAME_DEADLINE_RETRY_DELAY = env.float('GAME_DEADLINE_RETRY_DELAY', default=5.0)  # seconds before a failed batch is retried
+
+# --- Answer evaluation ---
+GAME_EVALUATOR_CACHE_SIZE = env.int('GAME_EVALUATOR_CACHE_SIZE', default=4096)  # compiled answer keys kept
+GAME_REGEX_MAX_PATTERN_LENGTH = env.int('GAME_REGEX_MAX_PATTERN_LENGTH', default=200)
+GAME_REGEX_MAX_INPUT_LENGTH = env.int('GAME_REGEX_MAX_INPUT_LENGTH', default=500)
+GAME_REGEX_TIMEOUT = env.float('GAME_REGEX_TIMEOUT', default=0.05)  # seconds per pattern match
+
+# --- Regrades ---
+# Larger regrades requested over the API run in a background thread (or use manage.py regrade_answers).
+GAME_REGRADE_SYNC_MAX_ANSWERS = env.int('GAME_REGRADE_SYNC_MAX_ANSWERS', default=10000)
+GAME_REGRADE_STATUS_TTL = env.int('GAME_REGRADE_STATUS_TTL', default=6 * 60 * 60)  # seconds
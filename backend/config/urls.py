@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/auth/", include("accounts.urls")),
     path("api/game/", include("game.urls")),  # <-- add this line
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -0,0 +1,23 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from .metrics import metrics
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Prometheus text exposition of the metrics aggregated across workers.
+    Scrapers must send METRICS_TOKEN as a bearer token; without a
+    configured token the endpoint does not exist.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token:
+        return HttpResponse(status=404)
+    supplied = request.META.get("HTTP_AUTHORIZATION", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,170 @@
+"""
+WebSocket instrumentation: an ASGI middleware that stamps the handshake
+time, a consumer mixin that counts connections and frames, and channel
+layers that time group_send and count capacity drops. Everything records
+into the metrics registry served on /metrics.
+"""
+
+import contextvars
+import logging
+import re
+import time
+
+from channels.exceptions import ChannelFull
+from channels.layers import InMemoryChannelLayer
+from channels.middleware import BaseMiddleware
+from channels_redis.core import RedisChannelLayer
+from django.conf import settings
+
+from .metrics import (
+    ws_backlog, ws_capacity_drops, ws_connect_latency, ws_connections, ws_connects,
+    ws_group_send_latency, ws_messages_in, ws_messages_out,
+)
+
+_current_group = contextvars.ContextVar("metrics_group", default="direct")
+
+
+def group_family(group: str) -> str:
+    """`chat_12` and `lobby_7` become `chat` and `lobby`: one series per kind of group."""
+    return re.sub(r"_\d+$", "", group)
+
+
+class ConnectTimingMiddleware(BaseMiddleware):
+    """Outermost WebSocket middleware: records when the handshake arrived."""
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope, connect_started=time.perf_counter())
+        return await self.inner(scope, receive, send)
+
+
+class ConsumerMetricsMixin:
+    """
+    For AsyncWebsocketConsumer subclasses. Consumers join and leave groups
+    through `join_group`/`leave_group` so open connections can be counted
+    per group family. The channel backlog is sampled at most every
+    METRICS_WS_SAMPLE_INTERVAL seconds per connection, when a message is
+    dispatched; with Redis it only sees messages already pulled into this
+    process.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_groups = set()
+        self._accepted = False
+        self._backlog_sampled_at = 0.0
+
+    @property
+    def metrics_label(self) -> str:
+        return type(self).__name__
+
+    async def join_group(self, group: str):
+        await self.channel_layer.group_add(group, self.channel_name)
+        if group not in self._metrics_groups:
+            self._metrics_groups.add(group)
+            ws_connections.inc(self.metrics_label, group_family(group))
+
+    async def leave_group(self, group: str):
+        await self.channel_layer.group_discard(group, self.channel_name)
+        if group in self._metrics_groups:
+            self._metrics_groups.discard(group)
+            ws_connections.dec(self.metrics_label, group_family(group))
+
+    async def accept(self, subprotocol=None, headers=None):
+        await super().accept(subprotocol, headers)
+        self._accepted = True
+        ws_connects.inc(self.metrics_label, "accepted")
+        started = self.scope.get("connect_started")
+        if started is not None:
+            ws_connect_latency.observe(time.perf_counter() - started, self.metrics_label)
+
+    async def close(self, code=None, reason=None):
+        if not self._accepted:
+            ws_connects.inc(self.metrics_label, "rejected")
+        await super().close(code, reason)
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        await super().send(text_data, bytes_data, close)
+        ws_messages_out.inc(self.metrics_label)
+
+    async def websocket_receive(self, message):
+        ws_messages_in.inc(self.metrics_label)
+        await super().websocket_receive(message)
+
+    async def dispatch(self, message):
+        now = time.monotonic()
+        if now - self._backlog_sampled_at >= settings.METRICS_WS_SAMPLE_INTERVAL:
+            self._backlog_sampled_at = now
+            ws_backlog.observe(self._channel_backlog(), self.metrics_label)
+        await super().dispatch(message)
+
+    def _channel_backlog(self) -> int:
+        layer = self.channel_layer
+        # channels_redis buffers per-channel messages in `receive_buffer`, the in-memory layer in `channels`
+        queues = getattr(layer, "receive_buffer", None)
+        if queues is None:
+            queues = getattr(layer, "channels", None) or {}
+        queue = queues.get(self.channel_name)
+        return queue.qsize() if queue is not None else 0
+
+
+class GroupSendMetricsMixin:
+    """Times group_send and counts messages dropped by ChannelFull on send."""
+
+    async def send(self, channel, message):
+        try:
+            await super().send(channel, message)
+        except ChannelFull:
+            ws_capacity_drops.inc(_current_group.get())
+            raise
+
+    async def group_send(self, group, message):
+        family = group_family(group)
+        token = _current_group.set(family)
+        started = time.perf_counter()
+        try:
+            await super().group_send(group, message)
+        finally:
+            ws_group_send_latency.observe(time.perf_counter() - started, family)
+            _current_group.reset(token)
+
+
+class MetricsInMemoryChannelLayer(GroupSendMetricsMixin, InMemoryChannelLayer):
+    pass
+
+
+class _OverCapacityFilter(logging.Filter):
+    """
+    channels_redis drops group messages for full channels inside a Lua
+    script and only reports it as an INFO log line; count those lines.
+    Records below the logger's original level are still suppressed.
+    """
+
+    MESSAGE = "%s of %s channels over capacity in group %s"
+
+    def __init__(self, passthrough_level: int):
+        super().__init__()
+        self.passthrough_level = passthrough_level
+
+    def filter(self, record):
+        if record.msg == self.MESSAGE and record.args:
+            ws_capacity_drops.inc(group_family(str(record.args[2])), amount=record.args[0])
+        return record.levelno >= self.passthrough_level
+
+
+class MetricsRedisChannelLayer(GroupSendMetricsMixin, RedisChannelLayer):
+    _filter_installed = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._install_drop_counter()
+
+    @classmethod
+    def _install_drop_counter(cls):
+        if cls._filter_installed:
+            return
+        logger = logging.getLogger("channels_redis.core")
+        level = logger.getEffectiveLevel()
+        logger.addFilter(_OverCapacityFilter(level))
+        if level > logging.INFO:
+            logger.setLevel(logging.INFO)
+        cls._filter_installed = True
@@ -1,16 +1,82 @@
+import asyncio
 import json
-import time
+import logging
+from urllib.parse import parse_qs
 import bleach
 from django.conf import settings
-from django.core.cache import cache
+from django.utils import timezone
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import ChatRoom, ChatMessage
+from config.websocket import ConsumerMetricsMixin
+from rest_framework.exceptions import APIException
+from accounts.models import UserProfile
+from .services import LobbyService, AnswerService
+from .services.broadcast import LobbyBroadcaster
+from .services.notifications import NotificationService
+from .services.presence import presence_tracker
+from .services.chat_backlog import chat_backlog
+from .services.chat_store import chat_message_store
+from .services.rate_limit import chat_rate_limiter
 from django.contrib.auth.models import User
 
+logger = logging.getLogger("game")
 
-class NotificationConsumer(AsyncWebsocketConsumer):
-    GROUP_NAME = "quiz_notifications"
+
+def error_message(detail) -> str:
+    """
+    Flattens an APIException detail into one message the way the REST
+    client does: the first non-field error, else "field: first error".
+    """
+    if isinstance(detail, list):
+        return error_message(detail[0]) if detail else ""
+    if isinstance(detail, dict):
+        if not detail:
+            return ""
+        if "non_field_errors" in detail:
+            return error_message(detail["non_field_errors"])
+        field, value = next(iter(detail.items()))
+        return f"{field}: {error_message(value)}"
+    return str(detail)
+
+
+class PresenceMixin:
+    """
+    Keeps the socket's user online in a presence scope while it is open,
+    with a heartbeat every PRESENCE_HEARTBEAT_INTERVAL seconds. If the
+    worker dies the heartbeats stop and the user expires after PRESENCE_TTL.
+    """
+
+    presence_scope = None
+
+    async def start_presence(self, scope: str):
+        self.presence_scope = scope
+        await presence_tracker.aconnect(scope, self.user.id)
+        self.presence_heartbeat = asyncio.ensure_future(self.send_heartbeats())
+
+    async def stop_presence(self):
+        if self.presence_scope is None:
+            return
+        self.presence_heartbeat.cancel()
+        await presence_tracker.adisconnect(self.presence_scope, self.user.id)
+        self.presence_scope = None
+
+    async def send_heartbeats(self):
+        while True:
+            await asyncio.sleep(settings.PRESENCE_HEARTBEAT_INTERVAL)
+            try:
+                await presence_tracker.aheartbeat(self.presence_scope, self.user.id)
+            except Exception:
+                # A missed beat only matters after PRESENCE_TTL; keep trying
+                logger.warning({"presence": self.presence_scope, "user": self.user.id}, exc_info=True)
+
+
+class NotificationConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
+    """
+    Per-user notification socket. Users with a `notification_delay_seconds`
+    cooldown get the first notification right away; anything arriving
+    during the cooldown is held and delivered when it ends, as one
+    `quiz.digest` frame when several quizzes were published.
+    """
 
     async def connect(self):
         # Reject unauthenticated users
@@ -18,13 +84,23 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
-        # Add user to a group for broadcasting
-        await self.channel_layer.group_add(self.GROUP_NAME, self.channel_name)
+        self.user = self.scope["user"]
+        self.notification_delay = await self.get_notification_delay()
+        self.pending = []
+        self.cooldown = None
+
+        # Add user to its shard group and personal group for broadcasting
+        self.groups_joined = NotificationService.groups_for(self.user.id)
+        for group in self.groups_joined:
+            await self.join_group(group)
         await self.accept()
 
     async def disconnect(self, close_code):
-        # Remove user from the broadcast group
-        await self.channel_layer.group_discard(self.GROUP_NAME, self.channel_name)
+        # Remove user from the broadcast groups
+        for group in getattr(self, "groups_joined", []):
+            await self.leave_group(group)
+        if getattr(self, "cooldown", None) is not None:
+            self.cooldown.cancel()
 
     async def receive(self, text_data):
         # This consumer does not handle incoming messages from clients, only broadcasts
@@ -35,23 +111,60 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         """
         Forwards a 'quiz.published' event from the channel layer to the client,
         but filters out the original publisher to prevent duplicate notifications.
+        The frame is encoded once by the sender and forwarded as is.
         """
-        publisher_id = event.get("publisher_id")
-
         # Do not send the notification to the user who published the quiz
-        if self.scope["user"].id == publisher_id:
+        if self.user.id == event.get("exclude_user_id"):
+            return
+        # Shard-wide sends to a large audience carry the recipients
+        if "audience" in event and self.user.id not in event["audience"]:
             return
-            
-        # Send a message down to the WebSocket
-        await self.send(text_data=json.dumps({
-            'type': 'quiz.published',
-            'payload': event['payload']
-        }))
+        await self.notify(event["text"])
 
+    async def notify(self, text):
+        if not self.notification_delay:
+            await self.send(text_data=text)
+        elif self.cooldown is not None:
+            self.pending.append(text)
+        else:
+            await self.send(text_data=text)
+            self.cooldown = asyncio.ensure_future(self.end_cooldown())
+
+    async def end_cooldown(self):
+        await asyncio.sleep(self.notification_delay)
+        pending, self.pending = self.pending, []
+        self.cooldown = None
+        if not pending:
+            return
+        if len(pending) == 1:
+            await self.send(text_data=pending[0])
+        else:
+            quizzes = [json.loads(text)["payload"] for text in pending]
+            await self.send(text_data=json.dumps({
+                "type": "quiz.digest",
+                "payload": {"count": len(quizzes), "quizzes": quizzes},
+            }))
+        # Whatever was just delivered starts the next cooldown
+        self.cooldown = asyncio.ensure_future(self.end_cooldown())
+
+    @database_sync_to_async
+    def get_notification_delay(self):
+        return UserProfile.objects.filter(user_id=self.user.id).values_list(
+            "notification_delay_seconds", flat=True
+        ).first() or 0
+
+
+class ChatConsumer(PresenceMixin, ConsumerMetricsMixin, AsyncWebsocketConsumer):
+    """
+    Chat room socket. Every message frame carries its room sequence number
+    (`seq`). Connecting with `?backlog=1` first replays the room's recent
+    messages in one `chat.backlog` frame; `?since=<seq>` replays only the
+    messages after that number, to resume after a reconnect. Live frames
+    can overlap the replay, so clients should skip `seq`s they have seen.
+    """
 
-class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        self.room_id = self.scope["url_route"]["kwargs"]["room_id"]
+        self.room_id = int(self.scope["url_route"]["kwargs"]["room_id"])
         self.room_group_name = f"chat_{self.room_id}"
         self.user = self.scope["user"]
 
@@ -59,30 +172,34 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
+        # Cached, so reconnect storms don't hit the database
+        if not await database_sync_to_async(chat_message_store.room_exists)(self.room_id):
+            await self.close()
+            return
+        chat_message_store.start()
+
         # Join room group
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        await self.join_group(self.room_group_name)
         await self.accept()
+        await self.start_presence(presence_tracker.chat_scope(self.room_id))
+
+        # Replay is opt-in: older clients treat every frame as a chat message
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        if "backlog" in query or "since" in query:
+            since = query.get("since", [""])[0]
+            backlog = await chat_backlog.areplay(self.room_id, int(since) if since.isdigit() else None)
+            await self.send(text_data=json.dumps({"type": "chat.backlog", **backlog}))
 
     async def disconnect(self, close_code):
         # Leave room group
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        await self.leave_group(self.room_group_name)
+        await self.stop_presence()
 
     # Receive message from WebSocket
     async def receive(self, text_data):
         # --- Rate Limiting Check ---
-        cache_key = f"chat-ratelimit:{self.user.id}:{self.room_id}"
-        num_messages = settings.CHAT_RATE_LIMIT_NUM_MESSAGES
-        seconds = settings.CHAT_RATE_LIMIT_SECONDS
-
-        now = time.time()
-        # Access cache asynchronously
-        history = await database_sync_to_async(cache.get)(cache_key, [])
-
-        # Remove timestamps older than the window
-        while history and history[0] < now - seconds:
-            history.pop(0)
-
-        if len(history) >= num_messages:
+        # One atomic check shared by all of the user's sockets in this room
+        if not await chat_rate_limiter.aallow(f"{self.user.id}:{self.room_id}"):
             # Rate limit exceeded, send error and drop message
             await self.send(text_data=json.dumps({
                 'error': 'rate_limit_exceeded',
@@ -90,42 +207,117 @@ class ChatConsumer(AsyncWebsocketConsumer):
             }))
             return
 
-        history.append(now)
-        await database_sync_to_async(cache.set)(cache_key, history, timeout=seconds)
-        
         # --- Original Logic ---
         text_data_json = json.loads(text_data)
         # Sanitize message content to prevent XSS
         message = bleach.clean(text_data_json["message"])
 
-        # Save message to database
-        new_message = await self.save_message(message)
-
-        # Send message to room group
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "chat_message",
-                "message": new_message.message,
-                "user_username": self.user.username,
-                "timestamp": new_message.timestamp.isoformat(),
-            },
+        # Broadcast right away; the message is staged and persisted in batches
+        timestamp = timezone.now()
+        frame = {
+            "message": message,
+            "user_username": self.user.username,
+            "timestamp": timestamp.isoformat(),
+        }
+        seq = await chat_backlog.aappend(self.room_id, frame)
+        # Encoded once here instead of once per member of the room
+        text = json.dumps({**frame, "seq": seq})
+        await asyncio.gather(
+            chat_message_store.astage(
+                room_id=self.room_id, user_id=self.user.id, message=message, timestamp=timestamp
+            ),
+            self.channel_layer.group_send(
+                self.room_group_name,
+                {"type": "chat_message", "text": text},
+            ),
         )
 
     # Receive message from room group
     async def chat_message(self, event):
-        # Send message to WebSocket
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "message": event["message"],
-                    "user_username": event["user_username"],
-                    "timestamp": event["timestamp"],
-                }
-            )
-        )
+        # Already encoded by the sender: forward the frame untouched
+        await self.send(text_data=event["text"])
+
+
+class GameConsumer(PresenceMixin, ConsumerMetricsMixin, AsyncWebsocketConsumer):
+    """
+    Pushes a lobby's gameplay events (question start, deadline, score,
+    end of game) to its players and accepts answers over the socket,
+    replacing polling of the lobby state endpoint. `{"action": "ping"}`
+    refreshes the player's presence and is answered with a `pong` frame.
+    """
+
+    async def connect(self):
+        self.lobby_id = int(self.scope["url_route"]["kwargs"]["lobby_id"])
+        self.group_name = LobbyBroadcaster.group_name(self.lobby_id)
+        self.user = self.scope["user"]
+
+        if not self.user or not self.user.is_authenticated:
+            await self.close()
+            return
+
+        # Loading the state doubles as the membership check
+        try:
+            state = await self.get_state()
+        except APIException:
+            await self.close()
+            return
+
+        await self.join_group(self.group_name)
+        await self.accept()
+        await self.start_presence(presence_tracker.lobby_scope(self.lobby_id))
+        await self.send_frame("lobby.state", state)
+
+    async def disconnect(self, close_code):
+        if hasattr(self, "group_name"):
+            await self.leave_group(self.group_name)
+        await self.stop_presence()
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            await self.send_error("invalid_json", "Message must be valid JSON.")
+            return
+        if not isinstance(data, dict):
+            await self.send_error("invalid_message", "Message must be a JSON object.")
+            return
+
+        action = data.get("action")
+        try:
+            if action == "answer":
+                result = await self.submit_answer(data.get("payload") or {})
+                await self.send_frame("answer.result", result)
+            elif action == "state":
+                await self.send_frame("lobby.state", await self.get_state())
+            elif action == "ping":
+                await presence_tracker.aheartbeat(self.presence_scope, self.user.id)
+                await self.send_frame("pong", {})
+            else:
+                await self.send_error("unknown_action", f"Unknown action: {action!r}")
+        except APIException as ex:
+            await self.send_error(ex.default_code, error_message(ex.detail))
+
+    # Handlers for events sent to the lobby group
+    # (frames arrive encoded by LobbyBroadcaster and are forwarded untouched)
+    async def question_started(self, event):
+        await self.send(text_data=event["text"])
+
+    async def score_updated(self, event):
+        await self.send(text_data=event["text"])
+
+    async def game_ended(self, event):
+        await self.send(text_data=event["text"])
+
+    async def send_frame(self, frame_type, payload):
+        await self.send(text_data=json.dumps({"type": frame_type, "payload": payload}))
+
+    async def send_error(self, code, message):
+        await self.send(text_data=json.dumps({"type": "error", "error": code, "message": message}))
+
+    @database_sync_to_async
+    def get_state(self):
+        return LobbyService().get_lobby_state(lobby_id=self.lobby_id, user=self.user)
 
     @database_sync_to_async
-    def save_message(self, message):
-        room = ChatRoom.objects.get(id=self.room_id)
-        return ChatMessage.objects.create(room=room, user=self.user, message=message)
\ No newline at end of file
+    def submit_answer(self, payload):
+        return AnswerService().submit_answer(lobby_id=self.lobby_id, user=self.user, payload=payload)
@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+
+# Host-supplied patterns are matched with the `regex` engine for its match
+# timeout: no pattern check can rule out catastrophic backtracking.
+import regex
+from django.conf import settings
+
+from .models import Question
+
+
+class InvalidPattern(ValueError):
+    pass
+
+
+def compile_pattern(pattern: str):
+    """
+    Compiles an accepted-answer pattern for full, case-insensitive matching,
+    enforcing the configured size limit. Raises InvalidPattern.
+    """
+    if not isinstance(pattern, str) or not pattern:
+        raise InvalidPattern("Pattern must be a non-empty string.")
+    if len(pattern) > settings.GAME_REGEX_MAX_PATTERN_LENGTH:
+        raise InvalidPattern(f"Pattern is longer than {settings.GAME_REGEX_MAX_PATTERN_LENGTH} characters.")
+    try:
+        return regex.compile(pattern, regex.IGNORECASE)
+    except regex.error as ex:
+        raise InvalidPattern(str(ex))
+
+
+class CompiledMatcher:
+    """
+    Answer key of one question, pre-processed so that evaluating a
+    submission is a single comparison or set lookup.
+    """
+
+    def __init__(self, question_type: str, key: dict):
+        self.question_type = question_type
+        self.correct_index = key.get("correct_index")
+        self.is_true = key.get("is_true")
+        self.mode = key.get("mode", "casefold")
+        accepted = key.get("accepted", [])
+        self.accepted = frozenset(accepted)
+        self.accepted_folded = frozenset(ans.casefold() for ans in accepted)
+        self.patterns = ()
+        if question_type == Question.Type.SHORT_TEXT and self.mode == "regex":
+            patterns = []
+            for pattern in accepted:
+                try:
+                    patterns.append(compile_pattern(pattern))
+                except InvalidPattern:
+                    # Keys saved before validation existed; never let them match.
+                    continue
+            self.patterns = tuple(patterns)
+
+    def matches(self, payload: dict) -> bool:
+        if not payload:
+            return False
+
+        if self.question_type == Question.Type.MCQ:
+            return self.correct_index == payload.get("index")
+
+        if self.question_type == Question.Type.TRUE_FALSE:
+            return self.is_true == payload.get("answer")
+
+        if self.question_type == Question.Type.SHORT_TEXT:
+            submitted_answer = (payload.get("answer") or "").strip()
+            if not submitted_answer:
+                return False
+
+            if self.mode == "exact":
+                return submitted_answer in self.accepted
+            if self.mode == "casefold":
+                return submitted_answer.casefold() in self.accepted_folded
+            if self.mode == "regex":
+                return self._matches_pattern(submitted_answer)
+
+        return False
+
+    def _matches_pattern(self, answer: str) -> bool:
+        if len(answer) > settings.GAME_REGEX_MAX_INPUT_LENGTH:
+            return False
+        for pattern in self.patterns:
+            try:
+                if pattern.fullmatch(answer, timeout=settings.GAME_REGEX_TIMEOUT):
+                    return True
+            except TimeoutError:
+                # Treated as a wrong answer rather than pinning the worker
+                continue
+        return False
+
+
+class AnswerEvaluator:
+    """
+    Bounded LRU of compiled matchers keyed by question id and `updated_at`,
+    so an edited answer key is picked up automatically.
+    """
+
+    def __init__(self, maxsize: int | None = None):
+        self.maxsize = maxsize or settings.GAME_EVALUATOR_CACHE_SIZE
+        self._matchers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_matcher(self, question_id: int, updated_at, question_type: str, key: dict) -> CompiledMatcher:
+        cache_key = (question_id, str(updated_at))
+        with self._lock:
+            matcher = self._matchers.get(cache_key)
+            if matcher is not None:
+                self._matchers.move_to_end(cache_key)
+                return matcher
+
+        matcher = CompiledMatcher(question_type, key)
+        with self._lock:
+            self._matchers[cache_key] = matcher
+            if len(self._matchers) > self.maxsize:
+                self._matchers.popitem(last=False)
+        return matcher
+
+    def for_question(self, question: Question) -> CompiledMatcher:
+        return self.get_matcher(question.id, question.updated_at.isoformat(), question.type, question.answer_key)
+
+    def evaluate(self, plan_entry: dict, payload: dict) -> bool:
+        """Evaluates a submission against a hot-state question plan entry."""
+        matcher = self.get_matcher(
+            plan_entry.get("question_id", plan_entry["id"]),
+            plan_entry.get("updated_at"),
+            plan_entry["type"],
+            plan_entry["answer_key"],
+        )
+        return matcher.matches(payload)
+
+
+answer_evaluator = AnswerEvaluator()
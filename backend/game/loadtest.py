@@ -0,0 +1,329 @@
+"""
+Load harness for the gameplay API.
+
+Simulates concurrent players that join a solo lobby, poll its state and
+submit answers until the quiz ends, by calling the project's ASGI
+application in-process (no network, no server). Every request goes through
+the full middleware, auth and view stack, so the numbers reflect one
+worker process on the configured database and cache. Run it with
+`manage.py run_load_test`, or drive `GameplayLoadTest` directly.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.signals import request_started
+from django.db import connections
+from django.middleware.csrf import _get_new_csrf_string
+
+from .models import Question, Quiz, QuizQuestion
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+class QueryCounter:
+    """
+    Counts SQL statements executed by request threads. The wrapper is
+    attached to each thread's connections when a request starts; queries
+    made by background writers are not part of any request and not counted.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.active = False
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.active:
+            with self._lock:
+                self.count += 1
+        return execute(sql, params, many, context)
+
+    def _attach(self, **kwargs):
+        for connection in connections.all():
+            if self not in connection.execute_wrappers:
+                connection.execute_wrappers.append(self)
+
+    def start(self):
+        self.count = 0
+        self.active = True
+        request_started.connect(self._attach, dispatch_uid=f"loadtest-queries-{id(self)}")
+
+    def stop(self):
+        self.active = False
+        request_started.disconnect(dispatch_uid=f"loadtest-queries-{id(self)}")
+
+
+class LoadTestReport:
+    """Latencies and outcomes of a run, grouped by step (join/state/submit)."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(int)
+        self.queries = 0
+        self.elapsed = 0.0
+        self.players = 0
+        self.finished_players = 0
+
+    def record(self, step: str, latency: float, status: int | None):
+        self.latencies[step].append(latency)
+        self.statuses[status or "exception"] += 1
+        if status is None or status >= 400:
+            self.errors[step] += 1
+
+    @property
+    def requests(self) -> int:
+        return sum(len(values) for values in self.latencies.values())
+
+    def summary(self) -> dict:
+        steps = {}
+        for step, values in self.latencies.items():
+            ordered = sorted(values)
+            steps[step] = {
+                "requests": len(ordered),
+                "errors": self.errors[step],
+                "error_rate": self.errors[step] / len(ordered),
+                "p50_ms": percentile(ordered, 50) * 1000,
+                "p95_ms": percentile(ordered, 95) * 1000,
+                "p99_ms": percentile(ordered, 99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        requests = self.requests
+        return {
+            "players": self.players,
+            "finished_players": self.finished_players,
+            "requests": requests,
+            "elapsed_s": self.elapsed,
+            "throughput_rps": requests / self.elapsed if self.elapsed else 0.0,
+            "error_rate": sum(self.errors.values()) / requests if requests else 0.0,
+            "queries_per_request": self.queries / requests if requests else 0.0,
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "steps": steps,
+        }
+
+
+class ASGIClient:
+    """Minimal HTTP client that calls an ASGI application directly."""
+
+    def __init__(self, app, host: str):
+        self.app = app
+        self.host = host
+
+    async def request(self, method: str, path: str, *, body: dict | None = None, headers=()):
+        path, _, query = path.partition("?")
+        raw_body = json.dumps(body).encode() if body is not None else b""
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [
+                (b"host", self.host.encode()),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(raw_body)).encode()),
+                *headers,
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": (self.host, 80),
+        }
+        response = {"status": None, "body": []}
+        done = asyncio.Event()
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": raw_body, "more_body": False}
+            # Only report a disconnect once the response is complete.
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    done.set()
+
+        await self.app(scope, receive, send)
+        done.set()
+        return response["status"], b"".join(response["body"])
+
+
+class Player:
+    """A logged-in user with its own session and CSRF cookies."""
+
+    def __init__(self, user, session_key: str):
+        self.user = user
+        self.csrf_token = _get_new_csrf_string()
+        cookie = SimpleCookie()
+        cookie[settings.SESSION_COOKIE_NAME] = session_key
+        cookie[settings.CSRF_COOKIE_NAME] = self.csrf_token
+        self.headers = (
+            (b"cookie", cookie.output(header="", sep=";").strip().encode()),
+            (b"x-csrftoken", self.csrf_token.encode()),
+        )
+
+
+def prepare_players(count: int, prefix: str = "loadtest") -> list:
+    """Creates (or reuses) `count` player accounts, each with a fresh session."""
+    User = get_user_model()
+    SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+    players = []
+    for i in range(count):
+        user, created = User.objects.get_or_create(username=f"{prefix}-{i}")
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=["password"])
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        players.append(Player(user, session.session_key))
+    return players
+
+
+def prepare_quiz(questions: int = 10, prefix: str = "loadtest") -> Quiz:
+    """Creates a published quiz with a mix of question types to play against."""
+    from .services import SnapshotService
+
+    User = get_user_model()
+    host, _ = User.objects.get_or_create(username=f"{prefix}-host")
+    quiz = Quiz.objects.create(title=f"Load test ({questions} questions)", host=host, is_published=True)
+    kinds = itertools.cycle([
+        (Question.Type.MCQ, {"choices": ["A", "B", "C", "D"]}, {"correct_index": 1}),
+        (Question.Type.TRUE_FALSE, {}, {"is_true": True}),
+        (Question.Type.SHORT_TEXT, {}, {"accepted": ["Paris"], "mode": "casefold"}),
+    ])
+    for order in range(1, questions + 1):
+        question_type, content, answer_key = next(kinds)
+        question = Question.objects.create(
+            author=host, type=question_type, text=f"Load test question {order}",
+            content=content, answer_key=answer_key,
+        )
+        QuizQuestion.objects.create(quiz=quiz, question=question, order=order)
+    SnapshotService().compile(quiz)
+    return quiz
+
+
+def random_answer(question: dict) -> dict:
+    """A plausible (sometimes correct) answer for a public question payload."""
+    question_type = question["question"]["type"]
+    if question_type == Question.Type.MCQ:
+        choices = question["question"].get("content", {}).get("choices") or [None]
+        return {"index": random.randrange(len(choices))}
+    if question_type == Question.Type.TRUE_FALSE:
+        return {"answer": random.choice([True, False])}
+    return {"answer": random.choice(["Paris", "London", "paris"])}
+
+
+class GameplayLoadTest:
+    """
+    Runs `players` concurrent solo games of `quiz_id`: join, then state and
+    submit for every question. `ramp_up` spreads the joins over that many
+    seconds and `think_time` is the pause before each answer.
+    """
+
+    def __init__(self, app, players: list, quiz_id: int, *, ramp_up: float = 0.0,
+                 think_time: float = 0.0, host: str | None = None):
+        self.client = ASGIClient(app, host or self._default_host())
+        self.players = players
+        self.quiz_id = quiz_id
+        self.ramp_up = ramp_up
+        self.think_time = think_time
+        self.report = LoadTestReport()
+        self.queries = QueryCounter()
+
+    @staticmethod
+    def _default_host() -> str:
+        for host in settings.ALLOWED_HOSTS:
+            if host != "*":
+                return host.lstrip(".")
+        return "localhost"
+
+    def run(self) -> LoadTestReport:
+        return asyncio.run(self.run_async())
+
+    async def run_async(self) -> LoadTestReport:
+        self.report.players = len(self.players)
+        self.queries.start()
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*[
+                self._play(player, delay=self.ramp_up * i / max(1, len(self.players)))
+                for i, player in enumerate(self.players)
+            ])
+        finally:
+            self.report.elapsed = time.perf_counter() - started
+            self.queries.stop()
+            self.report.queries = self.queries.count
+            await sync_to_async(self._flush_writers)()
+        return self.report
+
+    @staticmethod
+    def _flush_writers():
+        from .services.hot_state import lobby_state_store
+
+        lobby_state_store.writer.flush()
+
+    async def _call(self, step: str, player: Player, method: str, path: str, body: dict | None = None):
+        started = time.perf_counter()
+        try:
+            status, raw = await self.client.request(method, path, body=body, headers=player.headers)
+        except Exception:
+            self.report.record(step, time.perf_counter() - started, None)
+            return None, None
+        self.report.record(step, time.perf_counter() - started, status)
+        try:
+            return status, json.loads(raw) if raw else None
+        except ValueError:
+            return status, None
+
+    async def _play(self, player: Player, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        status, data = await self._call("join", player, "POST", f"/api/game/lobby/join/{self.quiz_id}/")
+        if status != 201:
+            return
+        lobby_id = data["lobby_id"]
+
+        # Bounded so a misbehaving lobby can't spin a player forever
+        for _ in range(1000):
+            status, state = await self._call("state", player, "GET", f"/api/game/lobby/{lobby_id}/state/")
+            if status != 200 or not state or not state.get("question"):
+                return
+            if self.think_time:
+                await asyncio.sleep(random.uniform(0, 2 * self.think_time))
+            status, result = await self._call(
+                "submit", player, "POST", f"/api/game/lobby/{lobby_id}/submit/", random_answer(state["question"])
+            )
+            if status != 200:
+                return
+            if result.get("status") == "finished":
+                self.report.finished_players += 1
+                return
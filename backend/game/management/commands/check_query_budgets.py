@@ -0,0 +1,205 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework.test import APIClient
+
+from accounts.models import UserProfile
+from game.models import (
+    ChatMessage, ChatRoom, LobbyParticipant, LobbyRoom, Question, Quiz, QuizParticipation, QuizQuestion, Tag,
+)
+from game.services import SnapshotService
+from game.services.lobby_codes import lobby_code_allocator
+from game.services.redis_client import get_redis
+
+# One request per URL name: (method, user, url kwargs, body, max queries, max response KiB).
+# Url kwargs and bodies may be callables taking the seeded context. Budgets must not
+# depend on data volume: that is what catches an N+1.
+BUDGETS = {
+    # --- quiz management ---
+    "host-new-quiz": ("post", "host", {}, lambda ctx: {
+        "title": "Budget quiz", "description": "d",
+        "quiz_questions": [
+            {"order": 1, "question": {"type": "tf", "text": "q", "answer_key": {"is_true": True}}},
+        ],
+    }, 12, 4),
+    "my-quizzes": ("get", "host", {}, None, 8, 512),
+    "quiz-detail": ("get", "host", lambda ctx: {"pk": ctx["draft"].pk}, None, 7, 16),
+    "quiz-add-question": ("post", "host", lambda ctx: {"pk": ctx["draft"].pk}, {
+        "quiz_questions": [{"order": 99, "question": {"type": "tf", "text": "q", "answer_key": {"is_true": True}}}],
+    }, 10, 4),
+    "quiz-update-question": ("patch", "host", lambda ctx: {"pk": ctx["draft"].pk, "qid": ctx["draft_link"].pk},
+                             {"points": 50}, 10, 4),
+    "quiz-delete-question": ("delete", "host", lambda ctx: {"pk": ctx["draft"].pk, "qid": ctx["draft_link"].pk},
+                             None, 10, 1),
+    "quiz-regrade": ("post", "host", lambda ctx: {"pk": ctx["published"].pk}, {}, 12, 1),
+    "delete-quiz": ("delete", "host", lambda ctx: {"pk": ctx["draft"].pk}, None, 25, 1),
+    # --- tags & chat ---
+    "tag-list": ("get", "player", {}, None, 3, 16),
+    "chatroom-list-create": ("get", "player", {}, None, 3, 16),
+    "chatroom-retrieve": ("get", "player", lambda ctx: {"pk": ctx["room"].pk}, None, 3, 1),
+    "chatroom-messages": ("get", "player", lambda ctx: {"room_id": ctx["room"].pk}, None, 3, 16),
+    "chatroom-online": ("get", "player", lambda ctx: {"room_id": ctx["room"].pk}, None, 3, 1),
+    "chatroom-delete": ("delete", "host", lambda ctx: {"pk": ctx["spare_room"].pk}, None, 8, 1),
+    # --- gameplay ---
+    "published-quizzes": ("get", None, {}, {"limit": 20}, 3, 16),
+    "join-lobby": ("post", "player", lambda ctx: {"quiz_id": ctx["published"].pk}, None, 16, 1),
+    "lobby-state": ("get", "player", lambda ctx: {"lobby_id": ctx["lobby_id"]}, None, 8, 8),
+    "submit-answer": ("post", "player", lambda ctx: {"lobby_id": ctx["lobby_id"]}, {"answer": True}, 14, 1),
+    "lobby-leaderboard": ("get", "player", lambda ctx: {"lobby_id": ctx["lobby_id"]}, None, 4, 4),
+    "lobby-online": ("get", "player", lambda ctx: {"lobby_id": ctx["lobby_id"]}, None, 4, 1),
+    "submit-run": ("post", "player", lambda ctx: {"lobby_id": ctx["prefetch_lobby_id"]}, {"answers": []}, 20, 1),
+    # --- history ---
+    "my-participations": ("get", "player", {}, None, 3, 64),
+    "participation-detail": ("get", "player", lambda ctx: {"pk": ctx["participation"].pk}, None, 3, 1),
+    # --- admin ---
+    "admin-user-list": ("get", "admin", {}, None, 4, 64),
+    "admin-user-detail": ("get", "admin", lambda ctx: {"pk": ctx["player"].pk}, None, 4, 1),
+    "admin-quiz-list": ("get", "admin", {}, None, 8, 1024),
+    "admin-quiz-detail": ("delete", "admin", lambda ctx: {"pk": ctx["spare_quiz"].pk}, None, 25, 1),
+    # --- accounts (logout last: it ends the player's session) ---
+    "csrf": ("get", None, {}, None, 0, 1),
+    "login": ("post", None, {}, lambda ctx: {"username": "budget-player", "password": "budget-pass"}, 10, 1),
+    "me": ("get", "player", {}, None, 3, 1),
+    "profile": ("get", "player", {}, None, 3, 1),
+    "logout": ("post", "player", {}, None, 4, 1),
+}
+
+URLCONF_NAMESPACES = ("game.urls", "accounts.urls")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds realistic data volumes, calls every URL of game/urls.py and accounts/urls.py and fails "
+        "if one exceeds its query-count or response-size budget, counting the on_commit work each "
+        "request triggers. Everything runs in a rolled-back transaction; use a disposable database "
+        "and USE_IN_MEMORY_BACKENDS=1, as in CI."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=int, default=1, help="Multiplies the seeded data volume.")
+        parser.add_argument("--verbose-sql", action="store_true", help="Print the queries of failing URLs.")
+
+    def handle(self, *args, **options):
+        if get_redis() is not None:
+            # Hot state, deadlines and leaderboards would outlive the rollback
+            raise CommandError("Refusing to run against Redis; set USE_IN_MEMORY_BACKENDS=1.")
+        missing = sorted(self._url_names() - set(BUDGETS))
+        failures = [f"{name}: no query budget defined" for name in missing]
+
+        with override_settings(GAME_WRITE_BEHIND_SYNC=True), transaction.atomic():
+            ctx = self._seed(options["scale"])
+            clients = {role: self._client(ctx.get(role)) for role in ("player", "host", "admin", None)}
+            for name, (method, role, kwargs, body, max_queries, max_kib) in BUDGETS.items():
+                try:
+                    kwargs = kwargs(ctx) if callable(kwargs) else kwargs
+                    body = body(ctx) if callable(body) else body
+                except KeyError as exc:
+                    failures.append(f"{name}: skipped, depends on a failed request ({exc})")
+                    self.stdout.write(f"FAIL {name:<22} skipped")
+                    continue
+                client = clients[role]
+                # Commit hooks (events, broadcasts) run as if the request had committed
+                with CaptureQueriesContext(connection) as queries, TestCase.captureOnCommitCallbacks(execute=True):
+                    response = getattr(client, method)(reverse(name, kwargs=kwargs), body, format="json")
+                self._after(name, response, ctx)
+
+                size = len(response.content)
+                ok = response.status_code < 400 and len(queries) <= max_queries and size <= max_kib * 1024
+                self.stdout.write(
+                    f"{'ok  ' if ok else 'FAIL'} {name:<22} {response.status_code} "
+                    f"queries={len(queries)}/{max_queries} size={size / 1024:.1f}/{max_kib}KiB"
+                )
+                if not ok:
+                    failures.append(f"{name}: status {response.status_code}, {len(queries)} queries, {size} bytes")
+                    if options["verbose_sql"]:
+                        for query in queries.captured_queries:
+                            self.stdout.write(f"      {query['sql'][:160]}")
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError("Query budgets exceeded:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS(f"All {len(BUDGETS)} endpoints within budget."))
+
+    def _url_names(self) -> set:
+        names = set()
+        for urlconf in URLCONF_NAMESPACES:
+            stack = list(get_resolver(urlconf).url_patterns)
+            while stack:
+                pattern = stack.pop()
+                if isinstance(pattern, URLResolver):
+                    stack.extend(pattern.url_patterns)
+                elif isinstance(pattern, URLPattern) and pattern.name:
+                    names.add(pattern.name)
+        return names
+
+    @staticmethod
+    def _client(user):
+        host = next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if h != "*"), "localhost")
+        client = APIClient(enforce_csrf_checks=False, HTTP_HOST=host)
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def _user(self, username: str, role: str, password: str | None = None):
+        user = get_user_model().objects.create_user(username, password=password)
+        UserProfile.objects.filter(user=user).update(role=role)
+        return get_user_model().objects.select_related("profile").get(pk=user.pk)
+
+    def _seed(self, scale: int) -> dict:
+        ctx = {
+            "player": self._user("budget-player", UserProfile.Role.PLAYER, password="budget-pass"),
+            "host": self._user("budget-host", UserProfile.Role.HOST),
+            "admin": self._user("budget-admin", UserProfile.Role.ADMIN),
+        }
+        for i in range(50 * scale):
+            self._user(f"budget-user-{i}", UserProfile.Role.PLAYER)
+
+        tags = [Tag.objects.create(name=f"budget-tag-{i}") for i in range(5)]
+        quizzes = []
+        for i in range(20 * scale):
+            quiz = Quiz.objects.create(host=ctx["host"], title=f"Budget quiz {i}", is_published=i % 2 == 0)
+            quiz.tags.set(tags[:2])
+            for order in range(1, 9):
+                question = Question.objects.create(
+                    author=ctx["host"], type=Question.Type.TRUE_FALSE, text=f"Budget question {order}",
+                    answer_key={"is_true": True},
+                )
+                question.tags.set(tags[2:4])
+                QuizQuestion.objects.create(quiz=quiz, question=question, order=order)
+            if quiz.is_published:
+                SnapshotService().compile(quiz)
+            quizzes.append(quiz)
+        ctx["published"] = quizzes[0]
+        ctx["draft"] = quizzes[1]
+        ctx["draft_link"] = quizzes[1].quiz_questions.first()
+        ctx["spare_quiz"] = quizzes[3]
+
+        rooms = [ChatRoom.objects.create(name=f"budget-room-{i}", created_by=ctx["host"]) for i in range(20 * scale)]
+        ctx["room"], ctx["spare_room"] = rooms[0], rooms[1]
+        ChatMessage.objects.bulk_create([
+            ChatMessage(room=rooms[0], user=ctx["player"] if i % 2 else ctx["host"], message=f"message {i}")
+            for i in range(100 * scale)
+        ])
+
+        for quiz in quizzes[::2][: 10 * scale]:
+            lobby = LobbyRoom.objects.create(
+                code=lobby_code_allocator.allocate(), quiz=quiz, host=ctx["player"], status=LobbyRoom.Status.ENDED
+            )
+            LobbyParticipant.objects.create(lobby=lobby, user=ctx["player"], nickname="budget-player", score=100)
+            ctx["participation"] = QuizParticipation.objects.create(
+                user=ctx["player"], quiz=quiz, lobby=lobby, final_score=100
+            )
+
+        from game.services import LobbyService
+
+        ctx["prefetch_lobby_id"] = LobbyService().start_solo_quiz(quizzes[2].pk, ctx["player"], prefetch=True).pk
+        return ctx
+
+    @staticmethod
+    def _after(name: str, response, ctx: dict):
+        if name == "join-lobby" and response.status_code == 201:
+            ctx["lobby_id"] = response.data["lobby_id"]
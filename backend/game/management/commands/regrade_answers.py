@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from game.models import Question, Quiz
+from game.services import RegradeService
+
+
+class Command(BaseCommand):
+    help = "Re-evaluates stored answers against the current answer keys and fixes scores."
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument("--quiz", type=int, help="Regrade every question of this quiz.")
+        target.add_argument("--question", type=int, help="Regrade this question in every quiz using it.")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Answers re-evaluated per batch.")
+        parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them.")
+
+    def handle(self, *args, **options):
+        service = RegradeService(chunk_size=options["chunk_size"])
+        try:
+            if options["quiz"] is not None:
+                result = service.regrade_quiz(Quiz.objects.get(pk=options["quiz"]), dry_run=options["dry_run"])
+            else:
+                result = service.regrade_question(
+                    Question.objects.get(pk=options["question"]), dry_run=options["dry_run"]
+                )
+        except (Quiz.DoesNotExist, Question.DoesNotExist):
+            raise CommandError("Quiz or question not found.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {result['scanned']} answers, {result['changed']} changed "
+            f"({result['points_delta']:+d} points){' [dry run]' if result['dry_run'] else ''}."
+        ))
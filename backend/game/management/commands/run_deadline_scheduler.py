@@ -0,0 +1,26 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from game.services.scheduler import DeadlineRunner
+
+
+class Command(BaseCommand):
+    help = "Advances or closes lobbies whose current question has timed out."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process due deadlines once and exit.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Lobbies handled per batch.")
+
+    def handle(self, *args, **options):
+        runner = DeadlineRunner(batch_size=options["batch_size"])
+        if options["once"]:
+            processed = asyncio.run(runner.run_once())
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} due lobbies."))
+            return
+
+        self.stdout.write("Deadline scheduler running...")
+        try:
+            asyncio.run(runner.run())
+        except KeyboardInterrupt:
+            pass
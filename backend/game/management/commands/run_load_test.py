@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game.loadtest import GameplayLoadTest, prepare_players, prepare_quiz
+from game.models import Quiz
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulates concurrent solo players (join -> state -> submit) through the ASGI app and "
+        "reports throughput, latency percentiles, queries per request and error rates. "
+        "Set USE_IN_MEMORY_BACKENDS=1 to run without Redis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=50, help="Concurrent players.")
+        parser.add_argument("--quiz", type=int, default=None, help="Published quiz to play (default: create one).")
+        parser.add_argument("--questions", type=int, default=10, help="Questions in the generated quiz.")
+        parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which players join.")
+        parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause before each answer.")
+        parser.add_argument("--prefix", default="loadtest", help="Username prefix of the generated accounts.")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        if options["quiz"] is not None:
+            if not Quiz.objects.filter(pk=options["quiz"], is_published=True).exists():
+                raise CommandError("Published quiz not found.")
+            quiz_id = options["quiz"]
+        else:
+            quiz_id = prepare_quiz(options["questions"], prefix=options["prefix"]).id
+
+        from config.asgi import application
+
+        players = prepare_players(options["players"], prefix=options["prefix"])
+        report = GameplayLoadTest(
+            application, players, quiz_id,
+            ramp_up=options["ramp_up"], think_time=options["think_time"],
+        ).run()
+        summary = report.summary()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+
+        self.stdout.write(
+            f"{summary['players']} players ({summary['finished_players']} finished), "
+            f"{summary['requests']} requests in {summary['elapsed_s']:.2f}s: "
+            f"{summary['throughput_rps']:.1f} req/s, {summary['error_rate']:.2%} errors, "
+            f"{summary['queries_per_request']:.2f} queries/request"
+        )
+        for step, stats in summary["steps"].items():
+            self.stdout.write(
+                f"  {step:<7} n={stats['requests']:<6} p50={stats['p50_ms']:.1f}ms "
+                f"p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms errors={stats['errors']}"
+            )
+        self.stdout.write(f"  statuses: {summary['statuses']}")
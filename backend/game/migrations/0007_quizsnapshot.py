@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_chatroom_chatmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(verbose_name='version')),
+                ('questions', models.JSONField(default=list, verbose_name='questions')),
+                ('answer_key', models.JSONField(default=dict, verbose_name='answer key')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='game.quiz')),
+            ],
+            options={
+                'ordering': ['-version'],
+            },
+        ),
+        migrations.AddField(
+            model_name='lobbyroom',
+            name='snapshot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lobbies', to='game.quizsnapshot'),
+        ),
+        migrations.AddConstraint(
+            model_name='quizsnapshot',
+            constraint=models.UniqueConstraint(fields=('quiz', 'version'), name='uq_quiz_snapshot_version'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_chatmessage_timestamp_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['room', 'timestamp', 'id'], name='game_chatmsg_room_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+DIFFICULTY_ORDER = ['easy', 'medium', 'hard']
+
+
+def backfill_difficulty(apps, schema_editor):
+    """
+    Sets the median question difficulty of quizzes that are already published.
+    """
+    Quiz = apps.get_model('game', 'Quiz')
+    QuizQuestion = apps.get_model('game', 'QuizQuestion')
+    by_quiz = {}
+    links = QuizQuestion.objects.filter(quiz__is_published=True).values_list('quiz_id', 'question__difficulty')
+    for quiz_id, difficulty in links:
+        by_quiz.setdefault(quiz_id, []).append(difficulty)
+
+    quizzes = []
+    for quiz_id, difficulties in by_quiz.items():
+        difficulties.sort(key=DIFFICULTY_ORDER.index)
+        quizzes.append(Quiz(pk=quiz_id, difficulty=difficulties[len(difficulties) // 2]))
+    Quiz.objects.bulk_update(quizzes, ['difficulty'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0009_chatmessage_room_timestamp_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='difficulty',
+            field=models.CharField(blank=True, choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], max_length=8, verbose_name='difficulty'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-created_at', '-id'], name='game_quiz_catalog_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['difficulty', '-created_at', '-id'], name='game_quiz_catalog_diff_idx'),
+        ),
+        migrations.RunPython(backfill_difficulty, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0010_quiz_difficulty_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lobbyroom',
+            name='mode',
+            field=models.CharField(choices=[('live', 'Live'), ('prefetch', 'Prefetch')], default='live', max_length=16),
+        ),
+    ]
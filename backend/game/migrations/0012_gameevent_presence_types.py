@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:46
+
+from django.db import migrations, models
+
+
+def retype_presence_events(apps, schema_editor):
+    """
+    Presence changes used to be recorded as joins/leaves with a `reason`;
+    moves them to the new connected/disconnected types.
+    """
+    GameEvent = apps.get_model('game', 'GameEvent')
+    GameEvent.objects.filter(event_type='participant_joined', payload__reason='connected').update(
+        event_type='participant_connected'
+    )
+    GameEvent.objects.filter(
+        event_type='participant_left', payload__reason__in=['disconnected', 'timeout']
+    ).update(event_type='participant_disconnected')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0011_lobbyroom_mode'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gameevent',
+            name='event_type',
+            field=models.CharField(choices=[('lobby_created', 'Lobby created'), ('lobby_started', 'Lobby started'), ('lobby_ended', 'Lobby ended'), ('status_changed', 'Status changed'), ('participant_joined', 'Participant joined'), ('participant_left', 'Participant left'), ('participant_connected', 'Participant connected'), ('participant_disconnected', 'Participant disconnected')], max_length=32),
+        ),
+        migrations.RunPython(retype_presence_events, migrations.RunPython.noop),
+    ]
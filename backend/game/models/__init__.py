@@ -10,6 +10,7 @@ from .answers import Answer
 from .events import GameEvent
 from .participation import QuizParticipation
 from .chat import ChatRoom, ChatMessage
+from .snapshots import QuizSnapshot
 
 __all__ = [
     # Question bank
@@ -17,6 +18,7 @@ __all__ = [
     "Question",
     "Quiz",
     "QuizQuestion",
+    "QuizSnapshot",
     # Lobby / live session
     "LobbyRoom",
     "LobbyBan",
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -30,10 +31,15 @@ class ChatMessage(models.Model):
         related_name="chat_messages",
     )
     message = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the message is sent, not when the write-behind flusher inserts it
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ["timestamp"]
+        indexes = [
+            # History pages are keyset scans of one room by (timestamp, id)
+            models.Index(fields=["room", "timestamp", "id"], name="game_chatmsg_room_ts_idx"),
+        ]
 
     def __str__(self):
         return f"[{self.room.name}] {self.user.username}: {self.message[:30]}"
\ No newline at end of file
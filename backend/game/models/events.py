@@ -15,6 +15,9 @@ class GameEvent(models.Model):
         STATUS_CHANGED = "status_changed", _("Status changed")
         PARTICIPANT_JOINED = "participant_joined", _("Participant joined")
         PARTICIPANT_LEFT = "participant_left", _("Participant left")
+        # Socket presence, as opposed to lobby membership
+        PARTICIPANT_CONNECTED = "participant_connected", _("Participant connected")
+        PARTICIPANT_DISCONNECTED = "participant_disconnected", _("Participant disconnected")
 
     event_type = models.CharField(
         max_length=32,
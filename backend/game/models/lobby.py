@@ -4,20 +4,32 @@ from django.db.models import UniqueConstraint
 from django.db.models.functions import Lower
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from model_utils import FieldTracker
+
 from .questions import Quiz, QuizQuestion
+from .tracking import SaveChangedFieldsMixin
 
 
-class LobbyRoom(models.Model):
+class LobbyRoom(SaveChangedFieldsMixin, models.Model):
     class Status(models.TextChoices):
         PENDING = "pending", _("Pending")
         RUNNING = "running", _("Running")
         PAUSED = "paused", _("Paused")
         ENDED = "ended", _("Ended")
 
+    class Mode(models.TextChoices):
+        LIVE = "live", _("Live")
+        PREFETCH = "prefetch", _("Prefetch")
+
     code = models.CharField(max_length=12, unique=True, verbose_name=_("join code"))
     quiz = models.ForeignKey(Quiz, on_delete=models.PROTECT, related_name="lobbies")
+    snapshot = models.ForeignKey(
+        "QuizSnapshot", null=True, blank=True, on_delete=models.SET_NULL, related_name="lobbies"
+    )
     host = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="hosted_lobbies")
     status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    # Prefetch runs rebuild their release schedule from `started_at` and the snapshot timers
+    mode = models.CharField(max_length=16, choices=Mode.choices, default=Mode.LIVE)
 
     current_q = models.ForeignKey(QuizQuestion, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
     question_started_at = models.DateTimeField(null=True, blank=True)
@@ -33,12 +45,24 @@ class LobbyRoom(models.Model):
         settings.AUTH_USER_MODEL, through="LobbyBan", related_name="banned_from_lobbies", blank=True
     )
 
+    # Previous values for signal handlers and partial saves, without a SELECT
+    tracker = FieldTracker()
+
     class Meta:
         ordering = ["-created_at"]
 
     def __str__(self):
         return f"{self.code} — {self.quiz.title}"
 
+    def save(self, *args, **kwargs):
+        if self.pk is not None and self.tracker.has_changed("status"):
+            # Set lifecycle timestamps if not provided
+            if self.status == self.Status.RUNNING and not self.started_at:
+                self.started_at = timezone.now()
+            if self.status == self.Status.ENDED and not self.ended_at:
+                self.ended_at = timezone.now()
+        super().save(*args, **kwargs)
+
 
 class LobbyBan(models.Model):
     lobby = models.ForeignKey(LobbyRoom, on_delete=models.CASCADE, related_name="bans")
@@ -52,7 +76,7 @@ class LobbyBan(models.Model):
         ]
 
 
-class LobbyParticipant(models.Model):
+class LobbyParticipant(SaveChangedFieldsMixin, models.Model):
     lobby = models.ForeignKey(LobbyRoom, on_delete=models.CASCADE, related_name="participants")
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="lobby_participations"
@@ -72,6 +96,8 @@ class LobbyParticipant(models.Model):
     joined_at = models.DateTimeField(auto_now_add=True)
     left_at = models.DateTimeField(null=True, blank=True)
 
+    tracker = FieldTracker()
+
     class Meta:
         ordering = ["-score", "joined_at"]
         constraints = [
@@ -80,3 +106,18 @@ class LobbyParticipant(models.Model):
 
     def __str__(self):
         return f"{self.nickname} @ {self.lobby.code}"
+
+    @property
+    def is_leaving(self) -> bool:
+        """True when unsaved changes disconnect the participant or mark them as left."""
+        if self.pk is None:
+            return False
+        return (
+            (self.tracker.previous("connected") and not self.connected)
+            or (self.tracker.previous("left_at") is None and self.left_at is not None)
+        )
+
+    def save(self, *args, **kwargs):
+        if self.is_leaving and self.left_at is None:
+            self.left_at = timezone.now()
+        super().save(*args, **kwargs)
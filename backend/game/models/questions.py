@@ -54,6 +54,18 @@ class Question(models.Model):
         return f"[{self.get_type_display()}] {self.text[:60]}"
 
 
+class QuizQuerySet(models.QuerySet):
+    def with_admin_relations(self):
+        """Everything QuizAdminSerializer reads, in a fixed number of queries."""
+        return self.select_related("host").prefetch_related(
+            "tags",
+            models.Prefetch(
+                "quiz_questions",
+                queryset=QuizQuestion.objects.select_related("question").prefetch_related("question__tags"),
+            ),
+        )
+
+
 class Quiz(models.Model):
     host = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="quizzes"
@@ -66,14 +78,30 @@ class Quiz(models.Model):
     # Newly added fields
     publish_date = models.DateTimeField(null=True, blank=True, verbose_name=_("publish date"))
     available_to_date = models.DateTimeField(null=True, blank=True, verbose_name=_("available to date"))
+    # Median difficulty of the questions, set when the quiz is published
+    difficulty = models.CharField(
+        max_length=8, choices=Question.Difficulty.choices, blank=True, verbose_name=_("difficulty")
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     questions = models.ManyToManyField(Question, through="QuizQuestion", related_name="quizzes")
 
+    objects = QuizQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pages of the published catalog, unfiltered and by difficulty
+            models.Index(
+                fields=["-created_at", "-id"], name="game_quiz_catalog_idx", condition=models.Q(is_published=True)
+            ),
+            models.Index(
+                fields=["difficulty", "-created_at", "-id"], name="game_quiz_catalog_diff_idx",
+                condition=models.Q(is_published=True),
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -0,0 +1,29 @@
+from django.db import models
+from django.db.models import UniqueConstraint
+from django.utils.translation import gettext_lazy as _
+from .questions import Quiz
+
+
+class QuizSnapshot(models.Model):
+    """
+    An immutable, compiled copy of a quiz taken when it is published.
+    Gameplay reads this single row instead of walking QuizQuestion/Question.
+
+    `questions` is the ordered public payload (never contains answer keys);
+    `answer_key` maps each quiz question id to what is needed for grading.
+    """
+
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="snapshots")
+    version = models.PositiveIntegerField(verbose_name=_("version"))
+    questions = models.JSONField(default=list, verbose_name=_("questions"))
+    answer_key = models.JSONField(default=dict, verbose_name=_("answer key"))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-version"]
+        constraints = [
+            UniqueConstraint(fields=["quiz", "version"], name="uq_quiz_snapshot_version"),
+        ]
+
+    def __str__(self):
+        return f"{self.quiz.title} v{self.version}"
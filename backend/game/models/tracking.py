@@ -0,0 +1,18 @@
+class SaveChangedFieldsMixin:
+    """
+    For models with a `tracker = FieldTracker()`: save() on an existing row
+    writes only the columns changed since it was loaded (or last saved),
+    and skips the UPDATE entirely when nothing changed. Passing
+    `update_fields` explicitly keeps Django's default behaviour.
+    """
+
+    def save(self, *args, **kwargs):
+        if (
+            self.pk is not None
+            and not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+            and not args
+        ):
+            kwargs["update_fields"] = list(self.tracker.changed())
+        super().save(*args, **kwargs)
@@ -0,0 +1,126 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Shared parts of the keyset paginations: `?limit=` parsing and opaque
+    cursors over (`cursor_field`, id).
+    """
+
+    page_size = 50
+    max_page_size = 100
+    cursor_field = None
+
+    def _limit(self, raw) -> int:
+        if raw is None:
+            return self.page_size
+        try:
+            return max(1, min(int(raw), self.max_page_size))
+        except ValueError:
+            raise ValidationError({"limit": "Must be an integer."})
+
+    def encode_cursor(self, obj) -> str:
+        raw = f"{getattr(obj, self.cursor_field).isoformat()}|{obj.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        try:
+            timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(timestamp), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise ValidationError({"cursor": "Invalid cursor."})
+
+
+class ChatHistoryPagination(KeysetPagination):
+    """
+    Keyset pagination over (timestamp, id), newest first.
+
+    `?before=<cursor>` pages back to older messages, `?after=<cursor>` to
+    newer ones, and `?limit=` sets the page size. Each page is a single
+    index range scan no matter how deep it is. Those requests get
+    `{"results", "before", "after"}`, where the two cursors continue the
+    scroll. Without any of these parameters the response stays the legacy
+    plain list of the newest `page_size` messages.
+    """
+
+    cursor_field = "timestamp"
+    params = ("before", "after", "limit")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        query = request.query_params
+        self.envelope = any(param in query for param in self.params)
+        limit = self._limit(query.get("limit"))
+
+        if "after" in query:
+            timestamp, pk = self.decode_cursor(query["after"])
+            newer = Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk)
+            rows = list(queryset.filter(newer, timestamp__gte=timestamp).order_by("timestamp", "id")[: limit + 1])
+            self.has_newer, self.has_older = len(rows) > limit, True
+            page = rows[:limit][::-1]
+        else:
+            if "before" in query:
+                timestamp, pk = self.decode_cursor(query["before"])
+                older = Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk)
+                # The redundant range keeps the scan on the (room, timestamp, id) index
+                queryset = queryset.filter(older, timestamp__lte=timestamp)
+            rows = list(queryset.order_by("-timestamp", "-id")[: limit + 1])
+            self.has_older, self.has_newer = len(rows) > limit, "before" in query
+            page = rows[:limit]
+
+        self.page = page
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.envelope:
+            return Response(data)
+        return Response({
+            "results": data,
+            "before": self.encode_cursor(self.page[-1]) if self.page and self.has_older else None,
+            "after": self.encode_cursor(self.page[0]) if self.page else None,
+        })
+
+
+class QuizCatalogPagination(KeysetPagination):
+    """
+    Keyset pagination of the published-quiz catalog over (created_at, id),
+    newest first. `?limit=` starts paging and `?cursor=` continues from the
+    `next` cursor of the previous page; those requests get
+    `{"results", "next"}`. Without either parameter the response stays the
+    legacy plain list, capped at the newest `max_page_size` matching quizzes.
+    """
+
+    page_size = 20
+    cursor_field = "created_at"
+    params = ("cursor", "limit")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        query = request.query_params
+        self.envelope = any(param in query for param in self.params)
+        if not self.envelope:
+            self.page = list(queryset.order_by("-created_at", "-id")[: self.max_page_size])
+            return self.page
+        limit = self._limit(query.get("limit"))
+
+        if "cursor" in query:
+            created_at, pk = self.decode_cursor(query["cursor"])
+            older = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            queryset = queryset.filter(older, created_at__lte=created_at)
+        rows = list(queryset.order_by("-created_at", "-id")[: limit + 1])
+        self.has_next = len(rows) > limit
+        self.page = rows[:limit]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.envelope:
+            return Response(data)
+        return Response({
+            "results": data,
+            "next": self.encode_cursor(self.page[-1]) if self.has_next else None,
+        })
@@ -4,4 +4,5 @@ from . import consumers
 websocket_urlpatterns = [
     re_path(r"ws/notifications/$", consumers.NotificationConsumer.as_asgi()),
     re_path(r"ws/chat/(?P<room_id>\d+)/$", consumers.ChatConsumer.as_asgi()),
+    re_path(r"ws/lobby/(?P<lobby_id>\d+)/$", consumers.GameConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -9,6 +9,7 @@ class ChatMessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ChatMessage
         fields = ["id", "user_username", "message", "timestamp"]
+        read_only_fields = ["timestamp"]
 
 
 class ChatRoomSerializer(serializers.ModelSerializer):
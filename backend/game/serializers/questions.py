@@ -2,6 +2,7 @@ import bleach
 from rest_framework import serializers
 from ..models import Question, Tag
 from .tags import TagSerializer
+from ..evaluation import compile_pattern, InvalidPattern
 
 class QuestionPublicSerializer(serializers.ModelSerializer):
     """Public/player-facing serializer: never exposes answer_key."""
@@ -83,5 +84,11 @@ class QuestionAdminSerializer(serializers.ModelSerializer):
             mode = answer_key.get("mode", "casefold")
             if mode not in {"exact", "casefold", "regex"}:
                 raise serializers.ValidationError({"answer_key": "mode must be 'exact', 'casefold', or 'regex'."})
+            if mode == "regex":
+                for pattern in accepted:
+                    try:
+                        compile_pattern(pattern)
+                    except InvalidPattern as ex:
+                        raise serializers.ValidationError({"answer_key": f"Invalid pattern {pattern!r}: {ex}"})
 
         return attrs
\ No newline at end of file
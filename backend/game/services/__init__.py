@@ -6,5 +6,10 @@ can still do: from game.services import LobbyService, ...
 from .lobby_service import LobbyService
 from .answer_service import AnswerService
 from .history_service import HistoryService
+from .snapshot_service import SnapshotService
+from .leaderboard_service import LeaderboardService
+from .regrade_service import RegradeService
+from .notifications import NotificationService
+from .quiz_catalog import QuizCatalog
 
-__all__ = ["LobbyService", "AnswerService", "HistoryService"]
\ No newline at end of file
+__all__ = ["LobbyService", "AnswerService", "HistoryService", "SnapshotService", "LeaderboardService", "RegradeService", "NotificationService", "QuizCatalog"]
\ No newline at end of file
@@ -0,0 +1,75 @@
+import json
+import threading
+from collections import defaultdict
+
+from .redis_client import get_redis
+
+
+class AnswerIngestor:
+    """
+    Buffers answers per lobby and question window instead of writing each
+    one in its own transaction. When the window closes (the lobby moves on
+    or ends) the window is drained and handed to the write-behind buffer as
+    one batch: a single bulk_create plus a single score UPDATE, so the DB
+    round trips scale with lobbies rather than players.
+
+    Windows live in Redis lists when the cache is Redis, so answers taken by
+    any worker are drained together; otherwise they are kept in-process.
+    """
+
+    WINDOW_KEY = "quizarrow:answers:{lobby_id}:{quiz_question_id}"
+    WINDOW_TTL = 6 * 60 * 60
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.redis = get_redis()
+        self._windows = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, **fields):
+        """Queues one graded answer in its lobby/question window."""
+        key = self.WINDOW_KEY.format(lobby_id=fields["lobby_id"], quiz_question_id=fields["quiz_question_id"])
+        if self.redis is None:
+            with self._lock:
+                self._windows[key].append(fields)
+            return
+        pipe = self.redis.pipeline()
+        pipe.rpush(key, json.dumps(fields))
+        pipe.expire(key, self.WINDOW_TTL)
+        pipe.execute()
+
+    def close_window(self, lobby_id: int, quiz_question_id: int) -> int:
+        return self.close_windows([(lobby_id, quiz_question_id)])
+
+    def close_windows(self, windows) -> int:
+        """
+        Drains the given (lobby_id, quiz_question_id) windows and queues their
+        answers for persistence. Returns how many answers were drained.
+        """
+        keys = [self.WINDOW_KEY.format(lobby_id=l, quiz_question_id=q) for l, q in windows]
+        if not keys:
+            return 0
+
+        if self.redis is None:
+            with self._lock:
+                rows = [row for key in keys for row in self._windows.pop(key, [])]
+        else:
+            pipe = self.redis.pipeline()
+            for key in keys:
+                pipe.lrange(key, 0, -1)
+                pipe.delete(key)
+            drained = pipe.execute()[::2]
+            rows = [json.loads(raw) for chunk in drained for raw in chunk]
+
+        # Uniqueness is already enforced by the answered set; this is the
+        # in-memory safety net before the bulk insert.
+        seen, unique = set(), []
+        for row in rows:
+            slot = (row["participant_id"], row["quiz_question_id"])
+            if slot not in seen:
+                seen.add(slot)
+                unique.append(row)
+
+        if unique:
+            self.writer.put(("answers", None, unique))
+        return len(unique)
@@ -1,9 +1,16 @@
-from django.utils import timezone
-from django.db import transaction, IntegrityError
+import time
+
+from django.db import transaction
+from django.db.models import F
 from rest_framework.exceptions import ValidationError, PermissionDenied
 
-from ..models import LobbyRoom, LobbyParticipant, Answer, Question
+from ..evaluation import answer_evaluator
+from ..models import Answer, LobbyRoom, LobbyParticipant
+from .broadcast import LobbyBroadcaster
 from .history_service import HistoryService
+from .hot_state import lobby_state_store
+from .lobby_service import LobbyService
+from .prefetch_service import PrefetchService
 
 
 class AnswerService:
@@ -11,34 +18,11 @@ class AnswerService:
     Encapsulates business logic for submitting and evaluating answers.
     """
 
-    def _evaluate_answer(self, question: Question, payload: dict):
-        """
-        Evaluates a user's answer payload against the question's answer key.
-        """
-        key = question.answer_key
-        if not payload:
-            return False
-
-        if question.type == Question.Type.MCQ:
-            return key.get("correct_index") == payload.get("index")
-
-        if question.type == Question.Type.TRUE_FALSE:
-            return key.get("is_true") == payload.get("answer")
-
-        if question.type == Question.Type.SHORT_TEXT:
-            submitted_answer = (payload.get("answer") or "").strip()
-            if not submitted_answer:
-                return False
-
-            accepted_answers = key.get("accepted", [])
-            mode = key.get("mode", "casefold")
-
-            if mode == "exact":
-                return submitted_answer in accepted_answers
-            elif mode == "casefold":
-                return submitted_answer.casefold() in [ans.casefold() for ans in accepted_answers]
-
-        return False
+    def __init__(self):
+        self.store = lobby_state_store
+        self.broadcaster = LobbyBroadcaster()
+        self.evaluator = answer_evaluator
+        self.prefetch = PrefetchService()
 
     @transaction.atomic
     def submit_answer(self, lobby_id: int, user, payload: dict):
@@ -46,82 +30,197 @@ class AnswerService:
         Processes a user's answer submission for the current question.
         Scores the answer, updates state, and advances to the next question.
         """
-        try:
-            lobby = LobbyRoom.objects.select_related("current_q__question").get(pk=lobby_id, host=user)
-            participant = LobbyParticipant.objects.get(lobby=lobby, user=user)
-        except (LobbyRoom.DoesNotExist, LobbyParticipant.DoesNotExist):
+        state = self.store.load(lobby_id)
+        participant_id = state and state["participants"].get(user.id)
+        if not participant_id:
             raise PermissionDenied("You are not in this lobby.")
 
-        if lobby.status != LobbyRoom.Status.RUNNING:
+        if state["status"] != LobbyRoom.Status.RUNNING:
             raise ValidationError("Lobby is not active.")
-        if not lobby.current_q or not lobby.question_started_at:
+        if not isinstance(payload, dict):
+            raise ValidationError("Answer must be an object.")
+        if PrefetchService.is_prefetch(state):
+            return self._submit_prefetched(state, participant_id, payload)
+
+        question = self.store.current_question(state)
+        if not question or state["started_at"] is None:
             raise ValidationError("No question is currently active.")
 
+        if not self.store.mark_answered(lobby_id, participant_id, question["id"]):
+            raise ValidationError("You have already answered this question.")
+
         # --- Time validation ---
-        duration = lobby.current_q.effective_timer()
-        elapsed = (timezone.now() - lobby.question_started_at).total_seconds()
-        if elapsed > duration:
+        elapsed = time.time() - state["started_at"]
+        evaluation = {}
+        if elapsed > question["timer"]:
+            # Late answers are recorded but never score (regrades skip them too)
             is_correct = False
             points = 0
-            # Create a record for the late answer
-            Answer.objects.create(
-                lobby=lobby,
-                participant=participant,
-                quiz_question=lobby.current_q,
-                payload=payload,
-                is_correct=False,
-                points_awarded=0,
-                response_time_ms=int(elapsed * 1000)
-            )
+            evaluation = {"late": True}
         else:
             # --- Answer Evaluation ---
-            question = lobby.current_q.question
-            is_correct = self._evaluate_answer(question, payload)
-            points = lobby.current_q.effective_points() if is_correct else 0
-
-            # Update participant score
-            participant.score += points
-            participant.save(update_fields=["score"])
-
-            # Create Answer record
-            try:
-                Answer.objects.create(
-                    lobby=lobby,
-                    participant=participant,
-                    quiz_question=lobby.current_q,
-                    payload=payload,
-                    is_correct=is_correct,
-                    points_awarded=points,
-                    response_time_ms=int(elapsed * 1000)
-                )
-            except IntegrityError:
-                raise ValidationError("You have already answered this question.")
-
-        # --- Advance to Next Question or End ---
-        current_order = lobby.current_q.order
-        next_q = (
-            lobby.quiz.quiz_questions.filter(order__gt=current_order)
-            .order_by("order")
-            .first()
+            is_correct = self.evaluator.evaluate(question, payload)
+            points = question["points"] if is_correct else 0
+
+        score = self.store.add_score(lobby_id, participant_id, points)
+        self.store.record_answer(
+            lobby_id=lobby_id,
+            participant_id=participant_id,
+            quiz_question_id=question["id"],
+            payload=payload,
+            is_correct=is_correct,
+            points_awarded=points,
+            evaluation=evaluation,
+            response_time_ms=int(elapsed * 1000),
+        )
+        self.store.leaderboard.add(lobby_id, participant_id, points)
+        self.broadcaster.score_updated(
+            lobby_id, participant_id, score, self.store.leaderboard.rank(lobby_id, participant_id)
         )
 
-        if next_q:
-            lobby.current_q = next_q
-            lobby.question_started_at = timezone.now()
-            lobby.save()
-            return {"status": "next_question", "score": participant.score}
+        # --- Advance to Next Question or End ---
+        if not self.store.claim_advance(lobby_id, state["index"]):
+            # The deadline scheduler moved the lobby on in the meantime and may
+            # already have drained this window; drain whatever we added after.
+            self.store.answers.close_window(lobby_id, question["id"])
+            state = self.store.load(lobby_id)
+            if state["status"] == LobbyRoom.Status.RUNNING:
+                return {"status": "next_question", "score": score}
+            return {"status": state["status"], "score": score}
+
+        next_index = state["index"] + 1
+        lobby_service = LobbyService()
+        if next_index < len(state["questions"]):
+            lobby_service.start_question(state, next_index)
+            return {"status": "next_question", "score": score}
+
+        # End of quiz
+        return self._finish(lobby_service, state, participant_id)
+
+    def _submit_prefetched(self, state: dict, participant_id: int, payload: dict):
+        """
+        Scores one answer of a prefetch run. The payload names the question
+        and carries its release token; the run ends once every question has
+        been answered (or by the deadline scheduler).
+        """
+        lobby_id = state["lobby_id"]
+        payload = dict(payload)
+        quiz_question_id = payload.pop("quiz_question_id", None)
+        release, deadline = self.prefetch.verify(state, quiz_question_id, payload.pop("release_token", None))
+        question = next(q for q in state["questions"] if q["id"] == int(quiz_question_id))
+
+        if not self.store.mark_answered(lobby_id, participant_id, question["id"]):
+            raise ValidationError("You have already answered this question.")
+
+        now = time.time()
+        evaluation = {}
+        if now > self.prefetch.answer_deadline(deadline):
+            is_correct, points, evaluation = False, 0, {"late": True}
         else:
-            # End of quiz
-            lobby.status = LobbyRoom.Status.ENDED
-            lobby.ended_at = timezone.now()
-            lobby.current_q = None
-            lobby.question_started_at = None
-            lobby.save()
-
-            # Create historical participation record
-            history_service = HistoryService()
-            participation = history_service.create_participation_record(
-                lobby=lobby,
-                participant=participant,
-            )
-            return {"status": "finished", "score": participant.score, "participation_id": participation.id}
\ No newline at end of file
+            is_correct = self.evaluator.evaluate(question, payload)
+            points = question["points"] if is_correct else 0
+
+        score = self.store.add_score(lobby_id, participant_id, points)
+        self.store.record_answers([{
+            "lobby_id": lobby_id,
+            "participant_id": participant_id,
+            "quiz_question_id": question["id"],
+            "payload": payload,
+            "is_correct": is_correct,
+            "points_awarded": points,
+            "evaluation": evaluation,
+            "response_time_ms": int(max(0, now - release) * 1000),
+        }])
+        self.store.leaderboard.add(lobby_id, participant_id, points)
+
+        if not self.store.all_answered(state, participant_id) or not self.store.claim_advance(lobby_id, None):
+            return {"status": "answered", "score": score}
+        return self._finish(LobbyService(), state, participant_id)
+
+    @transaction.atomic
+    def submit_run(self, lobby_id: int, user, answers: list):
+        """
+        Grades a whole prefetch run in one pass and closes it. Each item names
+        its question and carries the release token. Answer times are taken
+        from the server: an answer only scores if the batch arrives before
+        that question's recorded deadline, and response times are measured
+        from the recorded release. Answers are inserted with one bulk_create
+        and the participation is created in the same transaction.
+        """
+        state = self.store.load(lobby_id)
+        participant_id = state and state["participants"].get(user.id)
+        if not participant_id:
+            raise PermissionDenied("You are not in this lobby.")
+        if state["status"] != LobbyRoom.Status.RUNNING:
+            raise ValidationError("Lobby is not active.")
+        if not PrefetchService.is_prefetch(state):
+            raise ValidationError("Only prefetch runs can be submitted in one batch.")
+        if not isinstance(answers, list) or len(answers) > len(state["questions"]):
+            raise ValidationError("answers must be a list with at most one entry per question.")
+
+        now = time.time()
+        questions = {q["id"]: q for q in state["questions"]}
+        # Validate the whole batch before claiming any answer slot
+        parsed = []
+        for item in answers:
+            if not isinstance(item, dict):
+                raise ValidationError("Each answer must be an object.")
+            payload = dict(item)
+            quiz_question_id = payload.pop("quiz_question_id", None)
+            release, deadline = self.prefetch.verify(state, quiz_question_id, payload.pop("release_token", None))
+            # Client clocks are not trusted; older clients still send this
+            payload.pop("answered_at", None)
+            parsed.append((questions[int(quiz_question_id)], payload, release, deadline))
+
+        # Close the run before marking anything answered: a run that already
+        # ended must not leave answered marks behind in the cache
+        if not self.store.claim_advance(lobby_id, None):
+            raise ValidationError("This run has already ended.")
+
+        rows, total = [], 0
+        for question, payload, release, deadline in parsed:
+            # Answers already submitted one by one keep their first grading
+            if not self.store.mark_answered(lobby_id, participant_id, question["id"]):
+                continue
+
+            evaluation = {}
+            # Lateness is decided by when the server received the batch
+            if now > self.prefetch.answer_deadline(deadline):
+                is_correct, points, evaluation = False, 0, {"late": True}
+            else:
+                is_correct = self.evaluator.evaluate(question, payload)
+                points = question["points"] if is_correct else 0
+            total += points
+            rows.append(Answer(
+                lobby_id=lobby_id,
+                participant_id=participant_id,
+                quiz_question_id=question["id"],
+                payload=payload,
+                is_correct=is_correct,
+                points_awarded=points,
+                evaluation=evaluation,
+                response_time_ms=int(max(0, now - release) * 1000),
+            ))
+
+        Answer.objects.bulk_create(rows, ignore_conflicts=True)
+        if total:
+            LobbyParticipant.objects.filter(pk=participant_id).update(score=F("score") + total)
+            self.store.add_score(lobby_id, participant_id, total)
+            self.store.leaderboard.add(lobby_id, participant_id, total)
+        result = self._finish(LobbyService(), state, participant_id)
+        return {**result, "graded": len(rows)}
+
+    def _finish(self, lobby_service: LobbyService, state: dict, participant_id: int):
+        lobby = lobby_service.end_lobby(state)
+        participant = LobbyParticipant.objects.get(pk=participant_id)
+        # The hot-state score is complete even if the final flush was deferred
+        score = self.store.get_score(state["lobby_id"], participant_id)
+
+        # Create historical participation record
+        history_service = HistoryService()
+        participation = history_service.create_participation_record(
+            lobby=lobby,
+            participant=participant,
+            final_score=score,
+        )
+        return {"status": "finished", "score": score, "participation_id": participation.id}
@@ -0,0 +1,44 @@
+import json
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+
+class LobbyBroadcaster:
+    """
+    Pushes gameplay events to everyone connected to a lobby's GameConsumer.
+    Events are sent after the surrounding transaction commits, so clients
+    never hear about state that could still be rolled back.
+    """
+
+    GROUP_NAME = "lobby_{lobby_id}"
+
+    @classmethod
+    def group_name(cls, lobby_id: int) -> str:
+        return cls.GROUP_NAME.format(lobby_id=lobby_id)
+
+    def question_started(self, state: dict):
+        question = state["questions"][state["index"]]
+        self._send(state["lobby_id"], "question.started", {
+            "question": question["payload"],
+            "deadline": state["started_at"] + question["timer"],
+            "time_left": max(0, question["timer"] - (time.time() - state["started_at"])),
+        })
+
+    def score_updated(self, lobby_id: int, participant_id: int, score: int, rank: int | None = None):
+        self._send(lobby_id, "score.updated", {"participant_id": participant_id, "score": score, "rank": rank})
+
+    def game_ended(self, lobby_id: int, status: str):
+        self._send(lobby_id, "game.ended", {"status": status})
+
+    def _send(self, lobby_id: int, event_type: str, payload: dict):
+        channel_layer = get_channel_layer()
+        if not channel_layer:
+            return
+        # Encoded once here; consumers forward the text to every socket as is
+        message = {"type": event_type, "text": json.dumps({"type": event_type, "payload": payload})}
+        transaction.on_commit(
+            lambda: async_to_sync(channel_layer.group_send)(self.group_name(lobby_id), message)
+        )
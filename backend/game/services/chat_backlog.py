@@ -0,0 +1,168 @@
+import json
+import threading
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from ..models import ChatMessage
+from .redis_client import get_redis
+
+
+class ChatBacklog:
+    """
+    The last CHAT_BACKLOG_SIZE messages of each room, numbered with a
+    per-room sequence, kept by the chat broadcast path so a connecting
+    socket can replay recent history (or resume after a reconnect) without
+    a REST call or a Postgres query.
+
+    In Redis each room is a sorted set scored by sequence number, appended
+    to and trimmed by one script; otherwise rooms are kept in-process.
+    A room without a backlog (never used, expired after CHAT_BACKLOG_TTL,
+    or lost with a restart) is first filled with its latest messages from
+    Postgres, so the replay never starts from an empty ring.
+    """
+
+    KEY = "quizarrow:chat-backlog:{room_id}"
+    SEQ_KEY = "quizarrow:chat-seq:{room_id}"
+    # Returns -1 when the room's backlog has to be filled first
+    APPEND_SCRIPT = """
+        if redis.call('EXISTS', KEYS[2]) == 0 then
+            return -1
+        end
+        local seq = redis.call('INCR', KEYS[2])
+        redis.call('ZADD', KEYS[1], seq, seq .. ':' .. ARGV[1])
+        redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -tonumber(ARGV[2]) - 1)
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        redis.call('EXPIRE', KEYS[2], ARGV[3])
+        return seq
+    """
+    # Installs entries 1..n unless another process filled the room first
+    FILL_SCRIPT = """
+        if redis.call('EXISTS', KEYS[2]) == 1 then
+            return 0
+        end
+        for i = 1, #ARGV - 1 do
+            redis.call('ZADD', KEYS[1], i, i .. ':' .. ARGV[i])
+        end
+        redis.call('SET', KEYS[2], #ARGV - 1, 'EX', ARGV[#ARGV])
+        redis.call('EXPIRE', KEYS[1], ARGV[#ARGV])
+        return 1
+    """
+
+    def __init__(self):
+        self.redis = get_redis()
+        self._append = self.redis.register_script(self.APPEND_SCRIPT) if self.redis is not None else None
+        self._fill = self.redis.register_script(self.FILL_SCRIPT) if self.redis is not None else None
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def append(self, room_id, entry: dict) -> int:
+        """Adds a message to the room's backlog and returns its sequence number."""
+        if self.redis is None:
+            if room_id not in self._rooms:
+                self.fill(room_id)
+            with self._lock:
+                seq, entries = self._rooms[room_id]
+                seq += 1
+                entries.append({**entry, "seq": seq})
+                self._rooms[room_id] = (seq, entries)
+            return seq
+        keys = [self.KEY.format(room_id=room_id), self.SEQ_KEY.format(room_id=room_id)]
+        args = [json.dumps(entry), settings.CHAT_BACKLOG_SIZE, settings.CHAT_BACKLOG_TTL]
+        seq = int(self._append(keys=keys, args=args))
+        if seq < 0:
+            self.fill(room_id)
+            seq = int(self._append(keys=keys, args=args))
+        return seq
+
+    async def aappend(self, room_id, entry: dict) -> int:
+        return await self._arun(self.append, room_id, entry)
+
+    def fill(self, room_id):
+        """Seeds an empty backlog with the room's latest stored messages."""
+        rows = (
+            ChatMessage.objects.filter(room_id=room_id)
+            .order_by("-timestamp", "-id")
+            .values_list("message", "user__username", "timestamp")[: settings.CHAT_BACKLOG_SIZE]
+        )
+        entries = [
+            {"message": message, "user_username": username, "timestamp": timestamp.isoformat()}
+            for message, username, timestamp in reversed(rows)
+        ]
+        if self.redis is None:
+            with self._lock:
+                if room_id not in self._rooms:
+                    ring = deque(
+                        ({**entry, "seq": seq} for seq, entry in enumerate(entries, 1)),
+                        maxlen=settings.CHAT_BACKLOG_SIZE,
+                    )
+                    self._rooms[room_id] = (len(entries), ring)
+            return
+        self._fill(
+            keys=[self.KEY.format(room_id=room_id), self.SEQ_KEY.format(room_id=room_id)],
+            args=[*(json.dumps(entry) for entry in entries), settings.CHAT_BACKLOG_TTL],
+        )
+
+    def replay(self, room_id, since: int | None = None) -> dict:
+        """
+        Backlogged messages, oldest first: all of them, or only those after
+        sequence `since`. `truncated` tells the client that messages it
+        asked for are no longer in the backlog (it should fall back to the
+        history endpoint).
+        """
+        if self.redis is None:
+            if room_id not in self._rooms:
+                self.fill(room_id)
+            with self._lock:
+                latest, entries = self._rooms[room_id]
+                entries = list(entries)
+        else:
+            raw_latest, members = self._read(room_id)
+            if raw_latest is None:
+                self.fill(room_id)
+                raw_latest, members = self._read(room_id)
+            latest = int(raw_latest or 0)
+            entries = []
+            for member in members:
+                seq, _, raw = member.decode().partition(":")
+                entries.append({**json.loads(raw), "seq": int(seq)})
+
+        truncated = False
+        if since is not None:
+            if since > latest:
+                # The sequence was reset (backlog expired): replay everything
+                truncated = True
+            else:
+                entries = [entry for entry in entries if entry["seq"] > since]
+                truncated = since < latest and (not entries or entries[0]["seq"] != since + 1)
+        return {"messages": entries, "seq": latest, "truncated": truncated}
+
+    async def areplay(self, room_id, since: int | None = None) -> dict:
+        return await self._arun(self.replay, room_id, since)
+
+    def _read(self, room_id):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self.SEQ_KEY.format(room_id=room_id))
+        pipe.zrange(self.KEY.format(room_id=room_id), 0, -1)
+        return pipe.execute()
+
+    async def _arun(self, method, room_id, *args):
+        """Stays on the event loop for in-process rooms that are already loaded."""
+        if self.redis is None:
+            if room_id in self._rooms:
+                return method(room_id, *args)
+            # Loading the room reads Postgres
+            return await database_sync_to_async(method)(room_id, *args)
+        return await sync_to_async(method, thread_sensitive=False)(room_id, *args)
+
+    def clear(self, room_id):
+        if self.redis is None:
+            with self._lock:
+                self._rooms.pop(room_id, None)
+            return
+        self.redis.delete(self.KEY.format(room_id=room_id), self.SEQ_KEY.format(room_id=room_id))
+
+
+chat_backlog = ChatBacklog()
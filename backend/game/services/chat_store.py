@@ -0,0 +1,273 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils.dateparse import parse_datetime
+
+from ..models import ChatMessage, ChatRoom
+from .redis_client import get_redis
+from .write_behind import WriteBehindBuffer
+
+logger = logging.getLogger("game")
+
+
+def _write_messages(rows, skip_existing: bool = False):
+    """
+    Inserts staged chat messages with one bulk_create. Messages whose room
+    or author was deleted in the meantime are dropped instead of failing
+    the batch. With `skip_existing`, rows already in the table (same room,
+    author, timestamp and text) are left out: a batch re-delivered after a
+    crash may have been written once already.
+    """
+    messages = [
+        ChatMessage(
+            room_id=row["room_id"], user_id=row["user_id"], message=row["message"],
+            timestamp=parse_datetime(row["timestamp"]),
+        )
+        for row in rows
+    ]
+    if skip_existing and messages:
+        existing = set(
+            ChatMessage.objects.filter(
+                room_id__in={m.room_id for m in messages},
+                timestamp__in={m.timestamp for m in messages},
+            ).values_list("room_id", "user_id", "timestamp", "message")
+        )
+        messages = [m for m in messages if (m.room_id, m.user_id, m.timestamp, m.message) not in existing]
+
+    try:
+        with transaction.atomic():
+            ChatMessage.objects.bulk_create(messages)
+        return
+    except IntegrityError:
+        pass
+
+    room_ids = set(ChatRoom.objects.filter(pk__in={m.room_id for m in messages}).values_list("pk", flat=True))
+    user_model = ChatMessage._meta.get_field("user").related_model
+    user_ids = set(user_model.objects.filter(pk__in={m.user_id for m in messages}).values_list("pk", flat=True))
+    ChatMessage.objects.bulk_create([m for m in messages if m.room_id in room_ids and m.user_id in user_ids])
+
+
+class ChatMessageStore:
+    """
+    Takes chat persistence off the message path: the consumer broadcasts
+    right away and stages the message here, and a background flusher
+    writes staged messages in batches with bulk_create.
+
+    With Redis, messages are staged in a stream read through a consumer
+    group. Entries are acknowledged only after they are written, and
+    entries left pending by a crashed process are claimed by another
+    flusher once they have been idle for CHAT_STREAM_CLAIM_IDLE seconds,
+    so a crash loses nothing. A retaken batch that fails again is written
+    message by message; a message the database keeps rejecting is moved
+    to a dead-letter stream once it was delivered CHAT_STREAM_MAX_DELIVERIES
+    times. Without Redis an in-process write-behind buffer is used, flushed
+    on exit.
+    """
+
+    STREAM_KEY = "quizarrow:chat-stream"
+    DEAD_LETTER_KEY = "quizarrow:chat-stream:dead-letter"
+    # Failures caused by the message itself rather than the database being unavailable
+    DATA_ERRORS = (IntegrityError, DataError, ValueError, KeyError)
+    GROUP = "chat-writers"
+    ROOM_KEY = "chat-room:v1:{room_id}"
+
+    def __init__(self):
+        self.redis = get_redis()
+        self.buffer = WriteBehindBuffer(
+            "chat-messages",
+            _write_messages,
+            max_items=settings.CHAT_FLUSH_MAX_ITEMS,
+            max_delay=settings.CHAT_FLUSH_MAX_DELAY,
+        )
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def sync(self) -> bool:
+        return getattr(settings, "GAME_WRITE_BEHIND_SYNC", False)
+
+    # --- rooms ---
+
+    def room_exists(self, room_id) -> bool:
+        key = self.ROOM_KEY.format(room_id=room_id)
+        exists = cache.get(key)
+        if exists is None:
+            exists = ChatRoom.objects.filter(pk=room_id).exists()
+            cache.set(key, exists, timeout=settings.CHAT_ROOM_CACHE_TTL)
+        return exists
+
+    def forget_room(self, room_id):
+        cache.delete(self.ROOM_KEY.format(room_id=room_id))
+
+    # --- staging ---
+
+    def stage(self, *, room_id, user_id, message: str, timestamp):
+        row = {"room_id": int(room_id), "user_id": user_id, "message": message, "timestamp": timestamp.isoformat()}
+        if self.sync:
+            _write_messages([row])
+        elif self.redis is None:
+            self.buffer.put(row)
+        else:
+            self.redis.xadd(self.STREAM_KEY, {"row": json.dumps(row)})
+            self._ensure_thread()
+
+    async def astage(self, **fields):
+        """`stage` for consumers: only hops to a thread when staging does I/O."""
+        if self.sync:
+            await database_sync_to_async(self.stage)(**fields)
+        elif self.redis is None:
+            self.stage(**fields)
+        else:
+            await sync_to_async(self.stage, thread_sensitive=False)(**fields)
+
+    def flush(self) -> int:
+        """Writes everything staged so far in the calling thread."""
+        if self.redis is None:
+            return self.buffer.flush()
+        written = 0
+        while True:
+            count = self.drain()
+            if not count:
+                return written
+            written += count
+
+    def close(self):
+        self._closed = True
+        self.buffer.close()
+
+    # --- Redis stream ---
+
+    def drain(self, block_ms: int | None = None) -> int:
+        """
+        Writes one batch of stream entries: first any left pending by a dead
+        consumer, then new ones. Returns the number of entries handled.
+        """
+        self._ensure_group()
+        batch = settings.CHAT_FLUSH_MAX_ITEMS
+        _, claimed, *_ = self.redis.xautoclaim(
+            self.STREAM_KEY, self.GROUP, self.consumer,
+            min_idle_time=settings.CHAT_STREAM_CLAIM_IDLE * 1000, start_id="0-0", count=batch,
+        )
+        handled = self._write_claimed(claimed)
+
+        response = self.redis.xreadgroup(
+            self.GROUP, self.consumer, {self.STREAM_KEY: ">"}, count=batch, block=block_ms,
+        )
+        for _, entries in response or []:
+            handled += self._write_entries(entries)
+        return handled
+
+    def _write_entries(self, entries, skip_existing: bool = False) -> int:
+        entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+        if not entries:
+            return 0
+        _write_messages([json.loads(fields[b"row"]) for _, fields in entries], skip_existing=skip_existing)
+        ids = [entry_id for entry_id, _ in entries]
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(self.STREAM_KEY, self.GROUP, *ids)
+        pipe.xdel(self.STREAM_KEY, *ids)
+        pipe.execute()
+        return len(entries)
+
+    def _write_claimed(self, entries) -> int:
+        """
+        Writes entries retaken from a dead or failing flusher. If the batch
+        fails, its entries are retried one by one so a bad message can't
+        hold back the others; the failing ones stay pending, or are
+        dead-lettered once delivered CHAT_STREAM_MAX_DELIVERIES times.
+        """
+        entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+        try:
+            return self._write_entries(entries, skip_existing=True)
+        except Exception:
+            logger.warning({"flusher": "chat-messages", "retrying_one_by_one": len(entries)}, exc_info=True)
+
+        handled, rejected = 0, []
+        for entry in entries:
+            try:
+                handled += self._write_entries([entry], skip_existing=True)
+            except self.DATA_ERRORS:
+                rejected.append(entry)
+            except Exception:
+                # Most likely the database is down: leave the rest pending
+                logger.exception({"flusher": "chat-messages", "error": "claimed entry failed"})
+                break
+
+        deliveries = self._deliveries([entry_id for entry_id, _ in rejected])
+        dead = [entry for entry in rejected if deliveries.get(entry[0], 0) >= settings.CHAT_STREAM_MAX_DELIVERIES]
+        if dead:
+            self._dead_letter(dead, deliveries)
+        return handled + len(dead)
+
+    def _deliveries(self, ids) -> dict:
+        """How many times each pending entry was delivered to a flusher."""
+        if not ids:
+            return {}
+        pipe = self.redis.pipeline(transaction=False)
+        for entry_id in ids:
+            pipe.xpending_range(self.STREAM_KEY, self.GROUP, min=entry_id, max=entry_id, count=1)
+        return {
+            pending[0]["message_id"]: pending[0]["times_delivered"]
+            for pending in pipe.execute() if pending
+        }
+
+    def _dead_letter(self, entries, deliveries: dict):
+        pipe = self.redis.pipeline()
+        for entry_id, fields in entries:
+            pipe.xadd(self.DEAD_LETTER_KEY, {**fields, "entry_id": entry_id, "deliveries": deliveries[entry_id]})
+        ids = [entry_id for entry_id, _ in entries]
+        pipe.xack(self.STREAM_KEY, self.GROUP, *ids)
+        pipe.xdel(self.STREAM_KEY, *ids)
+        pipe.execute()
+        logger.error({"flusher": "chat-messages", "dead_lettered": [entry_id.decode() for entry_id in ids]})
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self.redis.xgroup_create(self.STREAM_KEY, self.GROUP, id="0", mkstream=True)
+        except Exception as ex:
+            if "BUSYGROUP" not in str(ex):
+                raise
+        self._group_ready = True
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="chat-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        block_ms = int(settings.CHAT_FLUSH_MAX_DELAY * 1000)
+        while not self._closed:
+            try:
+                self.drain(block_ms=block_ms)
+            except Exception:
+                # Entries stay pending and are claimed again once idle.
+                logger.exception({"flusher": "chat-messages"})
+                time.sleep(settings.CHAT_FLUSH_MAX_DELAY)
+            finally:
+                close_old_connections()
+
+    def start(self):
+        """Starts the stream flusher, so messages staged before a restart get written."""
+        if self.redis is not None:
+            self._ensure_thread()
+
+
+chat_message_store = ChatMessageStore()
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from ..models import GameEvent, LobbyParticipant, LobbyRoom
+from .write_behind import WriteBehindBuffer
+
+
+def _write_events(rows):
+    """
+    Inserts buffered events with one bulk_create. If a lobby or participant
+    was deleted before its events were written, the batch is retried
+    without the orphans instead of being dropped as a whole.
+    """
+    try:
+        with transaction.atomic():
+            GameEvent.objects.bulk_create([GameEvent(**row) for row in rows])
+        return
+    except IntegrityError:
+        pass
+
+    lobby_ids = set(
+        LobbyRoom.objects.filter(pk__in={row["lobby_id"] for row in rows}).values_list("pk", flat=True)
+    )
+    participant_ids = set(
+        LobbyParticipant.objects.filter(
+            pk__in={row["participant_id"] for row in rows if row.get("participant_id")}
+        ).values_list("pk", flat=True)
+    )
+    events = []
+    for row in rows:
+        if row["lobby_id"] not in lobby_ids:
+            continue
+        if row.get("participant_id") not in participant_ids:
+            row = {**row, "participant_id": None}
+        events.append(GameEvent(**row))
+    GameEvent.objects.bulk_create(events)
+
+
+class GameEventBus:
+    """
+    Buffers lifecycle events and writes them with bulk_create from the
+    write-behind thread, so gameplay transactions no longer pay for an
+    INSERT per lobby or participant change. Events are only queued once
+    the emitting transaction commits, and are flushed when the process
+    exits; events that can't be written end up in the `game.dead_letter`
+    log. GAME_WRITE_BEHIND_SYNC makes every emit write immediately.
+    """
+
+    def __init__(self):
+        self.buffer = WriteBehindBuffer(
+            "game-events",
+            _write_events,
+            max_items=settings.GAME_EVENT_BUFFER_MAX_ITEMS,
+            max_delay=settings.GAME_EVENT_BUFFER_MAX_DELAY,
+        )
+
+    def emit(self, event_type: str, *, lobby_id: int, quiz_id: int | None = None,
+             participant_id: int | None = None, payload: dict | None = None):
+        self.emit_many([{
+            "event_type": event_type,
+            "lobby_id": lobby_id,
+            "quiz_id": quiz_id,
+            "participant_id": participant_id,
+            "payload": payload or {},
+        }])
+
+    def emit_many(self, rows):
+        rows = list(rows)
+        if rows:
+            transaction.on_commit(lambda: self.buffer.extend(rows))
+
+    def flush(self) -> int:
+        return self.buffer.flush()
+
+    def close(self):
+        self.buffer.close()
+
+
+game_event_bus = GameEventBus()
@@ -6,13 +6,33 @@ class HistoryService:
     Handles creation of historical records for completed games.
     """
 
-    def create_participation_record(self, lobby: LobbyRoom, participant: LobbyParticipant):
+    def create_participation_record(self, lobby: LobbyRoom, participant: LobbyParticipant,
+                                    final_score: int | None = None):
         """
         Creates a historical record of a user's participation in a quiz.
+        `final_score` defaults to the participant's stored score.
         """
         return QuizParticipation.objects.create(
             user=participant.user,
             quiz=lobby.quiz,
             lobby=lobby,
-            final_score=participant.score,
-        )
\ No newline at end of file
+            final_score=participant.score if final_score is None else final_score,
+        )
+
+    def create_participation_records(self, lobby_ids) -> int:
+        """
+        Records the participation of many ended lobbies at once, for their
+        leading registered participant. Lobbies that already have a record
+        are skipped.
+        """
+        records = {}
+        for lobby_id, quiz_id, user_id, score in (
+            LobbyParticipant.objects.filter(lobby_id__in=lobby_ids, user__isnull=False)
+            .order_by("lobby_id", "-score", "joined_at")
+            .values_list("lobby_id", "lobby__quiz_id", "user_id", "score")
+        ):
+            records.setdefault(lobby_id, QuizParticipation(
+                user_id=user_id, quiz_id=quiz_id, lobby_id=lobby_id, final_score=score,
+            ))
+        QuizParticipation.objects.bulk_create(records.values(), ignore_conflicts=True)
+        return len(records)
@@ -0,0 +1,283 @@
+import logging
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from ..models import LobbyRoom, LobbyParticipant, Answer
+from .answer_ingestion import AnswerIngestor
+from .leaderboard_service import LeaderboardService
+from .snapshot_service import SnapshotService
+from .write_behind import WriteBehindBuffer
+
+logger = logging.getLogger("game")
+
+
+def _persist_writes(items):
+    """
+    Applies buffered hot-state writes to Postgres. Successive updates of the
+    same row are coalesced so each lobby costs one UPDATE, closed answer
+    windows go in with a single bulk_create, and the score deltas of the
+    answers actually inserted are applied with a single CASE UPDATE.
+    """
+    lobby_updates, participant_updates, answers = {}, {}, []
+    for kind, pk, fields in items:
+        if kind == "lobby":
+            lobby_updates.setdefault(pk, {}).update(fields)
+        elif kind == "participant":
+            participant_updates.setdefault(pk, {}).update(fields)
+        elif kind == "answers":
+            answers.extend(fields)
+
+    with transaction.atomic():
+        for pk, fields in lobby_updates.items():
+            # .update() on purpose: no pre_save probe, no event rows
+            LobbyRoom.objects.filter(pk=pk).update(**fields)
+        for pk, fields in participant_updates.items():
+            LobbyParticipant.objects.filter(pk=pk).update(**fields)
+        if answers:
+            answers = _new_answers(answers)
+            Answer.objects.bulk_create([Answer(**row) for row in answers], ignore_conflicts=True)
+
+        # Only answers that were actually inserted count towards the score
+        score_deltas = defaultdict(int)
+        for row in answers:
+            score_deltas[row["participant_id"]] += row["points_awarded"]
+        score_deltas = {pk: delta for pk, delta in score_deltas.items() if delta}
+        if score_deltas:
+            LobbyParticipant.objects.filter(pk__in=score_deltas).update(
+                score=F("score") + Case(
+                    *[When(pk=pk, then=Value(delta)) for pk, delta in score_deltas.items()],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+            )
+
+
+def _new_answers(answers):
+    """
+    Drops answers whose (participant, question) slot is taken, in the DB or
+    earlier in the batch. The participants are locked first so concurrent
+    flushes can't both insert (and score) the same slot.
+    """
+    participant_ids = sorted({row["participant_id"] for row in answers})
+    list(LobbyParticipant.objects.select_for_update().filter(pk__in=participant_ids).order_by("pk").values_list("pk"))
+    taken = set(
+        Answer.objects.filter(
+            participant_id__in=participant_ids,
+            quiz_question_id__in={row["quiz_question_id"] for row in answers},
+        ).values_list("participant_id", "quiz_question_id")
+    )
+    new = []
+    for row in answers:
+        slot = (row["participant_id"], row["quiz_question_id"])
+        if slot not in taken:
+            taken.add(slot)
+            new.append(row)
+    return new
+
+
+class LobbyStateStore:
+    """
+    Hot state of running lobbies, kept in the shared cache (Redis in
+    deployment) so polls and answers are served without touching Postgres.
+
+    The state blob holds the question plan (compiled from the lobby's quiz
+    snapshot), the current question index and
+    its start time. Scores and the answered set live in their own keys so
+    concurrent players can update them atomically with incr/add. Postgres
+    stays the durable record and is updated write-behind.
+    """
+
+    STATE_KEY = "lobby-hot:{lobby_id}"
+    SCORE_KEY = "lobby-hot:{lobby_id}:score:{participant_id}"
+    ANSWERED_KEY = "lobby-hot:{lobby_id}:answered:{participant_id}:{quiz_question_id}"
+    ADVANCE_KEY = "lobby-hot:{lobby_id}:advance:{index}"
+
+    def __init__(self):
+        self.snapshots = SnapshotService()
+        self.writer = WriteBehindBuffer("lobby-state", _persist_writes)
+        self.answers = AnswerIngestor(self.writer)
+        self.leaderboard = LeaderboardService()
+
+    @property
+    def timeout(self) -> int:
+        return settings.GAME_HOT_STATE_TTL
+
+    # --- Lobby state ---
+
+    def seed(self, lobby: LobbyRoom, participants) -> dict:
+        """Creates the hot state for a freshly started lobby."""
+        if lobby.snapshot_id is None:
+            lobby.snapshot = self.snapshots.latest(lobby.quiz)
+            LobbyRoom.objects.filter(pk=lobby.pk).update(snapshot=lobby.snapshot)
+
+        state = {
+            "lobby_id": lobby.id,
+            "quiz_id": lobby.quiz_id,
+            "quiz_title": lobby.quiz.title,
+            "host_id": lobby.host_id,
+            "created_at": lobby.created_at.timestamp(),
+            "status": lobby.status,
+            "mode": lobby.mode,
+            "run_started_at": lobby.started_at.timestamp() if lobby.started_at else None,
+            "participants": {p.user_id: p.id for p in participants},
+            "snapshot_id": lobby.snapshot_id,
+            "questions": self.snapshots.get_plan(lobby.snapshot_id),
+            "index": None,
+            "started_at": None,
+        }
+        for p in participants:
+            cache.add(self._score_key(lobby.id, p.id), p.score, timeout=self.timeout)
+        self.leaderboard.seed(lobby.id, participants)
+        self.save(state)
+        return state
+
+    def load(self, lobby_id: int) -> dict | None:
+        """Returns the hot state of a lobby, rebuilding it from Postgres on a miss."""
+        state = cache.get(self.STATE_KEY.format(lobby_id=lobby_id))
+        if state is not None:
+            return state
+        return self.hydrate(lobby_id)
+
+    def flush_writes(self):
+        """
+        Writes pending hot-state changes before reading back from Postgres.
+        A failed flush (possibly of another request's writes) stays queued
+        for the background writer to retry instead of failing this request.
+        """
+        try:
+            self.writer.flush()
+        except Exception:
+            logger.warning({"buffer": self.writer.name, "flush": "deferred", "pending": len(self.writer)})
+
+    def hydrate(self, lobby_id: int) -> dict | None:
+        # Make sure our own pending writes are visible before reading back.
+        self.flush_writes()
+        try:
+            lobby = LobbyRoom.objects.select_related("quiz").get(pk=lobby_id)
+        except LobbyRoom.DoesNotExist:
+            return None
+        if lobby.current_q_id and self.answers.close_window(lobby.id, lobby.current_q_id):
+            # The open window's answers are already in the cached scores; persist them before reading scores back.
+            self.flush_writes()
+
+        participants = list(LobbyParticipant.objects.filter(lobby=lobby, left_at__isnull=True))
+        state = self.seed(lobby, participants)
+        if lobby.current_q_id:
+            ids = [q["id"] for q in state["questions"]]
+            if lobby.current_q_id in ids:
+                state["index"] = ids.index(lobby.current_q_id)
+                started = lobby.question_started_at
+                state["started_at"] = started.timestamp() if started else None
+                self.save(state)
+        return state
+
+    def save(self, state: dict):
+        cache.set(self.STATE_KEY.format(lobby_id=state["lobby_id"]), state, timeout=self.timeout)
+
+    def current_question(self, state: dict) -> dict | None:
+        if state["index"] is None:
+            return None
+        return state["questions"][state["index"]]
+
+    def time_left(self, state: dict) -> float:
+        question = self.current_question(state)
+        if not question or state["started_at"] is None:
+            return 0
+        return max(0, question["timer"] - (time.time() - state["started_at"]))
+
+    def start_question(self, state: dict, index: int):
+        """
+        Moves the lobby to question `index`, closing the previous question's
+        answer window, and queues the matching DB write.
+        """
+        self.close_answer_window(state)
+        state["index"] = index
+        state["started_at"] = time.time()
+        self.save(state)
+        question = state["questions"][index]
+        self.writer.put(
+            ("lobby", state["lobby_id"], {"current_q_id": question["id"], "question_started_at": timezone.now()})
+        )
+
+    def close_answer_window(self, state: dict):
+        question = self.current_question(state)
+        if question is not None:
+            self.answers.close_window(state["lobby_id"], question["id"])
+
+    def claim_advance(self, lobby_id: int, index: int | None) -> bool:
+        """
+        Atomically claims the right to move a lobby past question `index`, so
+        an answer and the deadline scheduler can't both advance it.
+        """
+        key = self.ADVANCE_KEY.format(lobby_id=lobby_id, index=index)
+        return cache.add(key, 1, timeout=self.timeout)
+
+    def release_advance(self, lobby_id: int, index: int | None):
+        """Gives up a claim whose advance failed, so it can be retried."""
+        cache.delete(self.ADVANCE_KEY.format(lobby_id=lobby_id, index=index))
+
+    # --- Per-participant keys ---
+
+    def mark_answered(self, lobby_id: int, participant_id: int, quiz_question_id: int) -> bool:
+        """Atomically claims the answer slot; False if it was already taken."""
+        key = self.ANSWERED_KEY.format(
+            lobby_id=lobby_id, participant_id=participant_id, quiz_question_id=quiz_question_id
+        )
+        return cache.add(key, 1, timeout=self.timeout)
+
+    def all_answered(self, state: dict, participant_id: int) -> bool:
+        keys = [
+            self.ANSWERED_KEY.format(lobby_id=state["lobby_id"], participant_id=participant_id, quiz_question_id=q["id"])
+            for q in state["questions"]
+        ]
+        return len(cache.get_many(keys)) == len(keys)
+
+    def get_score(self, lobby_id: int, participant_id: int) -> int:
+        score = cache.get(self._score_key(lobby_id, participant_id))
+        if score is None:
+            score = self._reload_score(lobby_id, participant_id)
+        return score
+
+    def add_score(self, lobby_id: int, participant_id: int, points: int) -> int:
+        key = self._score_key(lobby_id, participant_id)
+        if points == 0:
+            return self.get_score(lobby_id, participant_id)
+        try:
+            score = cache.incr(key, points)
+        except ValueError:
+            self._reload_score(lobby_id, participant_id)
+            score = cache.incr(key, points)
+        # The DB score follows when the answer window is persisted
+        return score
+
+    def record_answer(self, **fields):
+        self.answers.add(**fields)
+
+    def record_answers(self, rows: list):
+        """Queues graded answers that bypass the per-question windows (prefetch runs)."""
+        if rows:
+            self.writer.put(("answers", None, rows))
+
+    def _reload_score(self, lobby_id: int, participant_id: int) -> int:
+        state = cache.get(self.STATE_KEY.format(lobby_id=lobby_id))
+        if state is not None:
+            # Answers still in the open window are not in the DB score yet
+            self.close_answer_window(state)
+        self.flush_writes()
+        score = (
+            LobbyParticipant.objects.filter(pk=participant_id).values_list("score", flat=True).first() or 0
+        )
+        cache.add(self._score_key(lobby_id, participant_id), score, timeout=self.timeout)
+        return score
+
+    def _score_key(self, lobby_id: int, participant_id: int) -> str:
+        return self.SCORE_KEY.format(lobby_id=lobby_id, participant_id=participant_id)
+
+
+lobby_state_store = LobbyStateStore()
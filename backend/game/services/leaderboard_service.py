@@ -0,0 +1,122 @@
+import threading
+from collections import defaultdict
+
+from django.db.models import Case, IntegerField, Value, When
+
+from ..models import LobbyParticipant
+from .redis_client import get_redis
+
+
+class LeaderboardService:
+    """
+    Live lobby leaderboards on Redis sorted sets: score updates are a
+    ZINCRBY and top-N / "my rank" lookups are O(log n), with no ORDER BY
+    over the participants table. Final ranks are written back to
+    LobbyParticipant.rank in one UPDATE when the lobby ends.
+
+    Without Redis (development) boards are kept in-process and sorted on
+    read.
+    """
+
+    BOARD_KEY = "quizarrow:leaderboard:{lobby_id}"
+    NAMES_KEY = "quizarrow:leaderboard:{lobby_id}:names"
+    TTL = 6 * 60 * 60
+
+    _boards = defaultdict(dict)
+    _names = defaultdict(dict)
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.redis = get_redis()
+
+    def seed(self, lobby_id: int, participants):
+        """Registers participants (at their current score) on the board."""
+        participants = list(participants)
+        if not participants:
+            return
+        if self.redis is None:
+            with self._lock:
+                for p in participants:
+                    self._boards[lobby_id].setdefault(p.id, p.score)
+                    self._names[lobby_id][p.id] = p.nickname
+            return
+
+        board, names = self._keys(lobby_id)
+        pipe = self.redis.pipeline()
+        pipe.zadd(board, {p.id: p.score for p in participants}, nx=True)
+        pipe.hset(names, mapping={p.id: p.nickname for p in participants})
+        pipe.expire(board, self.TTL)
+        pipe.expire(names, self.TTL)
+        pipe.execute()
+
+    def add(self, lobby_id: int, participant_id: int, points: int):
+        if not points:
+            return
+        if self.redis is None:
+            with self._lock:
+                board = self._boards[lobby_id]
+                board[participant_id] = board.get(participant_id, 0) + points
+            return
+        self.redis.zincrby(self._keys(lobby_id)[0], points, participant_id)
+
+    def rank(self, lobby_id: int, participant_id: int) -> int | None:
+        """1-based rank of a participant, or None if they are not on the board."""
+        if self.redis is None:
+            ordered = self._ordered(lobby_id)
+            ids = [pid for pid, _ in ordered]
+            return ids.index(participant_id) + 1 if participant_id in ids else None
+        rank = self.redis.zrevrank(self._keys(lobby_id)[0], participant_id)
+        return rank + 1 if rank is not None else None
+
+    def top(self, lobby_id: int, limit: int = 10) -> list:
+        if self.redis is None:
+            entries = self._ordered(lobby_id)[:limit]
+            names = self._names[lobby_id]
+        else:
+            board, names_key = self._keys(lobby_id)
+            entries = [(int(pid), int(score)) for pid, score in
+                       self.redis.zrevrange(board, 0, limit - 1, withscores=True)]
+            names = {}
+            if entries:
+                values = self.redis.hmget(names_key, [pid for pid, _ in entries])
+                names = {pid: (v.decode() if v else None) for (pid, _), v in zip(entries, values)}
+        return [
+            {"rank": i + 1, "participant_id": pid, "nickname": names.get(pid), "score": score}
+            for i, (pid, score) in enumerate(entries)
+        ]
+
+    def finalize(self, lobby_ids) -> int:
+        """
+        Writes final ranks of the given lobbies back to LobbyParticipant.rank
+        with a single UPDATE and drops their boards.
+        """
+        ranks = {}
+        for lobby_id in lobby_ids:
+            if self.redis is None:
+                with self._lock:
+                    ordered = self._ordered(lobby_id)
+                    self._boards.pop(lobby_id, None)
+                    self._names.pop(lobby_id, None)
+            else:
+                board, names = self._keys(lobby_id)
+                pipe = self.redis.pipeline()
+                pipe.zrevrange(board, 0, -1)
+                pipe.delete(board, names)
+                ordered = [(int(pid), None) for pid in pipe.execute()[0]]
+            ranks.update({pid: i + 1 for i, (pid, _) in enumerate(ordered)})
+
+        if ranks:
+            LobbyParticipant.objects.filter(pk__in=ranks).update(
+                rank=Case(
+                    *[When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()],
+                    output_field=IntegerField(),
+                )
+            )
+        return len(ranks)
+
+    def _ordered(self, lobby_id: int) -> list:
+        board = self._boards.get(lobby_id, {})
+        return sorted(board.items(), key=lambda item: (-item[1], item[0]))
+
+    def _keys(self, lobby_id: int):
+        return self.BOARD_KEY.format(lobby_id=lobby_id), self.NAMES_KEY.format(lobby_id=lobby_id)
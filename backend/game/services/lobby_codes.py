@@ -0,0 +1,80 @@
+import hashlib
+import hmac
+import itertools
+import random
+import threading
+
+from django.conf import settings
+from django.db.models import Max
+
+from ..models import LobbyRoom
+from .redis_client import get_redis
+
+
+class LobbyCodeAllocator:
+    """
+    Hands out unique 8-character lobby codes without touching the database.
+
+    Codes are a keyed permutation of a counter: a small Feistel network
+    (keyed from SECRET_KEY) maps each sequence number to a distinct point of
+    the 36^8 code space, so consecutive lobbies get unrelated-looking codes
+    and two numbers can never produce the same code. The counter is a Redis
+    INCR shared by every process; without Redis each process counts from a
+    random offset and the unique constraint on `code` catches the rare clash.
+    """
+
+    ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    LENGTH = 8
+    SPACE = len(ALPHABET) ** LENGTH
+    HALF_BITS = 21  # 2 ** 42 is the smallest even power of two above SPACE
+    ROUNDS = 4
+    SEQUENCE_KEY = "quizarrow:lobby-code-seq"
+
+    def __init__(self):
+        self.redis = get_redis()
+        self._key = hashlib.sha256(f"quizarrow.lobby-code:{settings.SECRET_KEY}".encode()).digest()
+        self._counter = None
+        self._seeded = False
+        self._lock = threading.Lock()
+
+    def allocate(self) -> str:
+        return self.encode(self._permute(self._next_sequence() % self.SPACE))
+
+    def encode(self, number: int) -> str:
+        chars = []
+        for _ in range(self.LENGTH):
+            number, digit = divmod(number, len(self.ALPHABET))
+            chars.append(self.ALPHABET[digit])
+        return "".join(reversed(chars))
+
+    def _next_sequence(self) -> int:
+        if self.redis is None:
+            with self._lock:
+                if self._counter is None:
+                    self._counter = itertools.count(random.randrange(self.SPACE))
+                return next(self._counter)
+
+        if not self._seeded:
+            # Start above existing lobbies if the counter was lost (a no-op otherwise).
+            start = LobbyRoom.objects.aggregate(start=Max("pk"))["start"] or 0
+            self.redis.set(self.SEQUENCE_KEY, start, nx=True)
+            self._seeded = True
+        return self.redis.incr(self.SEQUENCE_KEY)
+
+    def _permute(self, number: int) -> int:
+        # Cycle-walk the 42-bit Feistel permutation until it lands inside SPACE.
+        while True:
+            number = self._feistel(number)
+            if number < self.SPACE:
+                return number
+
+    def _feistel(self, number: int) -> int:
+        mask = (1 << self.HALF_BITS) - 1
+        left, right = number >> self.HALF_BITS, number & mask
+        for round_no in range(self.ROUNDS):
+            digest = hmac.new(self._key, f"{round_no}:{right}".encode(), hashlib.sha256).digest()
+            left, right = right, left ^ (int.from_bytes(digest[:4], "big") & mask)
+        return (left << self.HALF_BITS) | right
+
+
+lobby_code_allocator = LobbyCodeAllocator()
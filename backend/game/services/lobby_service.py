@@ -1,84 +1,206 @@
-import random
-import string
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError, PermissionDenied
 
 from ..models import Quiz, LobbyRoom, LobbyParticipant
+from .broadcast import LobbyBroadcaster
+from .hot_state import lobby_state_store
+from .lobby_codes import lobby_code_allocator
+from .prefetch_service import PrefetchService
+from .presence import presence_tracker
+from .scheduler import get_deadline_scheduler
+from .snapshot_service import SnapshotService
 
 
 class LobbyService:
     """
     Encapsulates business logic for lobby creation and state management.
+    Running lobbies are served from the hot state store; Postgres is kept
+    up to date write-behind.
     """
 
-    def _generate_lobby_code(self):
-        """Generates a unique 8-character uppercase code for a lobby."""
-        while True:
-            code = "".join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            if not LobbyRoom.objects.filter(code=code).exists():
-                return code
+    def __init__(self):
+        self.store = lobby_state_store
+        self.broadcaster = LobbyBroadcaster()
+        self.scheduler = get_deadline_scheduler()
 
-    def start_solo_quiz(self, quiz_id: int, user):
+    CODE_ATTEMPTS = 5
+
+    def _create_lobby(self, **fields) -> LobbyRoom:
+        """
+        Creates a lobby under a freshly allocated code. Allocated codes do not
+        repeat, so the retry only covers codes issued before the allocator
+        (or a lost Redis counter) and is practically never taken.
+        """
+        for attempt in range(self.CODE_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    return LobbyRoom.objects.create(code=lobby_code_allocator.allocate(), **fields)
+            except IntegrityError:
+                if attempt == self.CODE_ATTEMPTS - 1:
+                    raise
+
+    def start_solo_quiz(self, quiz_id: int, user, prefetch: bool = False):
         """
         Creates a new solo lobby session for a user to take a quiz.
+        With `prefetch` the whole question set is released up front on a
+        server-kept schedule (see PrefetchService).
         """
         try:
             quiz = Quiz.objects.get(pk=quiz_id, is_published=True)
         except Quiz.DoesNotExist:
             raise ValidationError("Published quiz not found.")
 
-        lobby = LobbyRoom.objects.create(
-            code=self._generate_lobby_code(),
+        lobby = self._create_lobby(
             quiz=quiz,
+            snapshot=SnapshotService().latest(quiz),
             host=user,
             status=LobbyRoom.Status.RUNNING,
+            mode=LobbyRoom.Mode.PREFETCH if prefetch else LobbyRoom.Mode.LIVE,
             started_at=timezone.now(),
         )
 
-        LobbyParticipant.objects.create(
+        participant = LobbyParticipant.objects.create(
             lobby=lobby, user=user, nickname=user.username, is_host=True, connected=True
         )
 
+        state = self.store.seed(lobby, [participant])
+        if prefetch:
+            ends_at = PrefetchService.ends_at(state)
+            self.scheduler.schedule(lobby.id, ends_at + settings.GAME_DEADLINE_GRACE_SECONDS)
+        else:
+            # Lobbies nobody starts playing are closed by the deadline scheduler
+            self.scheduler.schedule(lobby.id, lobby.created_at.timestamp() + settings.GAME_LOBBY_IDLE_TIMEOUT)
         return lobby
 
+    def get_prefetch_run(self, lobby_id: int, user) -> dict:
+        """The whole-run payload of a prefetch lobby, also used to resume one."""
+        state = self.store.load(lobby_id)
+        if not state or not state["participants"].get(user.id):
+            raise PermissionDenied("You are not in this lobby.")
+        return PrefetchService().run_payload(state)
+
     def get_lobby_state(self, lobby_id: int, user):
         """
         Retrieves the current state of a lobby for a participant.
         Advances to the first question if the game is just starting.
         """
-        try:
-            lobby = LobbyRoom.objects.get(pk=lobby_id, host=user)
-            participant = LobbyParticipant.objects.get(lobby=lobby, user=user)
-        except (LobbyRoom.DoesNotExist, LobbyParticipant.DoesNotExist):
+        state = self.store.load(lobby_id)
+        participant_id = state and state["participants"].get(user.id)
+        if not participant_id:
             raise PermissionDenied("You are not in this lobby.")
 
-        if lobby.status != LobbyRoom.Status.RUNNING:
-            return {"status": lobby.status, "detail": "Lobby is not active."}
+        if state["status"] != LobbyRoom.Status.RUNNING:
+            return {"status": state["status"], "detail": "Lobby is not active."}
+
+        if PrefetchService.is_prefetch(state):
+            return {
+                "status": state["status"],
+                "score": self.store.get_score(lobby_id, participant_id),
+                **PrefetchService().run_payload(state),
+            }
 
         # If quiz is just starting (no current question), serve the first one.
-        if not lobby.current_q:
-            first_q = lobby.quiz.quiz_questions.order_by("order").first()
-            if not first_q:
-                lobby.status = LobbyRoom.Status.ENDED
-                lobby.ended_at = timezone.now()
-                lobby.save()
-                return {"status": lobby.status, "detail": "Quiz has no questions."}
-
-            lobby.current_q = first_q
-            lobby.question_started_at = timezone.now()
-            lobby.save()
-
-        time_left = 0
-        if lobby.question_started_at:
-            duration = lobby.current_q.effective_timer()
-            elapsed = (timezone.now() - lobby.question_started_at).total_seconds()
-            time_left = max(0, duration - elapsed)
+        if state["index"] is None:
+            if not state["questions"]:
+                self.end_lobby(state)
+                return {"status": state["status"], "detail": "Quiz has no questions."}
+            self.start_question(state, 0)
 
+        question = self.store.current_question(state)
         return {
-            "status": lobby.status,
-            "lobby_id": lobby.id,
-            "quiz_title": lobby.quiz.title,
-            "question": lobby.current_q,
-            "score": participant.score,
-            "time_left": time_left,
-        }
\ No newline at end of file
+            "status": state["status"],
+            "lobby_id": state["lobby_id"],
+            "quiz_title": state["quiz_title"],
+            "question": question["payload"],
+            "score": self.store.get_score(lobby_id, participant_id),
+            "time_left": self.store.time_left(state),
+        }
+
+    def get_leaderboard(self, lobby_id: int, user, limit: int = 10):
+        """
+        Returns the lobby's top `limit` participants and the caller's own rank.
+        """
+        state = self.store.load(lobby_id)
+        participant_id = state and state["participants"].get(user.id)
+        if not participant_id:
+            raise PermissionDenied("You are not in this lobby.")
+
+        if state["status"] == LobbyRoom.Status.ENDED:
+            # Live boards are dropped at the end; final ranks are in Postgres.
+            participants = LobbyParticipant.objects.filter(lobby_id=lobby_id, rank__isnull=False).order_by("rank")
+            top = [
+                {"rank": p.rank, "participant_id": p.id, "nickname": p.nickname, "score": p.score}
+                for p in participants[:limit]
+            ]
+            me = next((entry for entry in top if entry["participant_id"] == participant_id), None)
+            if me is None:
+                me = (
+                    LobbyParticipant.objects.filter(pk=participant_id)
+                    .values("rank", "score").first() or {"rank": None, "score": 0}
+                )
+            return {
+                "lobby_id": lobby_id,
+                "top": top,
+                "me": {"participant_id": participant_id, "rank": me["rank"], "score": me["score"]},
+            }
+
+        leaderboard = self.store.leaderboard
+        return {
+            "lobby_id": lobby_id,
+            "top": leaderboard.top(lobby_id, limit),
+            "me": {
+                "participant_id": participant_id,
+                "rank": leaderboard.rank(lobby_id, participant_id),
+                "score": self.store.get_score(lobby_id, participant_id),
+            },
+        }
+
+    def get_online(self, lobby_id: int, user):
+        """
+        Returns the participants of the lobby with an open game socket,
+        answered from the presence tracker and the hot state.
+        """
+        state = self.store.load(lobby_id)
+        if not (state and state["participants"].get(user.id)):
+            raise PermissionDenied("You are not in this lobby.")
+
+        participants = state["participants"]
+        online = presence_tracker.online(presence_tracker.lobby_scope(lobby_id))
+        participant_ids = sorted(participants[user_id] for user_id in online if user_id in participants)
+        return {"lobby_id": lobby_id, "participant_ids": participant_ids, "count": len(participant_ids)}
+
+    def start_question(self, state: dict, index: int):
+        """Moves a running lobby to question `index` and notifies its sockets."""
+        self.store.start_question(state, index)
+        question = state["questions"][index]
+        self.scheduler.schedule(
+            state["lobby_id"], state["started_at"] + question["timer"] + settings.GAME_DEADLINE_GRACE_SECONDS
+        )
+        self.broadcaster.question_started(state)
+
+    def end_lobby(self, state: dict) -> LobbyRoom:
+        """
+        Ends a lobby durably: the last answer window is closed and pending
+        hot-state writes are flushed first, and the status change goes through
+        save() so the lifecycle event is recorded; only the changed columns
+        are written.
+        """
+        self.store.close_answer_window(state)
+        self.store.flush_writes()
+        self.store.leaderboard.finalize([state["lobby_id"]])
+        lobby = LobbyRoom.objects.get(pk=state["lobby_id"])
+        lobby.status = LobbyRoom.Status.ENDED
+        lobby.ended_at = timezone.now()
+        lobby.current_q = None
+        lobby.question_started_at = None
+        lobby.save()
+
+        state["status"] = lobby.status
+        state["index"] = None
+        state["started_at"] = None
+        self.store.save(state)
+        self.scheduler.cancel(lobby.id)
+        self.broadcaster.game_ended(lobby.id, lobby.status)
+        return lobby
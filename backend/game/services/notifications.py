@@ -0,0 +1,71 @@
+import asyncio
+import json
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+
+class NotificationService:
+    """
+    Fans notifications out to NotificationConsumer sockets.
+
+    Every socket joins one of NOTIFICATION_SHARDS shard groups (by user id)
+    and its user's own group. Broadcasts go to every shard, so no single
+    channel-layer key holds all connected users. Targeted sends go to the
+    users' own groups, or, past NOTIFICATION_DIRECT_LIMIT users, to the
+    shards they live on with the audience attached for the consumers to
+    filter. The frame is encoded once per publish.
+    """
+
+    SHARD_GROUP = "notifications_{shard}"
+    USER_GROUP = "notifications_user_{user_id}"
+
+    @classmethod
+    def shard_for(cls, user_id: int) -> int:
+        return user_id % settings.NOTIFICATION_SHARDS
+
+    @classmethod
+    def groups_for(cls, user_id: int) -> list:
+        return [
+            cls.SHARD_GROUP.format(shard=cls.shard_for(user_id)),
+            cls.USER_GROUP.format(user_id=user_id),
+        ]
+
+    def publish(self, event_type: str, payload: dict, *, audience=None, exclude_user_id: int | None = None):
+        """
+        Sends `{"type": event_type, "payload": payload}` to everyone, or only to
+        the user ids in `audience`, once the current transaction commits.
+        `exclude_user_id` (usually the actor) never receives it.
+        """
+        channel_layer = get_channel_layer()
+        if not channel_layer:
+            return
+        message = {
+            "type": event_type,
+            "text": json.dumps({"type": event_type, "payload": payload}),
+            "exclude_user_id": exclude_user_id,
+        }
+        sends = self._plan(message, None if audience is None else set(audience) - {exclude_user_id})
+        if sends:
+            transaction.on_commit(lambda: async_to_sync(self._send_all)(channel_layer, sends))
+
+    def _plan(self, message: dict, audience) -> list:
+        if audience is None:
+            return [(self.SHARD_GROUP.format(shard=shard), message) for shard in range(settings.NOTIFICATION_SHARDS)]
+        if len(audience) <= settings.NOTIFICATION_DIRECT_LIMIT:
+            return [(self.USER_GROUP.format(user_id=user_id), message) for user_id in audience]
+
+        by_shard = defaultdict(list)
+        for user_id in audience:
+            by_shard[self.shard_for(user_id)].append(user_id)
+        return [
+            (self.SHARD_GROUP.format(shard=shard), {**message, "audience": user_ids})
+            for shard, user_ids in by_shard.items()
+        ]
+
+    @staticmethod
+    async def _send_all(channel_layer, sends):
+        await asyncio.gather(*[channel_layer.group_send(group, message) for group, message in sends])
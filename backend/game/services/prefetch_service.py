@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from rest_framework.exceptions import ValidationError
+
+from ..models import LobbyRoom
+from .hot_state import lobby_state_store
+
+
+class PrefetchService:
+    """
+    Whole-quiz prefetch for solo play: the client receives every public
+    question up front instead of polling the lobby state per question.
+
+    Timers are still enforced by the server. Each question gets a release
+    time and a deadline on a back-to-back schedule derived from the run's
+    recorded start and the snapshot timers, so it survives the hot state
+    being rebuilt, and the client gets them as signed tokens it must hand
+    back with its answers. Answers may come in early, but anything after a
+    question's deadline is recorded as late.
+    """
+
+    MODE = LobbyRoom.Mode.PREFETCH
+    QUESTIONS_KEY = "quiz-prefetch:v1:{snapshot_id}"
+    QUESTIONS_TIMEOUT = 24 * 60 * 60
+    TOKEN_SALT = "quizarrow.release"
+
+    def __init__(self):
+        self.store = lobby_state_store
+
+    @classmethod
+    def is_prefetch(cls, state: dict) -> bool:
+        return state.get("mode") == cls.MODE
+
+    def get_questions(self, snapshot_id: int) -> list:
+        """
+        The public question set of a snapshot, without answer keys. Snapshots
+        are immutable, so one cached copy serves every player.
+        """
+        key = self.QUESTIONS_KEY.format(snapshot_id=snapshot_id)
+        questions = cache.get(key)
+        if questions is None:
+            questions = [entry["payload"] for entry in self.store.snapshots.get_plan(snapshot_id)]
+            cache.set(key, questions, timeout=self.QUESTIONS_TIMEOUT)
+        return questions
+
+    @staticmethod
+    def schedule(state: dict) -> dict:
+        """
+        The run's release schedule: `{quiz_question_id: [release, deadline]}`.
+        Rebuilt the same way every time, so tokens signed before the hot
+        state was evicted still match.
+        """
+        release = state["run_started_at"]
+        schedule = {}
+        for question in state["questions"]:
+            deadline = release + question["timer"]
+            schedule[str(question["id"])] = [release, deadline]
+            release = deadline
+        return schedule
+
+    @staticmethod
+    def ends_at(state: dict) -> float:
+        """When the last question's deadline passes."""
+        return state["run_started_at"] + sum(question["timer"] for question in state["questions"])
+
+    def run_payload(self, state: dict) -> dict:
+        """The compact response a prefetch client plays the whole run from."""
+        return {
+            "mode": self.MODE,
+            "lobby_id": state["lobby_id"],
+            "quiz_title": state["quiz_title"],
+            "snapshot_id": state["snapshot_id"],
+            "questions": self.get_questions(state["snapshot_id"]),
+            "releases": [
+                {
+                    "id": int(quiz_question_id),
+                    "release_at": release,
+                    "deadline": deadline,
+                    "token": self._sign(state["lobby_id"], quiz_question_id, release, deadline),
+                }
+                for quiz_question_id, (release, deadline) in self.schedule(state).items()
+            ],
+        }
+
+    def verify(self, state: dict, quiz_question_id, token: str) -> tuple:
+        """
+        Checks a release token against the server-recorded schedule and
+        returns the question's (release, deadline).
+        """
+        scheduled = self.schedule(state).get(str(quiz_question_id))
+        if scheduled is None:
+            raise ValidationError("Question is not part of this run.")
+        try:
+            signed = signing.loads(token or "", salt=self.TOKEN_SALT)
+        except signing.BadSignature:
+            raise ValidationError("Invalid release token.")
+        if signed != [state["lobby_id"], str(quiz_question_id), *scheduled]:
+            raise ValidationError("Release token does not match this question.")
+        return tuple(scheduled)
+
+    def answer_deadline(self, deadline: float) -> float:
+        return deadline + settings.GAME_DEADLINE_GRACE_SECONDS
+
+    def _sign(self, lobby_id: int, quiz_question_id: str, release: float, deadline: float) -> str:
+        return signing.dumps([lobby_id, quiz_question_id, release, deadline], salt=self.TOKEN_SALT, compress=True)
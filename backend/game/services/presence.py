@@ -0,0 +1,324 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from ..models import GameEvent, LobbyParticipant
+from .event_bus import game_event_bus
+from .redis_client import get_redis
+from .write_behind import WriteBehindBuffer, dead_letter_logger, drop_dead_letter
+
+logger = logging.getLogger("game")
+
+# Presence transitions recorded for lobby scopes, and the GameEvent each one emits
+JOINED, SEEN, LEFT, EXPIRED = "joined", "seen", "left", "expired"
+_EVENTS = {
+    JOINED: (GameEvent.Type.PARTICIPANT_CONNECTED, "connected"),
+    LEFT: (GameEvent.Type.PARTICIPANT_DISCONNECTED, "disconnected"),
+    EXPIRED: (GameEvent.Type.PARTICIPANT_DISCONNECTED, "timeout"),
+}
+
+
+def _write_presence(items):
+    """
+    Applies buffered presence changes of lobby participants: successive
+    changes of the same participant are coalesced, `connected`/`last_seen`
+    go in with one bulk_update (no pre_save probe, no signals) and the
+    connect/disconnect events are handed to the event bus as one batch.
+    """
+    latest, transitions = {}, []
+    for lobby_id, user_id, state, seen_at in items:
+        key = (lobby_id, user_id)
+        _, last_seen = latest.get(key, (True, seen_at))
+        latest[key] = (state not in (LEFT, EXPIRED), max(last_seen, seen_at))
+        if state != SEEN:
+            transitions.append((key, state))
+
+    participants = {
+        (lobby_id, user_id): (pk, nickname, quiz_id)
+        for pk, lobby_id, user_id, nickname, quiz_id in LobbyParticipant.objects.filter(
+            lobby_id__in={lobby_id for lobby_id, _ in latest},
+            user_id__in={user_id for _, user_id in latest},
+        ).values_list("pk", "lobby_id", "user_id", "nickname", "lobby__quiz_id")
+    }
+    with transaction.atomic():
+        LobbyParticipant.objects.bulk_update(
+            [
+                LobbyParticipant(pk=participants[key][0], connected=connected, last_seen=last_seen)
+                for key, (connected, last_seen) in latest.items() if key in participants
+            ],
+            ["connected", "last_seen"],
+        )
+
+    events = []
+    for key, state in transitions:
+        if key not in participants:
+            continue
+        pk, nickname, quiz_id = participants[key]
+        event_type, reason = _EVENTS[state]
+        events.append({
+            "event_type": event_type,
+            "lobby_id": key[0],
+            "quiz_id": quiz_id,
+            "participant_id": pk,
+            "payload": {"nickname": nickname, "reason": reason},
+        })
+    game_event_bus.emit_many(events)
+
+
+def _dead_letter_presence(items):
+    """Logs lost transitions one by one; lost heartbeats are only counted."""
+    transitions = [item for item in items if item[2] != SEEN]
+    for lobby_id, user_id, state, seen_at in transitions:
+        dead_letter_logger.error(
+            {"buffer": "presence", "lobby_id": lobby_id, "user_id": user_id, "state": state, "at": seen_at.isoformat()}
+        )
+    drop_dead_letter("presence")([item for item in items if item[2] == SEEN])
+
+
+class PresenceTracker:
+    """
+    Who is online in a lobby or chat room, kept out of Postgres.
+
+    Every socket marks its user online in a scope (`lobby:<id>`,
+    `chat:<id>`) and refreshes it with heartbeats; a user stays online for
+    PRESENCE_TTL seconds after the last heartbeat of any of their sockets.
+    In Redis a scope is a sorted set of user ids scored by expiry plus a
+    hash counting each user's open sockets, updated by scripts so only one
+    process sees each transition; otherwise scopes are kept in-process.
+
+    For lobbies, transitions and heartbeats are buffered and flushed to
+    LobbyParticipant.connected/last_seen every PRESENCE_FLUSH_INTERVAL
+    seconds, with connect/disconnect GameEvents emitted in the same batch. Users
+    whose heartbeats stop (e.g. their worker died) are swept on that same
+    interval.
+    """
+
+    KEY = "quizarrow:presence:{scope}"
+    CONNS_KEY = "quizarrow:presence:{scope}:conns"
+    SCOPES_KEY = "quizarrow:presence:scopes"
+    SWEEP_LOCK_KEY = "quizarrow:presence:sweep-lock"
+    # Returns 1 when the user was not online in the scope before
+    TOUCH_SCRIPT = """
+        if tonumber(ARGV[4]) > 0 then
+            redis.call('HINCRBY', KEYS[2], ARGV[1], ARGV[4])
+        end
+        local added = redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+        if added == 1 and tonumber(ARGV[4]) == 0 then
+            redis.call('HSET', KEYS[2], ARGV[1], 1)
+        end
+        redis.call('SADD', KEYS[3], ARGV[3])
+        redis.call('EXPIRE', KEYS[1], ARGV[5])
+        redis.call('EXPIRE', KEYS[2], ARGV[5])
+        return added
+    """
+    # Returns 1 when the user's last socket in the scope closed
+    DISCONNECT_SCRIPT = """
+        if redis.call('HINCRBY', KEYS[2], ARGV[1], -1) > 0 then
+            return 0
+        end
+        redis.call('HDEL', KEYS[2], ARGV[1])
+        return redis.call('ZREM', KEYS[1], ARGV[1])
+    """
+    # Removes and returns the users whose presence expired
+    SWEEP_SCRIPT = """
+        local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES')
+        for i = 1, #expired, 2 do
+            redis.call('ZREM', KEYS[1], expired[i])
+            redis.call('HDEL', KEYS[2], expired[i])
+        end
+        if redis.call('ZCARD', KEYS[1]) == 0 then
+            redis.call('DEL', KEYS[2])
+            redis.call('SREM', KEYS[3], ARGV[2])
+        end
+        return expired
+    """
+
+    def __init__(self):
+        self.redis = get_redis()
+        if self.redis is not None:
+            self._touch = self.redis.register_script(self.TOUCH_SCRIPT)
+            self._disconnect = self.redis.register_script(self.DISCONNECT_SCRIPT)
+            self._sweep = self.redis.register_script(self.SWEEP_SCRIPT)
+        self.buffer = WriteBehindBuffer(
+            "presence",
+            _write_presence,
+            max_items=settings.GAME_WRITE_BEHIND_MAX_ITEMS,
+            max_delay=settings.PRESENCE_FLUSH_INTERVAL,
+            dead_letter=_dead_letter_presence,
+        )
+        # scope -> {user_id: [expires_at, open sockets]}
+        self._scopes = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._wakeup = threading.Event()
+
+    @property
+    def sync(self) -> bool:
+        return getattr(settings, "GAME_WRITE_BEHIND_SYNC", False)
+
+    @staticmethod
+    def lobby_scope(lobby_id) -> str:
+        return f"lobby:{lobby_id}"
+
+    @staticmethod
+    def chat_scope(room_id) -> str:
+        return f"chat:{room_id}"
+
+    # --- sockets ---
+
+    def connect(self, scope: str, user_id: int) -> bool:
+        """Records a new socket of the user. Returns True if the user just came online."""
+        joined = self._mark(scope, user_id, sockets=1)
+        self._record(scope, user_id, JOINED if joined else SEEN)
+        self._ensure_thread()
+        return joined
+
+    def heartbeat(self, scope: str, user_id: int) -> bool:
+        """Keeps the user online. Returns True if they had already expired."""
+        joined = self._mark(scope, user_id, sockets=0)
+        self._record(scope, user_id, JOINED if joined else SEEN)
+        return joined
+
+    def disconnect(self, scope: str, user_id: int) -> bool:
+        """Records a closed socket. Returns True if it was the user's last one in the scope."""
+        if self.redis is None:
+            with self._lock:
+                members = self._scopes.get(scope, {})
+                entry = members.get(user_id)
+                left = entry is not None and entry[1] <= 1
+                if left:
+                    del members[user_id]
+                elif entry is not None:
+                    entry[1] -= 1
+        else:
+            left = bool(self._disconnect(
+                keys=[self.KEY.format(scope=scope), self.CONNS_KEY.format(scope=scope)], args=[user_id],
+            ))
+        if left:
+            self._record(scope, user_id, LEFT)
+        return left
+
+    def online(self, scope: str) -> list:
+        """Ids of the users online in the scope."""
+        now = time.time()
+        if self.redis is None:
+            with self._lock:
+                return [user_id for user_id, (expires_at, _) in self._scopes.get(scope, {}).items() if expires_at > now]
+        return [int(user_id) for user_id in self.redis.zrangebyscore(self.KEY.format(scope=scope), f"({now}", "+inf")]
+
+    async def aconnect(self, scope: str, user_id: int) -> bool:
+        return await self._arun(self.connect, scope, user_id)
+
+    async def aheartbeat(self, scope: str, user_id: int) -> bool:
+        return await self._arun(self.heartbeat, scope, user_id)
+
+    async def adisconnect(self, scope: str, user_id: int) -> bool:
+        return await self._arun(self.disconnect, scope, user_id)
+
+    async def aonline(self, scope: str) -> list:
+        if self.redis is None:
+            return self.online(scope)
+        return await sync_to_async(self.online, thread_sensitive=False)(scope)
+
+    async def _arun(self, method, *args):
+        """Only hops to a thread when the call does I/O."""
+        if self.sync:
+            return await database_sync_to_async(method)(*args)
+        if self.redis is None:
+            return method(*args)
+        return await sync_to_async(method, thread_sensitive=False)(*args)
+
+    def _mark(self, scope: str, user_id: int, sockets: int) -> bool:
+        expires_at = time.time() + settings.PRESENCE_TTL
+        if self.redis is None:
+            with self._lock:
+                entry = self._scopes.setdefault(scope, {}).get(user_id)
+                if entry is None:
+                    self._scopes[scope][user_id] = [expires_at, max(sockets, 1)]
+                    return True
+                entry[0] = expires_at
+                entry[1] += sockets
+                return False
+        return bool(self._touch(
+            keys=[self.KEY.format(scope=scope), self.CONNS_KEY.format(scope=scope), self.SCOPES_KEY],
+            # Keys outlive their members so the sweeper still sees who left
+            args=[user_id, expires_at, scope, sockets, settings.PRESENCE_TTL * 10],
+        ))
+
+    def _record(self, scope: str, user_id: int, state: str, seen_at: float | None = None):
+        kind, _, object_id = scope.partition(":")
+        if kind != "lobby":
+            return
+        seen_at = datetime.fromtimestamp(seen_at or time.time(), tz=dt_timezone.utc)
+        self.buffer.put((int(object_id), user_id, state, seen_at))
+
+    # --- sweeping ---
+
+    def sweep(self) -> int:
+        """Takes users whose heartbeats stopped offline. Returns how many were removed."""
+        now = time.time()
+        expired = []
+        if self.redis is None:
+            with self._lock:
+                for scope, members in list(self._scopes.items()):
+                    for user_id, (expires_at, _) in list(members.items()):
+                        if expires_at <= now:
+                            del members[user_id]
+                            expired.append((scope, user_id, expires_at))
+                    if not members:
+                        del self._scopes[scope]
+        else:
+            # One process per interval sweeps; the script hands each expiry to a single caller anyway
+            if not self.redis.set(self.SWEEP_LOCK_KEY, 1, nx=True, px=int(settings.PRESENCE_FLUSH_INTERVAL * 1000)):
+                return 0
+            for raw_scope in self.redis.smembers(self.SCOPES_KEY):
+                scope = raw_scope.decode()
+                removed = self._sweep(
+                    keys=[self.KEY.format(scope=scope), self.CONNS_KEY.format(scope=scope), self.SCOPES_KEY],
+                    args=[now, scope],
+                )
+                for user_id, expires_at in zip(removed[::2], removed[1::2]):
+                    expired.append((scope, int(user_id), float(expires_at)))
+
+        for scope, user_id, expires_at in expired:
+            self._record(scope, user_id, EXPIRED, seen_at=expires_at - settings.PRESENCE_TTL)
+        return len(expired)
+
+    def flush(self) -> int:
+        """Sweeps and writes everything buffered so far in the calling thread."""
+        self.sweep()
+        return self.buffer.flush()
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self.buffer.close()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="presence-sweeper", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(settings.PRESENCE_FLUSH_INTERVAL)
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception({"sweeper": "presence"})
+            finally:
+                close_old_connections()
+
+
+presence_tracker = PresenceTracker()
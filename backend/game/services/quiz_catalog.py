@@ -0,0 +1,101 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from ..models import Question, QuizQuestion
+
+
+class QuizCatalog:
+    """
+    Filtering and caching of the published-quiz catalog.
+
+    Each rendered page is cached under the filters and cursor it was
+    requested with. Publishing, unpublishing or deleting a published quiz
+    moves the catalog to a new version, which retires every cached page at
+    once; pages of older versions simply expire after
+    QUIZ_CATALOG_CACHE_TTL seconds.
+    """
+
+    VERSION_KEY = "quiz-catalog:version"
+    PAGE_KEY = "quiz-catalog:v1:{version}:{digest}"
+    FILTERS = ("id", "tag", "difficulty", "published_after", "published_before")
+    PARAMS = FILTERS + ("cursor", "limit")
+    DIFFICULTY_ORDER = [Question.Difficulty.EASY, Question.Difficulty.MEDIUM, Question.Difficulty.HARD]
+
+    # --- filtering ---
+
+    def filter(self, queryset, params):
+        """
+        Applies the catalog filters: `id` (a single quiz), `tag` (repeatable,
+        quizzes must carry every tag), `difficulty`, and
+        `published_after`/`published_before` on the publish date.
+        """
+        if "id" in params:
+            try:
+                queryset = queryset.filter(pk=int(params["id"]))
+            except ValueError:
+                raise ValidationError({"id": "Must be a quiz id."})
+
+        for raw in params.getlist("tag"):
+            try:
+                queryset = queryset.filter(tags=int(raw))
+            except ValueError:
+                raise ValidationError({"tag": "Must be a tag id."})
+
+        difficulty = params.get("difficulty")
+        if difficulty is not None:
+            if difficulty not in Question.Difficulty.values:
+                raise ValidationError({"difficulty": f"Must be one of {', '.join(Question.Difficulty.values)}."})
+            queryset = queryset.filter(difficulty=difficulty)
+
+        if "published_after" in params:
+            queryset = queryset.filter(publish_date__gte=self._datetime(params, "published_after"))
+        if "published_before" in params:
+            queryset = queryset.filter(publish_date__lt=self._datetime(params, "published_before"))
+        return queryset
+
+    @staticmethod
+    def _datetime(params, name: str):
+        try:
+            value = parse_datetime(params[name])
+        except ValueError:
+            value = None
+        if value is None:
+            raise ValidationError({name: "Must be an ISO 8601 datetime."})
+        return value if timezone.is_aware(value) else timezone.make_aware(value)
+
+    @classmethod
+    def difficulty_of(cls, quiz) -> str:
+        """Median difficulty of the quiz's questions ("" without questions)."""
+        difficulties = sorted(
+            QuizQuestion.objects.filter(quiz=quiz).values_list("question__difficulty", flat=True),
+            key=cls.DIFFICULTY_ORDER.index,
+        )
+        return difficulties[len(difficulties) // 2] if difficulties else ""
+
+    # --- page cache ---
+
+    def page_key(self, params) -> str:
+        # Only the parameters that shape the page, in a fixed order
+        canonical = urlencode(sorted((name, value) for name in self.PARAMS for value in params.getlist(name)))
+        return self.PAGE_KEY.format(
+            version=cache.get(self.VERSION_KEY, 0),
+            digest=hashlib.sha1(canonical.encode()).hexdigest(),
+        )
+
+    def get_page(self, key: str) -> bytes | None:
+        return cache.get(key)
+
+    def set_page(self, key: str, content: bytes):
+        cache.set(key, content, timeout=settings.QUIZ_CATALOG_CACHE_TTL)
+
+    def invalidate(self):
+        """Retires every cached page once the current transaction commits."""
+        transaction.on_commit(lambda: cache.set(self.VERSION_KEY, time.time_ns(), timeout=None))
@@ -0,0 +1,102 @@
+import math
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .redis_client import get_redis
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket: up to `capacity` actions in a burst, refilled evenly so
+    `capacity` actions are allowed per `period` seconds.
+
+    With Redis every check is one atomic script call, so all sockets and
+    workers of a user draw from the same bucket. Without Redis the buckets
+    are kept in-process.
+    """
+
+    KEY = "quizarrow:ratelimit:{name}:{key}"
+    # Returns 0 when the tokens were taken, otherwise the milliseconds until they are available.
+    CONSUME_SCRIPT = """
+        local capacity = tonumber(ARGV[1])
+        local rate = tonumber(ARGV[2])
+        local cost = tonumber(ARGV[3])
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+        local tokens = tonumber(bucket[1]) or capacity
+        local ts = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+        local wait = 0
+        if tokens >= cost then
+            tokens = tokens - cost
+        else
+            wait = math.ceil((cost - tokens) / rate)
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+        redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate))
+        return wait
+    """
+    MAX_LOCAL_BUCKETS = 10000
+
+    def __init__(self, name: str, capacity: int, period: float):
+        self.name = name
+        self.capacity = capacity
+        self.period = period
+        self.redis = get_redis()
+        self._consume = self.redis.register_script(self.CONSUME_SCRIPT) if self.redis is not None else None
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Tokens refilled per second."""
+        return self.capacity / self.period
+
+    def consume(self, key, cost: int = 1) -> float:
+        """Takes `cost` tokens. Returns 0 if allowed, else the seconds to wait before retrying."""
+        if self.redis is None:
+            return self._consume_local(str(key), cost)
+        wait_ms = self._consume(
+            keys=[self.KEY.format(name=self.name, key=key)],
+            args=[self.capacity, self.rate / 1000, cost],
+        )
+        return int(wait_ms) / 1000
+
+    def allow(self, key, cost: int = 1) -> bool:
+        return self.consume(key, cost) == 0
+
+    async def aallow(self, key, cost: int = 1) -> bool:
+        """`allow` for consumers: only hops to a thread when the check does I/O."""
+        if self.redis is None:
+            return self.allow(key, cost)
+        return await sync_to_async(self.allow, thread_sensitive=False)(key, cost)
+
+    def _consume_local(self, key: str, cost: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - ts) * self.rate)
+            if tokens >= cost:
+                tokens, wait = tokens - cost, 0.0
+            else:
+                wait = math.ceil((cost - tokens) / self.rate * 1000) / 1000
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.MAX_LOCAL_BUCKETS:
+                self._evict_full(now)
+        return wait
+
+    def _evict_full(self, now: float):
+        # A bucket that has refilled completely is the same as no bucket.
+        self._buckets = {
+            key: (tokens, ts) for key, (tokens, ts) in self._buckets.items()
+            if tokens + (now - ts) * self.rate < self.capacity
+        }
+
+
+chat_rate_limiter = TokenBucketLimiter(
+    "chat", settings.CHAT_RATE_LIMIT_NUM_MESSAGES, settings.CHAT_RATE_LIMIT_SECONDS
+)
@@ -0,0 +1,11 @@
+def get_redis():
+    """
+    Returns the raw Redis client behind the default cache, or None when the
+    cache is not Redis (e.g. local memory in development). Callers fall back
+    to an in-process implementation in that case.
+    """
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except (ImportError, NotImplementedError):
+        return None
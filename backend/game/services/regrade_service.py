@@ -0,0 +1,179 @@
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from ..evaluation import AnswerEvaluator
+from ..models import Answer, LobbyParticipant, LobbyRoom, Question, QuizParticipation, QuizQuestion
+from .snapshot_service import SnapshotService
+
+logger = logging.getLogger("game")
+
+
+class RegradeService:
+    """
+    Re-evaluates stored answers after an answer key was fixed.
+
+    Answers are streamed in keyset-paginated chunks (never loaded all at
+    once) and each chunk costs a handful of statements: one SELECT, one
+    bulk UPDATE of the changed answers, and one CASE UPDATE each for
+    participant scores and participation records. Lobbies that are still
+    running are skipped, since their live scores are held in the hot state.
+
+    Answers are re-evaluated against the current answer keys but scored
+    with the points of the snapshot their lobby was played with.
+    """
+
+    DEFAULT_CHUNK_SIZE = 2000
+    LOCK_KEY = "quiz-regrade:{quiz_id}:lock"
+    STATUS_KEY = "quiz-regrade:{quiz_id}:status"
+
+    def __init__(self, chunk_size: int | None = None):
+        self.chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        # A private evaluator: regrades must not evict the gameplay LRU.
+        self.evaluator = AnswerEvaluator(maxsize=256)
+        self.snapshots = SnapshotService()
+        self._snapshot_points = {}
+
+    def regrade_quiz(self, quiz, *, quiz_question_ids=None, dry_run: bool = False) -> dict:
+        return self._regrade(self._quiz_links(quiz, quiz_question_ids), dry_run=dry_run)
+
+    def count_quiz_answers(self, quiz, *, quiz_question_ids=None) -> int:
+        return Answer.objects.filter(quiz_question__in=self._quiz_links(quiz, quiz_question_ids)).count()
+
+    @staticmethod
+    def _quiz_links(quiz, quiz_question_ids=None):
+        links = QuizQuestion.objects.filter(quiz=quiz).select_related("question")
+        if quiz_question_ids is not None:
+            links = links.filter(pk__in=quiz_question_ids)
+        return links
+
+    # --- background runs ---
+
+    def start_quiz_regrade(self, quiz, *, quiz_question_ids=None, dry_run: bool = False) -> bool:
+        """
+        Regrades a quiz outside the request, in a background thread (inline
+        with GAME_WRITE_BEHIND_SYNC). Progress is reported by quiz_status().
+        Returns False if a regrade of the quiz is already running.
+        """
+        lock_key = self.LOCK_KEY.format(quiz_id=quiz.pk)
+        if not cache.add(lock_key, 1, timeout=settings.GAME_REGRADE_STATUS_TTL):
+            return False
+        self._set_status(quiz, {"status": "running", "dry_run": dry_run})
+        args = (quiz, quiz_question_ids, dry_run)
+        if getattr(settings, "GAME_WRITE_BEHIND_SYNC", False):
+            self._run(*args)
+        else:
+            threading.Thread(target=self._run, args=args, name=f"regrade-quiz-{quiz.pk}", daemon=True).start()
+        return True
+
+    def is_running(self, quiz) -> bool:
+        return cache.get(self.LOCK_KEY.format(quiz_id=quiz.pk)) is not None
+
+    def quiz_status(self, quiz) -> dict | None:
+        """Status of the quiz's last background regrade, with its stats once done."""
+        return cache.get(self.STATUS_KEY.format(quiz_id=quiz.pk))
+
+    def _run(self, quiz, quiz_question_ids, dry_run: bool):
+        try:
+            result = self.regrade_quiz(quiz, quiz_question_ids=quiz_question_ids, dry_run=dry_run)
+            self._set_status(quiz, {"status": "done", **result})
+        except Exception:
+            logger.exception({"regrade": "quiz", "quiz_id": quiz.pk})
+            self._set_status(quiz, {"status": "failed", "dry_run": dry_run})
+        finally:
+            cache.delete(self.LOCK_KEY.format(quiz_id=quiz.pk))
+            close_old_connections()
+
+    def _set_status(self, quiz, status: dict):
+        cache.set(self.STATUS_KEY.format(quiz_id=quiz.pk), status, timeout=settings.GAME_REGRADE_STATUS_TTL)
+
+    def regrade_question(self, question: Question, *, dry_run: bool = False) -> dict:
+        links = QuizQuestion.objects.filter(question=question).select_related("question")
+        return self._regrade(links, dry_run=dry_run)
+
+    def _regrade(self, links, *, dry_run: bool) -> dict:
+        links = {link.id: link for link in links}
+        stats = {"scanned": 0, "changed": 0, "points_delta": 0, "dry_run": dry_run}
+        if not links:
+            return stats
+
+        answers = (
+            Answer.objects.filter(quiz_question_id__in=links)
+            .exclude(lobby__status=LobbyRoom.Status.RUNNING)
+            .order_by("id")
+        )
+        last_id = 0
+        while True:
+            chunk = list(
+                answers.filter(id__gt=last_id).values_list(
+                    "id", "lobby_id", "participant_id", "quiz_question_id",
+                    "payload", "is_correct", "points_awarded", "evaluation", "lobby__snapshot_id",
+                )[: self.chunk_size]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            stats["scanned"] += len(chunk)
+
+            changed, participant_deltas, lobby_deltas = [], defaultdict(int), defaultdict(int)
+            for row in chunk:
+                answer_id, lobby_id, participant_id, qq_id, payload, was_correct, old_points, evaluation, snapshot_id = row
+                # Late answers were recorded with 0 points regardless of content
+                if (evaluation or {}).get("late"):
+                    continue
+                link = links[qq_id]
+                is_correct = self.evaluator.for_question(link.question).matches(payload)
+                points = self._points(snapshot_id, link) if is_correct else 0
+                if is_correct == was_correct and points == old_points:
+                    continue
+                changed.append(Answer(
+                    id=answer_id,
+                    is_correct=is_correct,
+                    points_awarded=points,
+                    evaluation={**(evaluation or {}), "regraded": True, "previous_points": old_points},
+                ))
+                participant_deltas[participant_id] += points - old_points
+                lobby_deltas[lobby_id] += points - old_points
+
+            stats["changed"] += len(changed)
+            stats["points_delta"] += sum(participant_deltas.values())
+            if changed and not dry_run:
+                self._apply(changed, participant_deltas, lobby_deltas)
+
+        return stats
+
+    def _points(self, snapshot_id, link) -> int:
+        """Points of the question in the snapshot the lobby was played with."""
+        if snapshot_id is None:
+            return link.effective_points()
+        if snapshot_id not in self._snapshot_points:
+            self._snapshot_points[snapshot_id] = {
+                question["id"]: question["points"] for question in self.snapshots.get_plan(snapshot_id)
+            }
+        points = self._snapshot_points[snapshot_id].get(link.id)
+        return link.effective_points() if points is None else points
+
+    @transaction.atomic
+    def _apply(self, changed, participant_deltas, lobby_deltas):
+        Answer.objects.bulk_update(changed, ["is_correct", "points_awarded", "evaluation"])
+        self._add_deltas(LobbyParticipant.objects.all(), "pk", "score", participant_deltas)
+        # One participation record per lobby
+        self._add_deltas(QuizParticipation.objects.all(), "lobby_id", "final_score", lobby_deltas)
+
+    @staticmethod
+    def _add_deltas(queryset, key_field: str, score_field: str, deltas: dict):
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        queryset.filter(**{f"{key_field}__in": deltas}).update(**{
+            score_field: F(score_field) + Case(
+                *[When(**{key_field: key}, then=Value(delta)) for key, delta in deltas.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        })
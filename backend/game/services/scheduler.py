@@ -0,0 +1,279 @@
+import asyncio
+import heapq
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import LobbyRoom, GameEvent
+from .event_bus import game_event_bus
+from .history_service import HistoryService
+from .prefetch_service import PrefetchService
+from .redis_client import get_redis
+
+logger = logging.getLogger("game")
+
+
+class MemoryDeadlineScheduler:
+    """
+    In-process deadline queue: a heap of (deadline, lobby_id) with lazy
+    deletion. Rescheduling or cancelling only touches the dict; stale heap
+    entries are skipped when popped and compacted once they pile up.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, lobby_id: int, deadline: float):
+        with self._lock:
+            self._deadlines[lobby_id] = deadline
+            heapq.heappush(self._heap, (deadline, lobby_id))
+            if len(self._heap) > 2 * len(self._deadlines) + 1000:
+                self._heap = [(d, i) for i, d in self._deadlines.items()]
+                heapq.heapify(self._heap)
+
+    def cancel(self, lobby_id: int):
+        with self._lock:
+            self._deadlines.pop(lobby_id, None)
+
+    def pop_due(self, now: float, limit: int) -> list:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and len(due) < limit:
+                deadline, lobby_id = heapq.heappop(self._heap)
+                if self._deadlines.get(lobby_id) == deadline:
+                    del self._deadlines[lobby_id]
+                    due.append(lobby_id)
+        return due
+
+
+class RedisDeadlineScheduler:
+    """
+    Deadline queue shared by every process, kept in a Redis sorted set
+    scored by deadline. Due entries are claimed with a script so each lobby
+    is handed to exactly one scheduler worker.
+    """
+
+    KEY = "quizarrow:lobby-deadlines"
+    POP_DUE_SCRIPT = """
+        local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+        if #ids > 0 then
+            redis.call('ZREM', KEYS[1], unpack(ids))
+        end
+        return ids
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._pop_due = client.register_script(self.POP_DUE_SCRIPT)
+
+    def schedule(self, lobby_id: int, deadline: float):
+        self.client.zadd(self.KEY, {lobby_id: deadline})
+
+    def cancel(self, lobby_id: int):
+        self.client.zrem(self.KEY, lobby_id)
+
+    def pop_due(self, now: float, limit: int) -> list:
+        return [int(i) for i in self._pop_due(keys=[self.KEY], args=[now, limit])]
+
+
+_scheduler = None
+
+
+def get_deadline_scheduler():
+    """Returns the process-wide scheduler, Redis-backed whenever the cache is Redis."""
+    global _scheduler
+    if _scheduler is None:
+        client = get_redis()
+        _scheduler = RedisDeadlineScheduler(client) if client is not None else MemoryDeadlineScheduler()
+    return _scheduler
+
+
+class DeadlineService:
+    """
+    Advances or closes lobbies whose current question ran out of time.
+    Question changes go through the hot state (and its write-behind
+    buffer); lobbies that run out of questions are ended in one batch.
+    """
+
+    def __init__(self, scheduler=None):
+        from .lobby_service import LobbyService
+
+        self.scheduler = scheduler or get_deadline_scheduler()
+        self.lobby_service = LobbyService()
+        self.history_service = HistoryService()
+        self.store = self.lobby_service.store
+
+    def deadline_for(self, state: dict) -> float:
+        """When the lobby's current question (or an idle, unstarted lobby) expires."""
+        if PrefetchService.is_prefetch(state):
+            # Prefetch runs close once their last question's deadline passed
+            return PrefetchService.ends_at(state) + settings.GAME_DEADLINE_GRACE_SECONDS
+        question = self.store.current_question(state)
+        if question is None or state["started_at"] is None:
+            return state.get("created_at", time.time()) + settings.GAME_LOBBY_IDLE_TIMEOUT
+        return state["started_at"] + question["timer"] + settings.GAME_DEADLINE_GRACE_SECONDS
+
+    def expire(self, lobby_ids) -> dict:
+        now = time.time()
+        advanced, to_end = 0, []
+        for lobby_id in lobby_ids:
+            state = self.store.load(lobby_id)
+            if not state or state["status"] != LobbyRoom.Status.RUNNING:
+                continue
+
+            deadline = self.deadline_for(state)
+            if deadline > now:
+                # Stale entry: the lobby moved on since it was scheduled.
+                self.scheduler.schedule(lobby_id, deadline)
+                continue
+
+            index = state["index"]
+            if index is not None and index + 1 < len(state["questions"]):
+                if self.store.claim_advance(lobby_id, index):
+                    self.lobby_service.start_question(state, index + 1)
+                    advanced += 1
+            elif self.store.claim_advance(lobby_id, index):
+                to_end.append(state)
+
+        if to_end:
+            claims = [(state["lobby_id"], state["index"]) for state in to_end]
+            try:
+                self._end_lobbies(to_end)
+            except Exception:
+                # Let the retried batch claim these lobbies again
+                for lobby_id, index in claims:
+                    self.store.release_advance(lobby_id, index)
+                raise
+        return {"advanced": advanced, "ended": len(to_end)}
+
+    def _end_lobbies(self, states):
+        """
+        Ends many lobbies with one UPDATE, records their participations and
+        emits one batch of lifecycle events, all in the same transaction.
+        """
+        self.store.answers.close_windows([
+            (state["lobby_id"], self.store.current_question(state)["id"])
+            for state in states
+            if state["index"] is not None
+        ])
+        self.store.writer.flush()
+        ids = [state["lobby_id"] for state in states]
+        with transaction.atomic():
+            ended = set(
+                LobbyRoom.objects.select_for_update()
+                .filter(pk__in=ids, status=LobbyRoom.Status.RUNNING)
+                .values_list("pk", flat=True)
+            )
+            self.store.leaderboard.finalize(ids)
+            LobbyRoom.objects.filter(pk__in=ended).update(
+                status=LobbyRoom.Status.ENDED,
+                ended_at=timezone.now(),
+                current_q=None,
+                question_started_at=None,
+            )
+            self.history_service.create_participation_records(ended)
+            game_event_bus.emit_many(
+                {
+                    "event_type": GameEvent.Type.LOBBY_ENDED,
+                    "lobby_id": state["lobby_id"],
+                    "quiz_id": state["quiz_id"],
+                    "payload": {"to": LobbyRoom.Status.ENDED, "reason": "timeout"},
+                }
+                for state in states
+                if state["lobby_id"] in ended
+            )
+            for state in states:
+                state["status"] = LobbyRoom.Status.ENDED
+                state["index"] = None
+                state["started_at"] = None
+                self.store.save(state)
+                self.lobby_service.broadcaster.game_ended(state["lobby_id"], state["status"])
+
+    def resync(self):
+        """
+        Rebuilds the schedule from Postgres. Covers lobbies started before the
+        scheduler ran, a lost Redis, and the in-memory backend, which never
+        sees schedule calls made by other processes.
+        """
+        rows = (
+            LobbyRoom.objects.filter(status=LobbyRoom.Status.RUNNING)
+            .annotate(timer=Coalesce("current_q__timer_seconds", "current_q__question__default_timer_seconds"))
+            .values_list(
+                "id", "question_started_at", "timer", "created_at", "mode", "started_at", "snapshot_id",
+            )
+        )
+        plans = {}
+        count = 0
+        for lobby_id, question_started_at, timer, created_at, mode, run_started_at, snapshot_id in rows.iterator(
+            chunk_size=2000
+        ):
+            if mode == PrefetchService.MODE and run_started_at and snapshot_id:
+                if snapshot_id not in plans:
+                    plans[snapshot_id] = self.store.snapshots.get_plan(snapshot_id)
+                run = {"run_started_at": run_started_at.timestamp(), "questions": plans[snapshot_id]}
+                deadline = PrefetchService.ends_at(run) + settings.GAME_DEADLINE_GRACE_SECONDS
+            elif question_started_at and timer:
+                deadline = question_started_at.timestamp() + timer + settings.GAME_DEADLINE_GRACE_SECONDS
+            else:
+                deadline = created_at.timestamp() + settings.GAME_LOBBY_IDLE_TIMEOUT
+            self.scheduler.schedule(lobby_id, deadline)
+            count += 1
+        return count
+
+
+class DeadlineRunner:
+    """
+    Single asyncio loop that drains due deadlines in batches, replacing one
+    timer task per lobby. Run it with `manage.py run_deadline_scheduler`.
+    """
+
+    def __init__(self, scheduler=None, *, batch_size: int | None = None, tick: float | None = None):
+        self.scheduler = scheduler or get_deadline_scheduler()
+        self.batch_size = batch_size or settings.GAME_DEADLINE_BATCH_SIZE
+        self.tick = tick or settings.GAME_DEADLINE_TICK
+        self._next_resync = 0
+
+    async def run(self):
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logger.exception({"scheduler": "deadline", "error": "tick failed"})
+                processed = 0
+            # Keep draining without sleeping while there is a backlog.
+            if processed < self.batch_size:
+                await asyncio.sleep(self.tick)
+
+    async def run_once(self) -> int:
+        if time.monotonic() >= self._next_resync:
+            await database_sync_to_async(DeadlineService(self.scheduler).resync)()
+            interval = settings.GAME_DEADLINE_RESYNC_SECONDS
+            if isinstance(self.scheduler, RedisDeadlineScheduler):
+                # Redis already sees every schedule call; resync only rarely.
+                interval *= 10
+            self._next_resync = time.monotonic() + interval
+
+        lobby_ids = await sync_to_async(self.scheduler.pop_due)(time.time(), self.batch_size)
+        if lobby_ids:
+            try:
+                result = await database_sync_to_async(DeadlineService(self.scheduler).expire)(lobby_ids)
+            except Exception:
+                # The popped entries are no longer queued: put the batch back for a retry
+                await sync_to_async(self._requeue)(lobby_ids, time.time() + settings.GAME_DEADLINE_RETRY_DELAY)
+                raise
+            logger.info({"scheduler": "deadline", "due": len(lobby_ids), **result})
+        return len(lobby_ids)
+
+    def _requeue(self, lobby_ids, deadline: float):
+        # Lobbies handled before the failure are skipped as stale on the retry
+        for lobby_id in lobby_ids:
+            self.scheduler.schedule(lobby_id, deadline)
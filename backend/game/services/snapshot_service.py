@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from ..models import Quiz, QuizQuestion, QuizSnapshot
+from ..serializers import QuizQuestionPublicSerializer
+
+
+class SnapshotService:
+    """
+    Compiles published quizzes into immutable, versioned snapshots and turns
+    them into the question plan used by running lobbies.
+    """
+
+    PLAN_KEY = "quiz-plan:v2:{snapshot_id}"
+    PLAN_TIMEOUT = 24 * 60 * 60
+
+    @transaction.atomic
+    def compile(self, quiz: Quiz) -> QuizSnapshot:
+        """
+        Freezes the quiz's current questions into a new snapshot version.
+        """
+        # Lock the quiz row so concurrent publishes can't race on the version.
+        Quiz.objects.select_for_update().filter(pk=quiz.pk).first()
+        last_version = quiz.snapshots.aggregate(v=Max("version"))["v"] or 0
+
+        links = (
+            QuizQuestion.objects.filter(quiz=quiz)
+            .select_related("question")
+            .prefetch_related("question__tags")
+            .order_by("order")
+        )
+        questions, answer_key = [], {}
+        for link in links:
+            questions.append(QuizQuestionPublicSerializer(link).data)
+            answer_key[str(link.id)] = {
+                "question_id": link.question_id,
+                "type": link.question.type,
+                "answer_key": link.question.answer_key,
+                "updated_at": link.question.updated_at.isoformat(),
+            }
+
+        return QuizSnapshot.objects.create(
+            quiz=quiz,
+            version=last_version + 1,
+            questions=questions,
+            answer_key=answer_key,
+        )
+
+    def latest(self, quiz: Quiz) -> QuizSnapshot:
+        """
+        Returns the newest snapshot of a quiz, compiling one for quizzes that
+        were published before snapshots existed.
+        """
+        snapshot = quiz.snapshots.order_by("-version").first()
+        return snapshot or self.compile(quiz)
+
+    def get_plan(self, snapshot_id: int) -> list:
+        """
+        Returns the ordered question plan of a snapshot: ids, effective
+        points/timers, grading info and the public payload. Snapshots never
+        change, so the plan is cached without any version key.
+        """
+        key = self.PLAN_KEY.format(snapshot_id=snapshot_id)
+        plan = cache.get(key)
+        if plan is not None:
+            return plan
+
+        snapshot = QuizSnapshot.objects.get(pk=snapshot_id)
+        plan = []
+        for payload in snapshot.questions:
+            grading = snapshot.answer_key[str(payload["id"])]
+            plan.append({
+                "id": payload["id"],
+                "order": payload["order"],
+                "points": payload["effective_points"],
+                "timer": payload["effective_timer"],
+                "question_id": grading["question_id"],
+                "updated_at": grading["updated_at"],
+                "type": grading["type"],
+                "answer_key": grading["answer_key"],
+                "payload": payload,
+            })
+        cache.set(key, plan, timeout=self.PLAN_TIMEOUT)
+        return plan
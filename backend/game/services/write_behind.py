@@ -0,0 +1,158 @@
+import atexit
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger("game")
+# One record per item a buffer had to give up on, so it can be replayed by hand
+dead_letter_logger = logging.getLogger("game.dead_letter")
+
+
+def drop_dead_letter(name: str):
+    """
+    Dead-letter sink for disposable items (metric samples, heartbeats):
+    logs how many were dropped, once per batch, instead of every item.
+    """
+    def drop(items):
+        if items:
+            dead_letter_logger.warning({"buffer": name, "dropped": len(items)})
+    return drop
+
+
+class WriteBehindBuffer:
+    """
+    Collects write operations in memory and hands them to `flush_fn` in
+    batches from a background thread, as soon as `max_items` are pending or
+    `max_delay` seconds have passed. Whatever is still buffered is flushed
+    when the interpreter exits.
+
+    With GAME_WRITE_BEHIND_SYNC enabled every item is flushed inline, which
+    keeps tests and management commands deterministic.
+
+    Items that still fail after MAX_FAILED_ATTEMPTS flushes, or are left
+    over when the final flush at exit fails, are handed to `dead_letter`
+    (by default logged one by one to the `game.dead_letter` logger, which
+    suits durable data only; see drop_dead_letter for the rest).
+    """
+
+    MAX_FAILED_ATTEMPTS = 3
+
+    def __init__(self, name: str, flush_fn, *, max_items: int | None = None, max_delay: float | None = None,
+                 dead_letter=None):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.dead_letter = dead_letter or self._log_dead_letter
+        self.max_items = max_items or settings.GAME_WRITE_BEHIND_MAX_ITEMS
+        self.max_delay = max_delay or settings.GAME_WRITE_BEHIND_MAX_DELAY
+
+        self._items = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._closed = False
+        self._failed_attempts = 0
+        atexit.register(self.close)
+
+    @property
+    def sync(self) -> bool:
+        return getattr(settings, "GAME_WRITE_BEHIND_SYNC", False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def put(self, item):
+        self.extend([item])
+
+    def extend(self, items):
+        with self._lock:
+            self._items.extend(items)
+            pending = len(self._items)
+
+        if self.sync or self._closed:
+            self.flush()
+            return
+
+        self._ensure_thread()
+        if pending >= self.max_items:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Drains the buffer and writes it in the calling thread.
+        Returns the number of items handed to `flush_fn`.
+        """
+        with self._flush_lock:
+            with self._lock:
+                items, self._items = self._items, []
+            if not items:
+                return 0
+
+            try:
+                self.flush_fn(items)
+            except Exception:
+                self._failed_attempts += 1
+                if self._failed_attempts >= self.MAX_FAILED_ATTEMPTS:
+                    logger.exception({"buffer": self.name, "dropped": len(items)})
+                    self._failed_attempts = 0
+                    self._dead_letter(items)
+                else:
+                    logger.warning({"buffer": self.name, "retrying": len(items)}, exc_info=True)
+                    with self._lock:
+                        self._items[:0] = items
+                raise
+
+            self._failed_attempts = 0
+            return len(items)
+
+    def close(self):
+        """Stops the background writer and flushes anything left behind."""
+        self._closed = True
+        self._wakeup.set()
+        try:
+            self.flush()
+        except Exception:
+            # Nothing retries after this: give up on whatever was re-queued
+            logger.exception({"buffer": self.name, "error": "final flush failed"})
+            with self._lock:
+                items, self._items = self._items, []
+            self._dead_letter(items)
+
+    def _dead_letter(self, items):
+        if not items:
+            return
+        try:
+            self.dead_letter(items)
+        except Exception:
+            logger.exception({"buffer": self.name, "error": "dead letter failed", "lost": len(items)})
+
+    def _log_dead_letter(self, items):
+        for item in items:
+            dead_letter_logger.error(json.dumps({"buffer": self.name, "item": item}, default=str))
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=f"write-behind-{self.name}", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.max_delay)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Already logged; the items are retried on the next tick.
+                pass
+            finally:
+                close_old_connections()
@@ -1,106 +1,92 @@
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.utils import timezone
 
-from .models import LobbyRoom, LobbyParticipant, GameEvent
+from .models import LobbyRoom, LobbyParticipant, GameEvent, ChatRoom, Quiz
+from .services.chat_backlog import chat_backlog
+from .services.chat_store import chat_message_store
+from .services.event_bus import game_event_bus
+from .services.quiz_catalog import QuizCatalog
 
 # --- LobbyRoom lifecycle ---
 
 @receiver(post_save, sender=LobbyRoom)
-def lobby_created_or_saved(sender, instance: LobbyRoom, created: bool, **kwargs):
+def lobby_created_or_saved(sender, instance: LobbyRoom, created: bool, update_fields=None, **kwargs):
     if created:
-        GameEvent.objects.create(
-            event_type=GameEvent.Type.LOBBY_CREATED,
-            lobby=instance,
-            quiz=instance.quiz,
+        game_event_bus.emit(
+            GameEvent.Type.LOBBY_CREATED,
+            lobby_id=instance.pk,
+            quiz_id=instance.quiz_id,
             payload={"status": instance.status},
         )
-    # Status changes are tracked via pre_save/post_save pair below
-    changed = getattr(instance, "_status_changed_to", None)
-    if changed:
-        etype = None
+        return
+
+    # The field tracker still holds the pre-save values during post_save
+    status_saved = update_fields is None or "status" in update_fields
+    if status_saved and instance.tracker.has_changed("status"):
+        changed = instance.status
         if changed == LobbyRoom.Status.RUNNING:
             etype = GameEvent.Type.LOBBY_STARTED
         elif changed == LobbyRoom.Status.ENDED:
             etype = GameEvent.Type.LOBBY_ENDED
         else:
             etype = GameEvent.Type.STATUS_CHANGED
-        GameEvent.objects.create(
-            event_type=etype,
-            lobby=instance,
-            quiz=instance.quiz,
+        game_event_bus.emit(
+            etype,
+            lobby_id=instance.pk,
+            quiz_id=instance.quiz_id,
             payload={"to": changed},
         )
-        # cleanup flag
-        delattr(instance, "_status_changed_to")
-
-@receiver(pre_save, sender=LobbyRoom)
-def lobby_status_change_probe(sender, instance: LobbyRoom, **kwargs):
-    if not instance.pk:
-        return
-    try:
-        prev = LobbyRoom.objects.get(pk=instance.pk)
-    except LobbyRoom.DoesNotExist:
-        return
-    if prev.status != instance.status:
-        instance._status_changed_to = instance.status
-        # Set timestamps if not provided
-        if instance.status == LobbyRoom.Status.RUNNING and not instance.started_at:
-            instance.started_at = timezone.now()
-        if instance.status == LobbyRoom.Status.ENDED and not instance.ended_at:
-            instance.ended_at = timezone.now()
 
 # --- LobbyParticipant lifecycle ---
 
-@receiver(pre_save, sender=LobbyParticipant)
-def participant_transition_probe(sender, instance: LobbyParticipant, **kwargs):
-    if not instance.pk:
-        # creation tracked in post_save
-        return
-    try:
-        prev = LobbyParticipant.objects.get(pk=instance.pk)
-    except LobbyParticipant.DoesNotExist:
-        return
-    leaving = False
-    if prev.connected and not instance.connected:
-        leaving = True
-    if prev.left_at is None and instance.left_at is not None:
-        leaving = True
-    instance._leaving_now = leaving
-
 @receiver(post_save, sender=LobbyParticipant)
 def participant_created_or_updated(sender, instance: LobbyParticipant, created: bool, **kwargs):
     if created:
-        GameEvent.objects.create(
-            event_type=GameEvent.Type.PARTICIPANT_JOINED,
-            lobby=instance.lobby,
-            quiz=instance.lobby.quiz,
-            participant=instance,
+        game_event_bus.emit(
+            GameEvent.Type.PARTICIPANT_JOINED,
+            lobby_id=instance.lobby_id,
+            quiz_id=instance.lobby.quiz_id,
+            participant_id=instance.pk,
             payload={"nickname": instance.nickname, "is_host": instance.is_host},
         )
         return
 
-    if getattr(instance, "_leaving_now", False):
-        # ensure left_at is set
-        if instance.left_at is None:
-            instance.left_at = timezone.now()
-            instance.save(update_fields=["left_at"])
-        GameEvent.objects.create(
-            event_type=GameEvent.Type.PARTICIPANT_LEFT,
-            lobby=instance.lobby,
-            quiz=instance.lobby.quiz,
-            participant=instance,
+    if instance.is_leaving:
+        game_event_bus.emit(
+            GameEvent.Type.PARTICIPANT_LEFT,
+            lobby_id=instance.lobby_id,
+            quiz_id=instance.lobby.quiz_id,
+            participant_id=instance.pk,
             payload={"nickname": instance.nickname},
         )
-        delattr(instance, "_leaving_now")
 
 @receiver(post_delete, sender=LobbyParticipant)
 def participant_deleted(sender, instance: LobbyParticipant, **kwargs):
     # Treat delete as a leave
-    GameEvent.objects.create(
-        event_type=GameEvent.Type.PARTICIPANT_LEFT,
-        lobby=instance.lobby,
-        quiz=instance.lobby.quiz,
-        participant=None,
+    game_event_bus.emit(
+        GameEvent.Type.PARTICIPANT_LEFT,
+        lobby_id=instance.lobby_id,
+        quiz_id=instance.lobby.quiz_id,
         payload={"nickname": instance.nickname, "reason": "deleted"},
     )
+
+
+# --- ChatRoom existence cache ---
+
+@receiver(post_save, sender=ChatRoom)
+@receiver(post_delete, sender=ChatRoom)
+def chat_room_changed(sender, instance: ChatRoom, **kwargs):
+    chat_message_store.forget_room(instance.pk)
+
+
+@receiver(post_delete, sender=ChatRoom)
+def chat_room_deleted(sender, instance: ChatRoom, **kwargs):
+    chat_backlog.clear(instance.pk)
+
+
+# --- Published quiz catalog ---
+
+@receiver(post_delete, sender=Quiz)
+def published_quiz_deleted(sender, instance: Quiz, **kwargs):
+    if instance.is_published:
+        QuizCatalog().invalidate()
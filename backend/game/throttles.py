@@ -0,0 +1,25 @@
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF throttle backed by a TokenBucketLimiter, keyed by user id (or
+    client IP for anonymous requests). Subclasses set `limiter`:
+
+        class ChatRoomCreateThrottle(TokenBucketThrottle):
+            limiter = TokenBucketLimiter("chat-room-create", 5, 60)
+    """
+
+    limiter = None
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+    def allow_request(self, request, view):
+        self.wait_seconds = self.limiter.consume(self.get_cache_key(request, view))
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
@@ -1,8 +1,9 @@
 from django.urls import path
 from .views import (
     HostNewQuizView, MyQuizzesListDeleteView, QuizQuestionAddView,
-    MyQuizDetailView, QuizQuestionDeleteView, QuizQuestionUpdateView,
-    PublishedQuizzesListView, JoinLobbyView, LobbyStateView, SubmitAnswerView,
+    MyQuizDetailView, QuizQuestionDeleteView, QuizQuestionUpdateView, QuizRegradeView,
+    PublishedQuizzesListView, JoinLobbyView, LobbyStateView, SubmitAnswerView, SubmitRunView,
+    LobbyLeaderboardView, LobbyOnlineView,
     MyParticipationsListView, QuizParticipationDetailView,
 )
 from .views import admin_views, tags_view, chat_views
@@ -16,6 +17,7 @@ urlpatterns = [
     path('quizzes/<int:pk>/questions/', QuizQuestionAddView.as_view(), name='quiz-add-question'),
     path('quizzes/<int:pk>/questions/<int:qid>/', QuizQuestionDeleteView.as_view(), name='quiz-delete-question'),
     path('quizzes/<int:pk>/questions/<int:qid>/update/', QuizQuestionUpdateView.as_view(), name='quiz-update-question'),
+    path('quizzes/<int:pk>/regrade/', QuizRegradeView.as_view(), name='quiz-regrade'),
     
     # --- Tags ---
     path('tags/', tags_view.TagListView.as_view(), name='tag-list'),
@@ -25,12 +27,16 @@ urlpatterns = [
     path('chat/rooms/<int:pk>/', chat_views.ChatRoomRetrieveView.as_view(), name='chatroom-retrieve'),
     path('chat/rooms/', chat_views.ChatRoomListCreateView.as_view(), name='chatroom-list-create'),
     path('chat/rooms/<int:room_id>/messages/', chat_views.ChatMessageListView.as_view(), name='chatroom-messages'),
+    path('chat/rooms/<int:room_id>/online/', chat_views.ChatRoomOnlineView.as_view(), name='chatroom-online'),
     
     # --- Public & Gameplay ---
     path('quizzes/published/', PublishedQuizzesListView.as_view(), name='published-quizzes'),
     path('lobby/join/<int:quiz_id>/', JoinLobbyView.as_view(), name='join-lobby'),
     path('lobby/<int:lobby_id>/state/', LobbyStateView.as_view(), name='lobby-state'),
     path('lobby/<int:lobby_id>/submit/', SubmitAnswerView.as_view(), name='submit-answer'),
+    path('lobby/<int:lobby_id>/submit-run/', SubmitRunView.as_view(), name='submit-run'),
+    path('lobby/<int:lobby_id>/leaderboard/', LobbyLeaderboardView.as_view(), name='lobby-leaderboard'),
+    path('lobby/<int:lobby_id>/online/', LobbyOnlineView.as_view(), name='lobby-online'),
 
     # --- History ---
     path('participations/mine/', MyParticipationsListView.as_view(), name='my-participations'),
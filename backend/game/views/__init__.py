@@ -8,6 +8,7 @@ from .quiz_views import (
     HostNewQuizView,
     MyQuizzesListDeleteView,
     MyQuizDetailView,
+    QuizRegradeView,
 )
 from .question_views import (
     QuizQuestionAddView,
@@ -18,7 +19,10 @@ from .gameplay import (
     PublishedQuizzesListView,
     JoinLobbyView,
     LobbyStateView,
+    LobbyLeaderboardView,
+    LobbyOnlineView,
     SubmitAnswerView,
+    SubmitRunView,
 )
 from .history import (
     MyParticipationsListView,
@@ -36,6 +40,7 @@ from .tags_view import (
 from .chat_views import (
     ChatRoomListCreateView,
     ChatMessageListView,
+    ChatRoomOnlineView,
     ChatRoomDestroyView,
     ChatRoomRetrieveView,
 )
@@ -46,6 +51,7 @@ __all__ = [
     "HostNewQuizView",
     "MyQuizzesListDeleteView",
     "MyQuizDetailView",
+    "QuizRegradeView",
     "QuizQuestionAddView",
     "QuizQuestionDeleteView",
     "QuizQuestionUpdateView",
@@ -53,7 +59,10 @@ __all__ = [
     "PublishedQuizzesListView",
     "JoinLobbyView",
     "LobbyStateView",
+    "LobbyLeaderboardView",
+    "LobbyOnlineView",
     "SubmitAnswerView",
+    "SubmitRunView",
     # History
     "MyParticipationsListView",
     "QuizParticipationDetailView",
@@ -67,6 +76,7 @@ __all__ = [
     # Chat
     "ChatRoomListCreateView",
     "ChatMessageListView",
+    "ChatRoomOnlineView",
     "ChatRoomDestroyView",
     "ChatRoomRetrieveView",
 ]
\ No newline at end of file
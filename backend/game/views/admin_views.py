@@ -44,14 +44,14 @@ class AdminUserDetailView(generics.RetrieveUpdateAPIView):
             profile__role=UserProfile.Role.ADMIN
         ).exclude(
             id=self.request.user.id
-        )
+        ).select_related("profile")
 
 
 class AdminQuizListView(generics.ListAPIView):
     """
     Admin endpoint to list all quizzes from all users.
     """
-    queryset = Quiz.objects.select_related("host").all()
+    queryset = Quiz.objects.with_admin_relations()
     serializer_class = QuizAdminSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminUser]
 
@@ -1,7 +1,13 @@
 from rest_framework import generics, permissions
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from ..models import ChatRoom, ChatMessage
+from ..pagination import ChatHistoryPagination
 from ..permissions import IsHostOrAdmin, IsChatRoomOwnerOrAdmin
 from ..serializers import ChatRoomSerializer, ChatMessageSerializer
+from ..services.chat_store import chat_message_store
+from ..services.presence import presence_tracker
 
 
 class ChatRoomListCreateView(generics.ListCreateAPIView):
@@ -10,7 +16,7 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
     Allows hosts and admins to create new chat rooms.
     """
 
-    queryset = ChatRoom.objects.all()
+    queryset = ChatRoom.objects.select_related("created_by")
     serializer_class = ChatRoomSerializer
 
     def get_permissions(self):
@@ -26,7 +32,7 @@ class ChatRoomRetrieveView(generics.RetrieveAPIView):
     """
     Retrieves the details of a single chat room.
     """
-    queryset = ChatRoom.objects.all()
+    queryset = ChatRoom.objects.select_related("created_by")
     serializer_class = ChatRoomSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -42,12 +48,29 @@ class ChatRoomDestroyView(generics.DestroyAPIView):
 
 class ChatMessageListView(generics.ListAPIView):
     """
-    Lists the last 50 messages for a given chat room.
+    Lists the last 50 messages for a given chat room, newest first.
+    Older and newer pages are available with `before`/`after` cursors.
     """
 
     serializer_class = ChatMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ChatHistoryPagination
 
     def get_queryset(self):
         room_id = self.kwargs.get("room_id")
-        return ChatMessage.objects.filter(room_id=room_id).order_by("-timestamp")[:50]
\ No newline at end of file
+        return ChatMessage.objects.filter(room_id=room_id).select_related("user")
+
+
+class ChatRoomOnlineView(APIView):
+    """
+    Lists the users with an open socket in a chat room, from the presence
+    tracker rather than the database.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, room_id):
+        if not chat_message_store.room_exists(room_id):
+            raise NotFound("Chat room not found.")
+        user_ids = sorted(presence_tracker.online(presence_tracker.chat_scope(room_id)))
+        return Response({"room_id": room_id, "user_ids": user_ids, "count": len(user_ids)})
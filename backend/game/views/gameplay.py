@@ -1,35 +1,59 @@
 from django.db.models import F
+from django.http import HttpResponse
 from rest_framework import generics, permissions, status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from ..models import Quiz
-from ..serializers import QuizQuestionPublicSerializer, QuizLobbySerializer
-from ..services import LobbyService, AnswerService
+from ..pagination import QuizCatalogPagination
+from ..serializers import QuizLobbySerializer
+from ..services import LobbyService, AnswerService, QuizCatalog
 
 
 class PublishedQuizzesListView(generics.ListAPIView):
     """
-    Public endpoint to list all published quizzes with publisher info and dates.
+    Public endpoint to list published quizzes with publisher info and dates,
+    newest first. Filters: `?id=`, `?tag=<id>` (repeatable), `?difficulty=`,
+    `?published_after=`/`?published_before=`. Paged with `?limit=` and
+    `?cursor=`; rendered pages are cached until the catalog changes.
     """
     serializer_class = QuizLobbySerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = QuizCatalogPagination
 
     def get_queryset(self):
-        return Quiz.objects.filter(is_published=True).select_related("host").prefetch_related("tags")
+        queryset = Quiz.objects.filter(is_published=True).select_related("host").prefetch_related("tags")
+        return QuizCatalog().filter(queryset, self.request.query_params).order_by("-created_at", "-id")
+
+    def list(self, request, *args, **kwargs):
+        catalog = QuizCatalog()
+        key = catalog.page_key(request.query_params)
+        content = catalog.get_page(key)
+        if content is None:
+            content = JSONRenderer().render(super().list(request, *args, **kwargs).data)
+            catalog.set_page(key, content)
+        return HttpResponse(content, content_type="application/json")
 
 
 class JoinLobbyView(APIView):
     """
     Starts a new solo quiz session for the logged-in user.
+    With `"mode": "prefetch"` (body or query string) the response also carries
+    the whole question set and the signed release schedule of the run.
     """
 
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, quiz_id):
         service = LobbyService()
-        lobby = service.start_solo_quiz(quiz_id=quiz_id, user=request.user)
-        return Response({"lobby_id": lobby.id}, status=status.HTTP_201_CREATED)
+        mode = request.data.get("mode") or request.query_params.get("mode")
+        prefetch = mode == "prefetch"
+        lobby = service.start_solo_quiz(quiz_id=quiz_id, user=request.user, prefetch=prefetch)
+        data = {"lobby_id": lobby.id}
+        if prefetch:
+            data.update(service.get_prefetch_run(lobby.id, request.user))
+        return Response(data, status=status.HTTP_201_CREATED)
 
 
 class LobbyStateView(APIView):
@@ -41,14 +65,36 @@ class LobbyStateView(APIView):
 
     def get(self, request, lobby_id):
         service = LobbyService()
+        # The question comes pre-serialized from the lobby's hot state
         state = service.get_lobby_state(lobby_id=lobby_id, user=request.user)
+        return Response(state)
 
-        # Serialize the question part of the state if it exists
-        if state.get("question"):
-            serializer = QuizQuestionPublicSerializer(state["question"])
-            state["question"] = serializer.data
 
-        return Response(state)
+class LobbyLeaderboardView(APIView):
+    """
+    Returns the live top-N of a lobby plus the caller's own rank.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, lobby_id):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 100)
+        except ValueError:
+            limit = 10
+        service = LobbyService()
+        return Response(service.get_leaderboard(lobby_id=lobby_id, user=request.user, limit=limit))
+
+
+class LobbyOnlineView(APIView):
+    """
+    Lists the lobby's participants that currently have a game socket open.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, lobby_id):
+        return Response(LobbyService().get_online(lobby_id=lobby_id, user=request.user))
 
 
 class SubmitAnswerView(APIView):
@@ -63,4 +109,19 @@ class SubmitAnswerView(APIView):
         result = service.submit_answer(
             lobby_id=lobby_id, user=request.user, payload=request.data
         )
-        return Response(result, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class SubmitRunView(APIView):
+    """
+    Submits every answer of a prefetch run in one request and ends the run.
+    Body: {"answers": [{"quiz_question_id", "release_token", ...answer}]}
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, lobby_id):
+        service = AnswerService()
+        answers = request.data.get("answers", []) if isinstance(request.data, dict) else None
+        result = service.submit_run(lobby_id=lobby_id, user=request.user, answers=answers)
+        return Response(result, status=status.HTTP_200_OK)
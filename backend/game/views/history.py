@@ -12,9 +12,7 @@ class MyParticipationsListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return QuizParticipation.objects.filter(user=self.request.user).select_related(
-            "quiz"
-        )
+        return QuizParticipation.objects.filter(user=self.request.user).select_related("quiz")
 
 
 class QuizParticipationDetailView(generics.RetrieveAPIView):
@@ -26,4 +24,6 @@ class QuizParticipationDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return QuizParticipation.objects.filter(user=self.request.user)
\ No newline at end of file
+        return QuizParticipation.objects.filter(user=self.request.user).select_related(
+            "quiz"
+        )
\ No newline at end of file
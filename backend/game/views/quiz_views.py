@@ -1,17 +1,16 @@
+from django.conf import settings
 from django.db.models import ProtectedError
 from django.utils import timezone
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 
-# Imports for channels broadcast
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-
 from ..models import Quiz
 from ..serializers import QuizAdminSerializer, QuizLobbySerializer
 from ..permissions import IsHostOrAdmin
+from ..services import SnapshotService, RegradeService, NotificationService, QuizCatalog
 from .mixins import QuizEditPermissionMixin
 
 
@@ -39,9 +38,7 @@ class MyQuizzesListDeleteView(generics.ListAPIView, generics.DestroyAPIView):
 
     def get_queryset(self):
         # Only quizzes created by this user
-        return Quiz.objects.filter(host=self.request.user).prefetch_related(
-            "quiz_questions"
-        )
+        return Quiz.objects.filter(host=self.request.user).with_admin_relations()
 
     def delete(self, request, *args, **kwargs):
         """
@@ -80,7 +77,7 @@ class MyQuizDetailView(QuizEditPermissionMixin, generics.RetrieveUpdateAPIView):
 
     def get_queryset(self):
         # Only quizzes created by the logged-in user
-        return Quiz.objects.filter(host=self.request.user)
+        return Quiz.objects.filter(host=self.request.user).with_admin_relations()
 
     def update(self, request, *args, **kwargs):
         quiz = self.get_object()
@@ -94,6 +91,7 @@ class MyQuizDetailView(QuizEditPermissionMixin, generics.RetrieveUpdateAPIView):
                 raise ValidationError("This quiz is published and cannot be fully edited.")
 
         is_publishing_now = False
+        self.publish_changes = {}
         if "is_published" in request.data:
             next_published = bool(request.data.get("is_published"))
 
@@ -104,29 +102,73 @@ class MyQuizDetailView(QuizEditPermissionMixin, generics.RetrieveUpdateAPIView):
                 if not quiz.quiz_questions.exists():
                     raise ValidationError("A quiz must have at least one question to be published.")
                 # Always set/update the publish_date when transitioning to published
-                quiz.publish_date = timezone.now()
+                self.publish_changes = {
+                    "publish_date": timezone.now(),
+                    "difficulty": QuizCatalog.difficulty_of(quiz),
+                }
 
             elif not next_published and was_published_before_update:
                 # This is an UNPUBLISH action
                 # Clear related dates to ensure a clean state for future publishing
-                quiz.publish_date = None
-                quiz.available_to_date = None
+                self.publish_changes = {"publish_date": None, "available_to_date": None}
+
+        # Saved by perform_update; also kept on `quiz` for the broadcast below
+        for field, value in self.publish_changes.items():
+            setattr(quiz, field, value)
 
         response = super().update(request, *args, **kwargs)
 
-        # If the update was successful and the quiz just became published, broadcast it.
+        # Any change to a listed quiz (publish, unpublish, availability) alters the catalog
+        if response.status_code == 200 and (was_published_before_update or is_publishing_now):
+            QuizCatalog().invalidate()
+
+        # If the update was successful and the quiz just became published,
+        # freeze it into a gameplay snapshot and broadcast it.
         if response.status_code == 200 and is_publishing_now:
+            SnapshotService().compile(quiz)
+
             # The quiz instance is updated by super().update(), so it's safe to serialize
-            channel_layer = get_channel_layer()
-            if channel_layer:
-                payload = QuizLobbySerializer(quiz).data
-                async_to_sync(channel_layer.group_send)(
-                    "quiz_notifications",
-                    {
-                        "type": "quiz.published",
-                        "publisher_id": request.user.id, # Add the publisher's ID
-                        "payload": payload,
-                    }
-                )
-
-        return response
\ No newline at end of file
+            NotificationService().publish(
+                "quiz.published",
+                QuizLobbySerializer(quiz).data,
+                exclude_user_id=request.user.id,  # the publisher already knows
+            )
+
+        return response
+
+    def perform_update(self, serializer):
+        serializer.save(**self.publish_changes)
+
+
+class QuizRegradeView(QuizEditPermissionMixin, APIView):
+    """
+    Re-evaluates past answers of a quiz against its current answer keys and
+    fixes the stored scores. Optional body: {"quiz_question_ids": [...], "dry_run": bool}.
+    Regrades of more than GAME_REGRADE_SYNC_MAX_ANSWERS answers run in the
+    background: POST answers 202 and GET reports their status and stats.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsHostOrAdmin]
+
+    def get(self, request, pk):
+        quiz = self.get_owned_quiz_or_403(pk, allow_published=True)
+        return Response(RegradeService().quiz_status(quiz) or {"status": "idle"})
+
+    def post(self, request, pk):
+        quiz = self.get_owned_quiz_or_403(pk, allow_published=True)
+        quiz_question_ids = request.data.get("quiz_question_ids")
+        if quiz_question_ids is not None and not isinstance(quiz_question_ids, list):
+            raise ValidationError("quiz_question_ids must be a list")
+        dry_run = bool(request.data.get("dry_run", False))
+
+        service = RegradeService()
+        if service.is_running(quiz):
+            raise ValidationError("A regrade of this quiz is already running.")
+        answers = service.count_quiz_answers(quiz, quiz_question_ids=quiz_question_ids)
+        if answers > settings.GAME_REGRADE_SYNC_MAX_ANSWERS:
+            if not service.start_quiz_regrade(quiz, quiz_question_ids=quiz_question_ids, dry_run=dry_run):
+                raise ValidationError("A regrade of this quiz is already running.")
+            return Response({**service.quiz_status(quiz), "answers": answers}, status=status.HTTP_202_ACCEPTED)
+
+        result = service.regrade_quiz(quiz, quiz_question_ids=quiz_question_ids, dry_run=dry_run)
+        return Response(result, status=status.HTTP_200_OK)
@@ -1,27 +1,51 @@
 import { useEffect, useState } from 'react';
+import { getProfile, updateProfile } from '../lib/api/auth';
+import { useNotifier } from '../context/NotificationContext';
 
+// Seconds, saved as the profile's notification_delay_seconds
 const DELAY_OPTIONS = [
   { label: 'Instant', value: 0 },
-  { label: '15 seconds', value: 15000 },
-  { label: '30 seconds', value: 30000 },
-  { label: '1 minute', value: 60000 },
-  { label: '5 minutes', value: 300000 },
+  { label: '15 seconds', value: 15 },
+  { label: '30 seconds', value: 30 },
+  { label: '1 minute', value: 60 },
+  { label: '5 minutes', value: 300 },
 ];
 
-const STORAGE_KEY = 'notification_delay_ms';
-
 export default function NotificationDelaySelector() {
-  const [delay, setDelay] = useState(() => {
-    const savedValue = localStorage.getItem(STORAGE_KEY);
-    return savedValue ? parseInt(savedValue, 10) : 0; // Default to 'Disabled'
-  });
+  const { notify } = useNotifier();
+  const [delay, setDelay] = useState(0);
+  const [saving, setSaving] = useState(true);
 
   useEffect(() => {
-    localStorage.setItem(STORAGE_KEY, delay);
-  }, [delay]);
+    let mounted = true;
+    (async () => {
+      try {
+        const profile = await getProfile();
+        if (mounted) setDelay(profile.notification_delay_seconds ?? 0);
+      } catch (err) {
+        if (mounted) notify.error(err.message || 'Could not load notification settings.');
+      } finally {
+        if (mounted) setSaving(false);
+      }
+    })();
+    return () => {
+      mounted = false;
+    };
+  }, [notify]);
 
-  const handleDelayChange = (e) => {
-    setDelay(parseInt(e.target.value, 10));
+  const handleDelayChange = async (e) => {
+    const previous = delay;
+    const next = parseInt(e.target.value, 10);
+    setDelay(next);
+    setSaving(true);
+    try {
+      await updateProfile({ notification_delay_seconds: next });
+    } catch (err) {
+      setDelay(previous);
+      notify.error(err.message || 'Could not save notification settings.');
+    } finally {
+      setSaving(false);
+    }
   };
 
   return (
@@ -30,6 +54,7 @@ export default function NotificationDelaySelector() {
         className="select select-bordered select-sm"
         value={delay}
         onChange={handleDelayChange}
+        disabled={saving}
       >
         {DELAY_OPTIONS.map((opt) => (
           <option key={opt.value} value={opt.value}>
@@ -39,4 +64,4 @@ export default function NotificationDelaySelector() {
       </select>
     </div>
   );
-}
\ No newline at end of file
+}
@@ -1,4 +1,4 @@
-import { createContext, useContext, useState, useCallback, useMemo, useRef } from 'react'
+import { createContext, useContext, useState, useCallback, useMemo } from 'react'
 
 const NotificationContext = createContext(null)
 
@@ -6,7 +6,6 @@ let idCounter = 0
 
 export function NotificationProvider({ children }) {
   const [notifications, setNotifications] = useState([])
-  const lastNotificationTimestampRef = useRef(0)
 
   const removeNotification = useCallback((id) => {
     setNotifications((prev) => prev.filter((n) => n.id !== id))
@@ -14,19 +13,7 @@ export function NotificationProvider({ children }) {
 
   const addNotification = useCallback(
     (message, type = 'info', duration = 5000) => {
-      const configuredDelay = parseInt(localStorage.getItem('notification_delay_ms') || '0', 10);
-      
-      if (configuredDelay > 0) {
-        const now = Date.now();
-        const timeSinceLast = now - lastNotificationTimestampRef.current;
-        if (timeSinceLast < configuredDelay) {
-          return; // Suppress notification
-        }
-      }
-
-      // If we are showing a notification, update the timestamp
-      lastNotificationTimestampRef.current = Date.now();
-
+      // The notification cooldown is applied by the server (profile setting)
       const id = idCounter++
       setNotifications((prev) => [...prev, { id, message, type }])
       setTimeout(() => {
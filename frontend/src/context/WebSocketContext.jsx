@@ -49,6 +49,10 @@ export function WebSocketProvider({ children }) {
           const { title, publisher_username } = data.payload
           const message = `New quiz "${title}" by ${publisher_username} is available!`
           notify.info(message, 10000) // Show for 10 seconds
+        } else if (data.type === 'quiz.digest') {
+          // Quizzes published during the user's notification cooldown
+          const titles = data.payload.quizzes.map((quiz) => `"${quiz.title}"`).join(', ')
+          notify.info(`${data.payload.count} new quizzes are available: ${titles}`, 10000)
         }
       }
 
@@ -1,11 +1,20 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
-import { getChatMessages, getChatRoomDetails } from '../lib/api/chat';
+import { getChatRoomDetails } from '../lib/api/chat';
 import { useAuth } from '../context/AuthContext';
 
 function getWebSocketURL(roomId) {
   const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
   const { host } = window.location;
-  return `${protocol}//${host}/ws/chat/${roomId}/`;
+  // The socket replays the room's recent messages in a `chat.backlog` frame
+  return `${protocol}//${host}/ws/chat/${roomId}/?backlog=1`;
+}
+
+// Adds frames to the list in `seq` order, skipping ones already shown
+function mergeMessages(prev, incoming) {
+  const seen = new Set(prev.map((msg) => msg.seq).filter((seq) => seq !== undefined));
+  const fresh = incoming.filter((msg) => msg.seq === undefined || !seen.has(msg.seq));
+  if (!fresh.length) return prev;
+  return [...prev, ...fresh].sort((a, b) => (a.seq ?? 0) - (b.seq ?? 0));
 }
 
 export default function useChatRoom(roomId) {
@@ -21,18 +30,11 @@ export default function useChatRoom(roomId) {
   useEffect(() => {
     if (!roomId || !user) return;
 
-    // Fetch room details and historical messages
-    Promise.all([
-      getChatRoomDetails(roomId),
-      getChatMessages(roomId)
-    ])
-      .then(([roomData, historyData]) => {
-        setRoom(roomData);
-        // history is newest-first, so reverse it for display
-        setMessages(historyData.reverse());
-      })
-      .catch((err) => setError(err.message || 'Failed to load room data.'))
-      .finally(() => setLoadingHistory(false));
+    setMessages([]);
+    setLoadingHistory(true);
+    getChatRoomDetails(roomId)
+      .then(setRoom)
+      .catch((err) => setError(err.message || 'Failed to load room data.'));
 
     // Establish WebSocket connection
     const url = getWebSocketURL(roomId);
@@ -51,14 +53,20 @@ export default function useChatRoom(roomId) {
         // Clear the message after 5 seconds to avoid it being sticky
         const timer = setTimeout(() => setRateLimitError(null), 5000);
         return () => clearTimeout(timer);
+      } else if (data.type === 'chat.backlog') {
+        // The server fills an empty backlog from the stored history first
+        setMessages((prev) => mergeMessages(prev, data.messages));
+        setLoadingHistory(false);
       } else {
-        setMessages((prev) => [...prev, data]);
+        // Live frames can overlap the backlog replay
+        setMessages((prev) => mergeMessages(prev, [data]));
       }
     };
 
     ws.onclose = () => {
       console.log(`WebSocket disconnected from room ${roomId}`);
       setIsConnected(false);
+      setLoadingHistory(false);
     };
 
     ws.onerror = (err) => {
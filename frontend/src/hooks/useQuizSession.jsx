@@ -1,34 +1,102 @@
-import { useCallback, useEffect, useState } from 'react'
+import { useCallback, useEffect, useRef, useState } from 'react'
 import { getLobbyState, submitAnswer } from '../lib/api/game'
 import { useNavigate } from 'react-router-dom'
 
+function getWebSocketURL(lobbyId) {
+  const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
+  const { host } = window.location
+  return `${protocol}//${host}/ws/lobby/${lobbyId}/`
+}
+
 export default function useQuizSession(lobbyId) {
   const [gameState, setGameState] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
   const [submitting, setSubmitting] = useState(false)
   const [timeLeft, setTimeLeft] = useState(0)
+  const socketRef = useRef(null)
+  // Resolvers for an answer sent over the socket, settled by its result frame
+  const pendingAnswerRef = useRef(null)
   const navigate = useNavigate()
 
+  const applyState = useCallback((state) => {
+    setGameState(state)
+    setTimeLeft(Math.ceil(state.time_left || 0))
+  }, [])
+
   const fetchState = useCallback(async () => {
     try {
       const state = await getLobbyState(lobbyId)
-      setGameState(state)
-      setTimeLeft(Math.ceil(state.time_left || 0))
-      if (state.status === 'ended') {
-        // Redirect if already ended, might happen on refresh
-        // Need to find the participation record
-      }
+      applyState(state)
     } catch (err) {
       setError(err.message || 'Failed to load quiz session.')
     } finally {
       setLoading(false)
     }
-  }, [lobbyId])
+  }, [lobbyId, applyState])
+
+  const isSocketOpen = () =>
+    socketRef.current && socketRef.current.readyState === WebSocket.OPEN
 
+  // The server pushes the state on connect and every question change,
+  // so polling is only used when the socket is unavailable.
   useEffect(() => {
-    fetchState()
-  }, [fetchState])
+    const ws = new WebSocket(getWebSocketURL(lobbyId))
+    socketRef.current = ws
+
+    ws.onmessage = (event) => {
+      const data = JSON.parse(event.data)
+      switch (data.type) {
+        case 'lobby.state':
+          applyState(data.payload)
+          setLoading(false)
+          break
+        case 'question.started':
+          setGameState((prev) => ({ ...prev, question: data.payload.question, time_left: data.payload.time_left }))
+          setTimeLeft(Math.ceil(data.payload.time_left || 0))
+          break
+        case 'score.updated':
+          setGameState((prev) => (prev ? { ...prev, score: data.payload.score } : prev))
+          break
+        case 'game.ended':
+          setGameState((prev) => (prev ? { ...prev, status: data.payload.status } : prev))
+          break
+        case 'answer.result':
+          pendingAnswerRef.current?.resolve(data.payload)
+          pendingAnswerRef.current = null
+          break
+        case 'error':
+          if (pendingAnswerRef.current) {
+            pendingAnswerRef.current.reject(new Error(data.message))
+            pendingAnswerRef.current = null
+          }
+          break
+        default:
+          break
+      }
+    }
+
+    ws.onerror = () => {
+      // Fall back to the REST endpoints
+      ws.close()
+    }
+
+    ws.onclose = () => {
+      if (pendingAnswerRef.current) {
+        pendingAnswerRef.current.reject(new Error('Connection lost.'))
+        pendingAnswerRef.current = null
+      }
+      if (socketRef.current === ws) {
+        socketRef.current = null
+        fetchState()
+      }
+    }
+
+    return () => {
+      socketRef.current = null
+      ws.close()
+    }
+  }, [lobbyId, applyState, fetchState])
 
   useEffect(() => {
     if (gameState?.status !== 'running' || timeLeft <= 0) {
@@ -40,26 +108,40 @@ export default function useQuizSession(lobbyId) {
     return () => clearInterval(timer)
   }, [gameState, timeLeft])
 
+  const sendAnswer = useCallback((payload) => {
+    if (!isSocketOpen()) {
+      return submitAnswer(lobbyId, payload)
+    }
+    return new Promise((resolve, reject) => {
+      pendingAnswerRef.current = { resolve, reject }
+      socketRef.current.send(JSON.stringify({ action: 'answer', payload }))
+    })
+  }, [lobbyId])
+
   const handleAnswerSubmit = useCallback(async (choiceIndex) => {
     // Guard against concurrent submissions from user clicks and timer hook
     if (submitting) return;
 
     setSubmitting(true)
     setError(null)
+    const answeredId = gameState?.question?.id
     try {
-      const result = await submitAnswer(lobbyId, { index: choiceIndex })
+      const result = await sendAnswer({ index: choiceIndex })
       if (result.status === 'finished') {
         navigate(`/quiz/results/${result.participation_id}`, { replace: true })
+      } else if (isSocketOpen()) {
+        // "next_question" arrives as a pushed frame; until then the answered
+        // question must not stay active or the timeout would resubmit it.
+        setGameState((prev) => (prev?.question?.id === answeredId ? { ...prev, question: null } : prev))
       } else {
-        // "next_question"
-        await fetchState() // Fetch the new question state
+        await fetchState()
       }
     } catch (err) {
       setError(err.message || 'Failed to submit answer.')
     } finally {
       setSubmitting(false)
     }
-  }, [lobbyId, navigate, fetchState, submitting])
+  }, [navigate, fetchState, sendAnswer, submitting, gameState])
 
   // Automatically submit when time runs out
   useEffect(() => {
@@ -84,4 +166,4 @@ export default function useQuizSession(lobbyId) {
     submitting,
     handleAnswerSubmit,
   }
-}
\ No newline at end of file
+}
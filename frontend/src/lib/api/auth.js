@@ -21,4 +21,14 @@ export async function me() {
 
 export async function logout() {
   return apiRequest('/auth/logout/', { method: 'POST' });
-}
\ No newline at end of file
+}
+export async function getProfile() {
+  return apiRequest('/auth/profile/', { method: 'GET' });
+}
+
+export async function updateProfile(updates) {
+  return apiRequest('/auth/profile/', {
+    method: 'PATCH',
+    body: updates,
+  });
+}
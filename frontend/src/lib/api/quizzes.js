@@ -26,6 +26,15 @@ export async function updateQuizMeta(id, updates) {
   });
 }
 
-export async function getPublishedQuizzes() {
-  return apiRequest('/game/quizzes/published/', { method: 'GET' });
+/**
+ * Fetches one page of the published catalog: `{ results, next }`.
+ * Pass the previous page's `next` as `cursor` to continue, and `quizId`
+ * to look up a single quiz.
+ */
+export async function getPublishedQuizzes({ tagIds = [], quizId = null, cursor = null, limit = 20 } = {}) {
+  const params = new URLSearchParams({ limit: String(limit) });
+  tagIds.forEach((id) => params.append('tag', String(id)));
+  if (quizId) params.set('id', String(quizId));
+  if (cursor) params.set('cursor', cursor);
+  return apiRequest(`/game/quizzes/published/?${params}`, { method: 'GET' });
 }
@@ -1,4 +1,4 @@
-import { useState, useEffect, useMemo } from 'react'
+import { useState, useEffect } from 'react'
 import { useAuth } from '../context/AuthContext'
 import { getPublishedQuizzes } from '../lib/api/quizzes'
 import { joinLobby } from '../lib/api/game'
@@ -12,8 +12,10 @@ export default function LobbyPage() {
   const navigate = useNavigate()
 
   const [allQuizzes, setAllQuizzes] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [allTags, setAllTags] = useState([])
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState(null)
   const [joiningId, setJoiningId] = useState(null)
   const [searchId, setSearchId] = useState('')
@@ -23,13 +25,35 @@ export default function LobbyPage() {
     let mounted = true
     ;(async () => {
       try {
-        const [quizzesData, tagsData] = await Promise.all([
-          getPublishedQuizzes(),
-          getAllTags(),
-        ])
+        const tagsData = await getAllTags()
+        if (mounted) setAllTags(Array.isArray(tagsData) ? tagsData : [])
+      } catch (err) {
+        if (mounted) setError(err.message || 'Failed to load lobby data')
+      }
+    })()
+    return () => {
+      mounted = false
+    }
+  }, [])
+
+  const quizId = searchId.trim()
+
+  // Filtering happens on the server; a new search or tag selection restarts from the first page
+  useEffect(() => {
+    let mounted = true
+    if (quizId && !/^\d+$/.test(quizId)) {
+      setAllQuizzes([])
+      setNextCursor(null)
+      setLoading(false)
+      return
+    }
+    setLoading(true)
+    ;(async () => {
+      try {
+        const page = await getPublishedQuizzes({ tagIds: Array.from(selectedTagIds), quizId })
         if (mounted) {
-          setAllQuizzes(Array.isArray(quizzesData) ? quizzesData : [])
-          setAllTags(Array.isArray(tagsData) ? tagsData : [])
+          setAllQuizzes(page.results || [])
+          setNextCursor(page.next || null)
         }
       } catch (err) {
         if (mounted) setError(err.message || 'Failed to load lobby data')
@@ -40,23 +64,20 @@ export default function LobbyPage() {
     return () => {
       mounted = false
     }
-  }, [])
+  }, [selectedTagIds, quizId])
 
-  const filteredQuizzes = useMemo(() => {
-    let quizzes = allQuizzes
-    // Filter by search ID first
-    if (searchId.trim()) {
-      quizzes = quizzes.filter((quiz) => String(quiz.id) === searchId.trim())
-    }
-    // Then filter by selected tags
-    if (selectedTagIds.size > 0) {
-      quizzes = quizzes.filter((quiz) => {
-        const quizTagIds = new Set(quiz.tags.map((t) => t.id))
-        return Array.from(selectedTagIds).every((id) => quizTagIds.has(id))
-      })
+  const handleLoadMore = async () => {
+    setLoadingMore(true)
+    try {
+      const page = await getPublishedQuizzes({ tagIds: Array.from(selectedTagIds), quizId, cursor: nextCursor })
+      setAllQuizzes((quizzes) => [...quizzes, ...(page.results || [])])
+      setNextCursor(page.next || null)
+    } catch (err) {
+      setError(err.message || 'Failed to load more quizzes')
+    } finally {
+      setLoadingMore(false)
     }
-    return quizzes
-  }, [allQuizzes, searchId, selectedTagIds])
+  }
 
   const handleTakeQuiz = async (quizId) => {
     setJoiningId(quizId)
@@ -98,12 +119,12 @@ export default function LobbyPage() {
           </div>
         )}
 
-        {!loading && !error && filteredQuizzes.length === 0 && (
+        {!loading && !error && allQuizzes.length === 0 && (
           <p>No quizzes match your selected filters.</p>
         )}
 
         <div className="grid gap-4">
-          {filteredQuizzes.map((quiz) => (
+          {allQuizzes.map((quiz) => (
             <QuizCard
               key={quiz.id}
               quiz={quiz}
@@ -112,6 +133,14 @@ export default function LobbyPage() {
             />
           ))}
         </div>
+
+        {!loading && nextCursor && (
+          <div className="text-center mt-6">
+            <button className="btn btn-outline" onClick={handleLoadMore} disabled={loadingMore}>
+              {loadingMore ? 'Loading…' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )